@@ -3,30 +3,68 @@ import json
 import urllib3
 import base64
 import asyncio
-import concurrent.futures
 import signal
 import time
 import threading
 from datetime import datetime
 import logging
 import os
+import functools
+import importlib.util
+import re
+from urllib.parse import urlsplit
+from features.worker_pools import obter_pool, estatisticas_pools
+from features.metricas import registrar_requisicao, gancho_requests, incrementar, registrar_coletor
+from features.event_loop import executar_sync, agendar_em
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 # Desabilitar avisos SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# Pool de conexões HTTP global
-def get_http_session():
+# Limites dos pools de conexões HTTP de cada balanceador (ajustáveis por variável de ambiente)
+F5_MAX_CONEXOES = int(os.environ.get("F5_MAX_CONEXOES", 20))
+F5_MAX_KEEPALIVE = int(os.environ.get("F5_MAX_KEEPALIVE", 10))
+F5_TIMEOUT = 60
+
+# Pool de conexões HTTP (um por balanceador; o global fica para usos fora do F5Monitor)
+def get_http_session(pool_connections=10, pool_maxsize=20, pool_block=False):
     session = requests.Session()
     from requests.adapters import HTTPAdapter
     from urllib3.util.retry import Retry
     retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
-    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries, pool_block=pool_block)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
     return session
 
+def metricas_http_session(session):
+    """Uso dos pools urllib3 de uma sessão: conexões abertas (handshakes), requisições e ociosas"""
+    metricas = {"conexoes_criadas": 0, "requisicoes": 0, "ociosas": 0, "max_por_host": 0}
+    for adapter in set(session.adapters.values()):
+        pools = getattr(adapter.poolmanager, "pools", None)
+        if pools is None:
+            continue
+        for chave in list(pools.keys()):
+            pool = pools.get(chave)
+            if pool is None:
+                continue
+            metricas["conexoes_criadas"] += pool.num_connections
+            metricas["requisicoes"] += pool.num_requests
+            metricas["ociosas"] += pool.pool.qsize() if pool.pool else 0
+            metricas["max_por_host"] = max(metricas["max_por_host"], pool.pool.maxsize if pool.pool else 0)
+    return metricas
+
 http_session = get_http_session()
 
+def endpoint_f5(url):
+    """Caminho da URL do iControl sem query e sem nomes de node/pool/membro (rótulo das métricas)"""
+    caminho = urlsplit(url).path
+    return re.sub(r"/(node|pool|members)/(?!stats(?:/|$))[^/]+", r"/\1/{nome}", caminho)
+
 # Logging estruturado
 logging.basicConfig(
     level=logging.INFO,
@@ -34,6 +72,86 @@ logging.basicConfig(
 )
 logger = logging.getLogger("f5monitor")
 
+class F5AsyncClient:
+    """Cliente HTTP assíncrono de um balanceador.
+
+    Com httpx instalado usa um AsyncClient próprio do balanceador (keep-alive
+    e HTTP/2 quando o pacote h2 estiver disponível), executado no loop
+    compartilhado de features.event_loop. Sem httpx, as requisições caem na
+    sessão síncrona do balanceador em threads do loop, mantendo a mesma
+    interface. Repete a requisição em 502/503/504, como o Retry da sessão.
+    """
+
+    def __init__(self, monitor, max_conexoes=F5_MAX_CONEXOES, max_keepalive=F5_MAX_KEEPALIVE, timeout=F5_TIMEOUT):
+        self.monitor = monitor
+        self.max_conexoes = max_conexoes
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self._client = None
+        # Uso do pool assíncrono: requisições em andamento (inclui as que aguardam conexão), pico e total
+        self.em_uso = 0
+        self.pico = 0
+        self.requisicoes = 0
+
+    def _obter_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                verify=False,
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_conexoes,
+                    max_keepalive_connections=self.max_keepalive
+                )
+            )
+        return self._client
+
+    async def _enviar(self, method, url, json=None):
+        headers = dict(self.monitor.headers)
+        if httpx is not None:
+            # Sem httpx a medição fica no hook de resposta da sessão do balanceador
+            inicio = time.perf_counter()
+            try:
+                response = await self._obter_client().request(method, url, json=json, headers=headers)
+            except Exception as e:
+                incrementar("f5_erros_total", balanceador=self.monitor.name, endpoint=endpoint_f5(url), erro=type(e).__name__)
+                raise
+            registrar_requisicao("f5", method, endpoint_f5(url), time.perf_counter() - inicio, response.status_code,
+                                 balanceador=self.monitor.name)
+            return response
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(
+            self.monitor.http_session.request, method, url, json=json, headers=headers, verify=False, timeout=self.timeout
+        ))
+
+    async def request(self, method, url, json=None, tentativas=3):
+        # Sem httpx o Retry do adapter da sessão já repete as respostas 502/503/504
+        tentativas = tentativas if httpx is not None else 0
+        self.em_uso += 1
+        self.pico = max(self.pico, self.em_uso)
+        try:
+            for tentativa in range(tentativas + 1):
+                self.requisicoes += 1
+                response = await self._enviar(method, url, json=json)
+                if response.status_code not in (502, 503, 504) or tentativa == tentativas:
+                    return response
+                incrementar("f5_retentativas_total", balanceador=self.monitor.name, endpoint=endpoint_f5(url))
+                await asyncio.sleep(0.5 * (2 ** tentativa))
+        finally:
+            self.em_uso -= 1
+
+    def metricas(self):
+        metricas = {"em_uso": self.em_uso, "pico": self.pico, "requisicoes": self.requisicoes, "max_conexoes": self.max_conexoes}
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is not None and hasattr(pool, "connections"):
+            metricas["conexoes_abertas"] = len(pool.connections)
+        return metricas
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 class TokenManager:
     def __init__(self, f5_monitor):
         self.f5_monitor = f5_monitor
@@ -47,32 +165,40 @@ class TokenManager:
         
     def start(self):
         """Inicia o gerenciamento de tokens em background"""
-        self.background_task = threading.Thread(target=self._token_manager_loop, daemon=True)
-        self.background_task.start()
-        
+        self.running = True
+        self._agendar(0)
+
     def stop(self):
         """Para o gerenciamento de tokens"""
         self.running = False
         if self.background_task:
-            self.background_task.join(timeout=1)
-            
-    def _token_manager_loop(self):
-        """Loop em background para gerenciar tokens"""
-        while self.running:
-            try:
-                # Tenta obter novo token se necessário
-                self._refresh_tokens()
-                # Espera 5 minutos antes da próxima verificação
-                time.sleep(300)
-            except Exception as e:
-                logger.error(f"Erro no gerenciamento de token: {str(e)}")
-                time.sleep(60)  # Espera 1 minuto em caso de erro
-                
+            self.background_task.cancelar()
+
+    def _agendar(self, segundos):
+        # Timer do loop compartilhado: nenhuma thread fica dormindo entre as verificações
+        if self.running:
+            self.background_task = agendar_em(segundos, obter_pool("f5").submit, self._token_manager_ciclo)
+
+    def _token_manager_ciclo(self):
+        """Uma verificação de tokens; reagenda a próxima"""
+        try:
+            # Tenta obter novo token se necessário
+            self._refresh_tokens()
+            # Espera 5 minutos antes da próxima verificação
+            self._agendar(300)
+        except Exception as e:
+            logger.error(f"Erro no gerenciamento de token: {str(e)}")
+            self._agendar(60)  # Espera 1 minuto em caso de erro
+
     def _refresh_tokens(self):
-        """Atualiza os tokens quando necessário"""
+        """Atualiza os tokens quando necessário.
+
+        O lock só protege a troca dos tokens em memória: o POST de login (até 300s)
+        roda fora dele, para que get_valid_token nunca espere por uma renovação.
+        """
         with self.lock:
             current_time = time.time()
-            
+
             # Se não há token atual ou está próximo de expirar
             if not self.current_token or (self.current_expiry and current_time + 600 >= self.current_expiry):
                 if self.backup_token and self.backup_expiry and current_time + 300 < self.backup_expiry:
@@ -81,12 +207,19 @@ class TokenManager:
                     self.current_expiry = self.backup_expiry
                     self.backup_token = None
                     self.backup_expiry = None
-                    
-                # Obtém novo token de backup
-                self._get_new_backup_token()
-                
+                precisa_backup = True
+            else:
+                precisa_backup = False
+
+        if precisa_backup:
+            # Obtém novo token de backup
+            novo = self._get_new_backup_token()
+            if novo:
+                with self.lock:
+                    self.backup_token, self.backup_expiry = novo
+
     def _get_new_backup_token(self):
-        """Obtém um novo token de backup"""
+        """Obtém um novo token de backup: (token, expiração) ou None"""
         try:
             auth_url = f"{self.f5_monitor.base_url}/mgmt/shared/authn/login"
             payload = {
@@ -96,7 +229,7 @@ class TokenManager:
             }
 
             # Definir timeout maior para autenticação (atualizado para 300 segundos)
-            response = http_session.post(
+            response = self.f5_monitor.http_session.post(
                 auth_url,
                 json=payload,
                 headers={'Content-Type': 'application/json'},
@@ -105,8 +238,7 @@ class TokenManager:
             )
 
             if response.status_code == 200:
-                self.backup_token = response.json()['token']['token']
-                self.backup_expiry = time.time() + self.f5_monitor.token_refresh_interval
+                return response.json()['token']['token'], time.time() + self.f5_monitor.token_refresh_interval
 
         except requests.exceptions.ReadTimeout:
             logger.error(f"Timeout ao tentar obter token de backup em {self.f5_monitor.name} ({self.f5_monitor.base_url})")
@@ -114,6 +246,7 @@ class TokenManager:
             logger.error(f"Erro de conexão ao obter token de backup em {self.f5_monitor.name}: {str(e)}")
         except Exception as e:
             logger.error(f"Erro ao obter token de backup: {str(e)}")
+        return None
             
     def get_valid_token(self):
         """Retorna um token válido"""
@@ -129,7 +262,7 @@ class TokenManager:
         return None
 
 class F5Monitor:
-    def __init__(self, base_url, name):
+    def __init__(self, base_url, name, max_conexoes=F5_MAX_CONEXOES, max_keepalive=F5_MAX_KEEPALIVE):
         self.base_url = base_url
         self.name = name  # Nome do balanceador
         self.username = None  # Removida credencial fixa
@@ -141,8 +274,18 @@ class F5Monitor:
             'Content-Type': 'application/json',
         }
         self.token_manager = None
+        # Sessão e cliente assíncrono próprios: conexões TLS quentes por balanceador
+        self.http_session = get_http_session(pool_connections=1, pool_maxsize=max_conexoes)
+        self.http_session.hooks["response"].append(gancho_requests("f5", endpoint_f5, balanceador=name))
+        self.async_client = F5AsyncClient(self, max_conexoes=max_conexoes, max_keepalive=max_keepalive)
         # Controle de tentativas de reautenticação para evitar múltiplas tentativas
         self.reauth_attempts = 0
+        # Índice node -> balanceadores do F5Manager (atualizado pelas respostas deste balanceador)
+        self.indice_nodes = None
+
+    def _node_ausente(self, node_name):
+        if self.indice_nodes is not None:
+            self.indice_nodes.remover(self.name, node_name)
 
     def set_credentials(self, username, password):
         """Define as credenciais do usuário e autentica imediatamente"""
@@ -172,7 +315,7 @@ class F5Monitor:
                 'Content-Type': 'application/json',
                 'Authorization': f'Basic {base64.b64encode(f"{self.username}:{self.password}".encode()).decode()}'
             }
-            response = http_session.delete(url, headers=headers, verify=False)
+            response = self.http_session.delete(url, headers=headers, verify=False)
             if response.status_code in [200, 201, 204]:
                 logger.info(f"Tokens antigos limpos com sucesso no {self.name}")
                 return True
@@ -189,7 +332,7 @@ class F5Monitor:
                 'Content-Type': 'application/json',
                 'Authorization': f'Basic {base64.b64encode(f"{self.username}:{self.password}".encode()).decode()}'
             }
-            response = http_session.get(url, headers=headers, verify=False)
+            response = self.http_session.get(url, headers=headers, verify=False)
             if response.status_code == 200:
                 tokens = response.json().get('items', [])
                 for token in tokens:
@@ -197,7 +340,7 @@ class F5Monitor:
                         # Deletar token ativo
                         token_id = token.get('token')
                         delete_url = f"{url}/{token_id}"
-                        del_response = http_session.delete(delete_url, headers=headers, verify=False)
+                        del_response = self.http_session.delete(delete_url, headers=headers, verify=False)
                         if del_response.status_code in [200, 201, 204]:
                             logger.info(f"Sessão antiga removida no {self.name}")
             return True
@@ -223,6 +366,18 @@ class F5Monitor:
         logger.error(f"Token expirado ou inválido para {self.name}. Reinicie o programa para nova autenticação.")
         return False
 
+    async def ensure_valid_token_async(self):
+        """ensure_valid_token para os métodos assíncronos: nunca bloqueia o loop compartilhado.
+
+        Com o lock livre a checagem é imediata; se outra thread o segura, a espera
+        vai para o pool "f5" em vez de parar todos os balanceadores e timers do loop.
+        """
+        if self.token_manager.lock.acquire(blocking=False):
+            self.token_manager.lock.release()
+            return self.ensure_valid_token()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(obter_pool("f5"), self.ensure_valid_token)
+
     def get_auth_token(self):
         """Obter token de autenticação"""
         try:
@@ -242,7 +397,7 @@ class F5Monitor:
                 "loginProviderName": "tmos"
             }
 
-            response = http_session.post(
+            response = self.http_session.post(
                 auth_url,
                 json=payload,
                 headers=self.headers,
@@ -256,8 +411,9 @@ class F5Monitor:
                 self.headers['X-F5-Auth-Token'] = self.token
                 # CORREÇÃO: Salva também no TokenManager!
                 if self.token_manager:
-                    self.token_manager.current_token = self.token
-                    self.token_manager.current_expiry = self.token_expiry
+                    with self.token_manager.lock:
+                        self.token_manager.current_token = self.token
+                        self.token_manager.current_expiry = self.token_expiry
                 logger.info(f"Autenticação bem sucedida no {self.name}")
                 return True
 
@@ -270,35 +426,26 @@ class F5Monitor:
             return False
 
     def get_node_status(self, node_name):
+        return executar_sync(self.get_node_status_async(node_name))
+
+    async def get_node_status_async(self, node_name):
         try:
-            if not self.ensure_valid_token():
+            if not await self.ensure_valid_token_async():
                 logger.error(f"Falha na renovação do token para {self.name}")
                 return None
                 
             # Obter status do node
             url = f"{self.base_url}/mgmt/tm/ltm/node/{node_name}/stats"
             
-            response = http_session.get(
-                url,
-                headers=self.headers,
-                verify=False
-            )
+            response = await self.async_client.request("GET", url)
             
             if response.status_code == 200:
                 data = response.json()
                 stats = data['entries'][f'https://localhost/mgmt/tm/ltm/node/~Common~{node_name}/stats']['nestedStats']['entries']
-                enabled_state = stats['status.enabledState']['description']
-                # Obter conexões ativas
-                current_connections = stats.get('serverside.curConns', {}).get('value', 0)
-                
-                return {
-                    "servidor": node_name,
-                    "status": enabled_state,
-                    "found": True,
-                    "connections": current_connections  # Adicionado número de conexões
-                }
+                return self._status_do_node(node_name, stats)
             elif response.status_code == 404:
                 logger.warning(f"Node '{node_name}' não encontrado neste balanceador")
+                self._node_ausente(node_name)
                 return {"servidor": node_name, "status": "não encontrado", "found": False, "connections": 0}
             else:
                 logger.error(f"Erro ao consultar node: {response.status_code}")
@@ -310,25 +457,83 @@ class F5Monitor:
             logger.error(f"Erro na requisição: {str(e)}")
             return None
 
+    def _status_do_node(self, node_name, stats):
+        """Monta o dict de status no mesmo formato de get_node_status"""
+        return {
+            "servidor": node_name,
+            "status": stats['status.enabledState']['description'],
+            "found": True,
+            "connections": stats.get('serverside.curConns', {}).get('value', 0)
+        }
+
+    def get_nodes_status(self, node_names):
+        return executar_sync(self.get_nodes_status_async(node_names))
+
+    async def get_nodes_status_async(self, node_names):
+        """Status de vários nodes com uma única requisição ao balanceador.
+
+        Retorna dict nome -> status (mesmo formato de get_node_status) ou None
+        em caso de falha. Para um único node usa o endpoint individual, que
+        devolve um payload bem menor que a coleção completa.
+        """
+        node_names = list(dict.fromkeys(node_names))
+        if len(node_names) == 1:
+            status = await self.get_node_status_async(node_names[0])
+            return None if status is None else {node_names[0]: status}
+        try:
+            if not await self.ensure_valid_token_async():
+                logger.error(f"Falha na renovação do token para {self.name}")
+                return None
+
+            url = f"{self.base_url}/mgmt/tm/ltm/node/stats"
+
+            response = await self.async_client.request("GET", url)
+
+            if response.status_code != 200:
+                logger.error(f"Erro ao consultar stats dos nodes: {response.status_code}")
+                return None
+
+            # Indexa a coleção pelo nome do node (sem partição), ignorando maiúsculas/minúsculas
+            stats_por_nome = {}
+            for self_link, entry in response.json().get('entries', {}).items():
+                stats = entry.get('nestedStats', {}).get('entries', {})
+                tm_name = stats.get('tmName', {}).get('description') or self_link.rsplit('/', 2)[-2]
+                stats_por_nome[tm_name.replace('~', '/').rsplit('/', 1)[-1].lower()] = stats
+            # A coleção completa já traz todos os nodes: aproveita para renovar o índice
+            if self.indice_nodes is not None:
+                self.indice_nodes.atualizar(self.name, {nome.upper() for nome in stats_por_nome})
+
+            resultado = {}
+            for node_name in node_names:
+                stats = stats_por_nome.get(node_name.lower())
+                if stats and 'status.enabledState' in stats:
+                    resultado[node_name] = self._status_do_node(node_name, stats)
+                else:
+                    resultado[node_name] = {"servidor": node_name, "status": "não encontrado", "found": False, "connections": 0}
+            return resultado
+
+        except Exception as e:
+            logger.error(f"Erro na requisição: {str(e)}")
+            return None
+
     def force_offline_node(self, node_name):
+        return executar_sync(self.force_offline_node_async(node_name))
+
+    async def force_offline_node_async(self, node_name):
         try:
             # Verifica e renova o token se necessário
-            if not self.ensure_valid_token():
+            if not await self.ensure_valid_token_async():
                 logger.error(f"Falha na renovação do token para {self.name}")
                 return None
                 
             url = f"{self.base_url}/mgmt/tm/ltm/node/~Common~{node_name}"
             
-            response = http_session.patch(
-                url,
-                json={"session": "user-disabled", "state": "user-down"},
-                headers=self.headers,
-                verify=False
-            )
+            response = await self.async_client.request("PATCH", url, json={"session": "user-disabled", "state": "user-down"})
             
             if response.status_code in [200, 201]:
                 return {"servidor": node_name, "status": "disabled", "found": True}
             elif response.status_code == 404:
+                self._node_ausente(node_name)
                 return {"servidor": node_name, "status": "não encontrado", "found": False}
             else:
                 logger.error(f"Erro: {response.status_code}")
@@ -340,24 +545,23 @@ class F5Monitor:
             return {"servidor": node_name, "status": "erro", "found": False}
 
     def enable_node(self, node_name):
+        return executar_sync(self.enable_node_async(node_name))
+
+    async def enable_node_async(self, node_name):
         try:
             # Verifica e renova o token se necessário
-            if not self.ensure_valid_token():
+            if not await self.ensure_valid_token_async():
                 logger.error(f"Falha na renovação do token para {self.name}")
                 return None
                 
             url = f"{self.base_url}/mgmt/tm/ltm/node/~Common~{node_name}"
             
-            response = http_session.patch(
-                url,
-                json={"session": "user-enabled", "state": "user-up"},
-                headers=self.headers,
-                verify=False
-            )
+            response = await self.async_client.request("PATCH", url, json={"session": "user-enabled", "state": "user-up"})
             
             if response.status_code in [200, 201]:
                 return {"servidor": node_name, "status": "enabled", "found": True}
             elif response.status_code == 404:
+                self._node_ausente(node_name)
                 return {"servidor": node_name, "status": "não encontrado", "found": False}
             else:
                 logger.error(f"Erro: {response.status_code}")
@@ -368,32 +572,70 @@ class F5Monitor:
             logger.error(f"Erro ao habilitar node: {str(e)}")
             return {"servidor": node_name, "status": "erro", "found": False}
 
+    async def _get_pool_members_stats_async(self, pool_name):
+        """Stats de todos os membros do pool em uma única requisição (dict selfLink -> stats)"""
+        url = f"{self.base_url}/mgmt/tm/ltm/pool/~Common~{pool_name}/members/stats"
+        response = await self.async_client.request("GET", url)
+        if response.status_code != 200:
+            logger.warning(f"Stats em lote indisponível para o pool {pool_name} ({response.status_code}), consultando membro a membro")
+            return None
+        return {
+            self_link: entry.get('nestedStats', {}).get('entries', {})
+            for self_link, entry in response.json().get('entries', {}).items()
+        }
+
+    async def _get_pool_member_stats_async(self, pool_name, name):
+        """Stats de um único membro do pool (usado quando o lote não está disponível)"""
+        status_url = f"{self.base_url}/mgmt/tm/ltm/pool/~Common~{pool_name}/members/~Common~{name}/stats"
+        status_response = await self.async_client.request("GET", status_url)
+        if status_response.status_code != 200:
+            return None
+        status_data = status_response.json()
+        return status_data['entries'][f'https://localhost/mgmt/tm/ltm/pool/~Common~{pool_name}/members/~Common~{name}/stats']['nestedStats']['entries']
+
     def get_pool_members(self, pool_name):
+        return executar_sync(self.get_pool_members_async(pool_name))
+
+    async def get_pool_members_async(self, pool_name):
         try:
             # Verifica e renova o token se necessário
-            if not self.ensure_valid_token():
+            if not await self.ensure_valid_token_async():
                 logger.error(f"Falha na renovação do token para {self.name}")
                 return None
                 
             url = f"{self.base_url}/mgmt/tm/ltm/pool/~Common~{pool_name}/members"
-            response = http_session.get(url, headers=self.headers, verify=False)
+            response = await self.async_client.request("GET", url)
             
             if response.status_code == 200:
                 data = response.json()
                 members = []
+                items = data.get('items', [])
+
+                def link_stats(name):
+                    return f'https://localhost/mgmt/tm/ltm/pool/~Common~{pool_name}/members/~Common~{name}/stats'
+
+                # Uma requisição para os stats de todos os membros, cruzados em memória pelo selfLink
+                stats_por_link = (await self._get_pool_members_stats_async(pool_name) if items else None) or {}
+                # Membros ausentes do lote são consultados individualmente, em paralelo
+                faltantes = [m['name'] for m in items if 'name' in m and link_stats(m['name']) not in stats_por_link]
+                if faltantes:
+                    individuais = await asyncio.gather(
+                        *(self._get_pool_member_stats_async(pool_name, name) for name in faltantes),
+                        return_exceptions=True
+                    )
+                    for name, stats in zip(faltantes, individuais):
+                        if isinstance(stats, dict):
+                            stats_por_link[link_stats(name)] = stats
                 
-                for member in data.get('items', []):
+                for member in items:
                     try:
                         name = member['name']
                         address = member['address']
                         port = name.split(':')[1] if ':' in name else 'N/A'
                         
-                        status_url = f"{self.base_url}/mgmt/tm/ltm/pool/~Common~{pool_name}/members/~Common~{name}/stats"
-                        status_response = http_session.get(status_url, headers=self.headers, verify=False)
+                        stats = stats_por_link.get(link_stats(name))
                         
-                        if status_response.status_code == 200:
-                            status_data = status_response.json()
-                            stats = status_data['entries'][f'https://localhost/mgmt/tm/ltm/pool/~Common~{pool_name}/members/~Common~{name}/stats']['nestedStats']['entries']
+                        if stats:
                             availability = stats['status.availabilityState']['description']
                             enabled_state = stats['status.enabledState']['description']
                             
@@ -428,19 +670,18 @@ class F5Monitor:
             return None
 
     def get_available_pools(self):
+        return executar_sync(self.get_available_pools_async())
+
+    async def get_available_pools_async(self):
         try:
             # Verifica e renova o token se necessário
-            if not self.ensure_valid_token():
+            if not await self.ensure_valid_token_async():
                 logger.error(f"Falha na renovação do token para {self.name}")
                 return None
                 
             url = f"{self.base_url}/mgmt/tm/ltm/pool"
             
-            response = http_session.get(
-                url,
-                headers=self.headers,
-                verify=False
-            )
+            response = await self.async_client.request("GET", url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -459,6 +700,66 @@ class F5Monitor:
             logger.error(f"Erro ao listar pools: {str(e)}")
             return None
 
+    def get_pools_por_node(self):
+        return executar_sync(self.get_pools_por_node_async())
+
+    async def get_pools_por_node_async(self):
+        """Mapa node -> [pools em que é membro], em uma única requisição (expandSubcollections)"""
+        try:
+            if not await self.ensure_valid_token_async():
+                logger.error(f"Falha na renovação do token para {self.name}")
+                return None
+
+            url = f"{self.base_url}/mgmt/tm/ltm/pool?expandSubcollections=true"
+            response = await self.async_client.request("GET", url)
+
+            if response.status_code == 200:
+                pools_por_node = {}
+                for pool in response.json().get('items', []):
+                    membros = pool.get('membersReference', {}).get('items', [])
+                    for membro in membros:
+                        # Membro no formato NODE:porta
+                        node = membro.get('name', '').split(':')[0].upper()
+                        if node:
+                            pools_por_node.setdefault(node, []).append(pool['name'])
+                return pools_por_node
+            else:
+                logger.error(f"Erro ao listar membros dos pools: {response.status_code}")
+                return None
+
+        except Exception as e:
+            logger.error(f"Erro ao listar membros dos pools: {str(e)}")
+            return None
+
+    def get_node_names(self):
+        return executar_sync(self.get_node_names_async())
+
+    async def get_node_names_async(self):
+        """Nomes (em maiúsculas) de todos os nodes do balanceador, ou None em caso de falha"""
+        try:
+            if not await self.ensure_valid_token_async():
+                logger.error(f"Falha na renovação do token para {self.name}")
+                return None
+
+            url = f"{self.base_url}/mgmt/tm/ltm/node?$select=name"
+            response = await self.async_client.request("GET", url)
+
+            if response.status_code == 200:
+                return {item['name'].upper() for item in response.json().get('items', []) if item.get('name')}
+            logger.error(f"Erro ao listar nodes do {self.name}: {response.status_code}")
+            return None
+
+        except Exception as e:
+            logger.error(f"Erro ao listar nodes do {self.name}: {str(e)}")
+            return None
+
+    def metricas_pool(self):
+        """Uso dos pools de conexão deste balanceador (sessão síncrona e cliente assíncrono)"""
+        return {
+            "sync": metricas_http_session(self.http_session),
+            "async": self.async_client.metricas()
+        }
+
     def log_action(self, action, details):
         """Registra ações com timestamp e nome do balanceador"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -469,7 +770,7 @@ class F5Monitor:
         try:
             if self.token:
                 url = f"{self.base_url}/mgmt/shared/authz/tokens/{self.token}"
-                response = http_session.delete(url, headers=self.headers, verify=False)
+                response = self.http_session.delete(url, headers=self.headers, verify=False)
                 if response.status_code in [200, 201, 204]:
                     logger.info(f"Logout realizado com sucesso no {self.name}")
                 self.token = None
@@ -478,20 +779,18 @@ class F5Monitor:
             logger.error(f"Erro ao fazer logout no {self.name}: {str(e)}")
 
     def force_offline_pool_member(self, pool_name, member_name):
+        return executar_sync(self.force_offline_pool_member_async(pool_name, member_name))
+
+    async def force_offline_pool_member_async(self, pool_name, member_name):
         """Força um membro do pool para offline"""
         try:
-            if not self.ensure_valid_token():
+            if not await self.ensure_valid_token_async():
                 logger.error(f"Falha na renovação do token para {self.name}")
                 return None
                 
             url = f"{self.base_url}/mgmt/tm/ltm/pool/~Common~{pool_name}/members/~Common~{member_name}"
             
-            response = http_session.patch(
-                url,
-                json={"session": "user-disabled", "state": "user-down"},
-                headers=self.headers,
-                verify=False
-            )
+            response = await self.async_client.request("PATCH", url, json={"session": "user-disabled", "state": "user-down"})
             
             if response.status_code in [200, 201]:
                 return {
@@ -513,20 +812,18 @@ class F5Monitor:
             return None
 
     def enable_pool_member(self, pool_name, member_name):
+        return executar_sync(self.enable_pool_member_async(pool_name, member_name))
+
+    async def enable_pool_member_async(self, pool_name, member_name):
         """Habilita um membro do pool"""
         try:
-            if not self.ensure_valid_token():
+            if not await self.ensure_valid_token_async():
                 logger.error(f"Falha na renovação do token para {self.name}")
                 return None
                 
             url = f"{self.base_url}/mgmt/tm/ltm/pool/~Common~{pool_name}/members/~Common~{member_name}"
             
-            response = http_session.patch(
-                url,
-                json={"session": "user-enabled", "state": "user-up"},
-                headers=self.headers,
-                verify=False
-            )
+            response = await self.async_client.request("PATCH", url, json={"session": "user-enabled", "state": "user-up"})
             
             if response.status_code in [200, 201]:
                 return {
@@ -547,9 +844,121 @@ class F5Monitor:
             logger.error(f"Erro ao habilitar membro do pool: {str(e)}")
             return None
 
+async def executar_em_balancers(balancers, operacao, *args, **kwargs):
+    """Executa a coroutine operacao(balancer, ...) em todos os balanceadores ao mesmo tempo.
+
+    Retorna [(balancer, resultado_ou_excecao), ...] na ordem recebida.
+    """
+    resultados = await asyncio.gather(
+        *(operacao(balancer, *args, **kwargs) for balancer in balancers),
+        return_exceptions=True
+    )
+    return list(zip(balancers, resultados))
+
+# Validade de cada entrada do índice node -> balanceadores
+INDICE_NODES_TTL = 600
+# Node desconhecido força recarga só dos balanceadores carregados há mais que isso
+INDICE_NODES_RECARGA_MINIMA = 30
+
+class IndiceNodes:
+    """Índice de quais balanceadores possuem cada node.
+
+    Cada balanceador é carregado com uma única listagem de nodes e renovado de
+    forma independente: entradas vencidas continuam valendo enquanto a nova
+    listagem roda em background. Um balanceador cuja listagem falhou entra
+    sempre no resultado (na dúvida, consulta). Node que não aparece em nenhum
+    balanceador provoca uma recarga das entradas mais antigas que
+    INDICE_NODES_RECARGA_MINIMA, cobrindo nodes criados depois da carga.
+
+    O TTL só vale para consultas de leitura (status). Operações que alteram o
+    node (isolar/habilitar) pedem atualizar=True: antes de filtrar, toda entrada
+    mais antiga que INDICE_NODES_RECARGA_MINIMA é recarregada, e um node que
+    continua sem balanceador é enviado a todos (o F5 responde 404 onde não existe).
+    Os métodos assíncronos rodam no loop compartilhado.
+    """
+
+    def __init__(self, ttl=INDICE_NODES_TTL, recarga_minima=INDICE_NODES_RECARGA_MINIMA):
+        self.ttl = ttl
+        self.recarga_minima = recarga_minima
+        self._lock = threading.Lock()
+        self._por_balancer = {}  # nome do balanceador -> (carregado_em, {NODES})
+        self._cargas = {}  # nome do balanceador -> Task da listagem em andamento
+
+    def atualizar(self, balancer_name, nodes):
+        with self._lock:
+            self._por_balancer[balancer_name] = (time.time(), set(nodes))
+
+    def remover(self, balancer_name, node_name):
+        """Node que o balanceador respondeu como inexistente (404)"""
+        with self._lock:
+            entrada = self._por_balancer.get(balancer_name)
+            if entrada:
+                entrada[1].discard(node_name.upper())
+
+    def invalidar(self, balancer_name=None):
+        with self._lock:
+            if balancer_name is None:
+                self._por_balancer.clear()
+            else:
+                self._por_balancer.pop(balancer_name, None)
+
+    async def _carregar(self, balancer):
+        nodes = await balancer.get_node_names_async()
+        if nodes is not None:
+            self.atualizar(balancer.name, nodes)
+
+    def _iniciar_carga(self, balancer):
+        # Uma listagem por balanceador por vez, compartilhada por quem pedir
+        tarefa = self._cargas.get(balancer.name)
+        if tarefa is None or tarefa.done():
+            tarefa = asyncio.ensure_future(self._carregar(balancer))
+            self._cargas[balancer.name] = tarefa
+        return tarefa
+
+    def _idades(self, balancers):
+        agora = time.time()
+        with self._lock:
+            return {
+                b.name: (agora - self._por_balancer[b.name][0]) if b.name in self._por_balancer else None
+                for b in balancers
+            }
+
+    def _filtrar(self, balancers, nodes):
+        with self._lock:
+            return [
+                b for b in balancers
+                if b.name not in self._por_balancer or not nodes.isdisjoint(self._por_balancer[b.name][1])
+            ]
+
+    async def balancers_dos_nodes_async(self, balancers, node_names, atualizar=False):
+        """Balanceadores (na ordem recebida) que possuem ao menos um dos nodes"""
+        nodes = {n.upper() for n in node_names}
+        idades = self._idades(balancers)
+        if atualizar:
+            # Operação destrutiva: índice recente antes de decidir, e nunca pular por falta de entrada
+            recarregar = [b for b in balancers if idades[b.name] is None or idades[b.name] >= self.recarga_minima]
+            if recarregar:
+                await asyncio.gather(*(self._iniciar_carga(b) for b in recarregar), return_exceptions=True)
+            return self._filtrar(balancers, nodes) or list(balancers)
+        faltando = [b for b in balancers if idades[b.name] is None]
+        for b in balancers:
+            if idades[b.name] is not None and idades[b.name] >= self.ttl:
+                self._iniciar_carga(b)
+        if faltando:
+            await asyncio.gather(*(self._iniciar_carga(b) for b in faltando), return_exceptions=True)
+
+        relevantes = self._filtrar(balancers, nodes)
+        if not relevantes:
+            recarregar = [b for b in balancers if idades[b.name] is not None and idades[b.name] >= self.recarga_minima]
+            if recarregar:
+                await asyncio.gather(*(self._iniciar_carga(b) for b in recarregar), return_exceptions=True)
+                relevantes = self._filtrar(balancers, nodes)
+        return relevantes
+
 class F5Manager:
-    def __init__(self):
-        self.balancers = [
+    def __init__(self, balancers=None):
+        # Lista própria de balanceadores (ex.: simuladores dos benchmarks); padrão: os de produção
+        self.balancers = balancers or [
             F5Monitor("https://bigip01-cyoi.sicoob.com.br", "BIGIP-CYOI"),
             F5Monitor("https://bigip01-ccs.sicoob.com.br", "BIGPI02-CCS"),
             F5Monitor("https://bigp2007.sicoob.com.br", "BIGP2007"),
@@ -557,6 +966,10 @@ class F5Manager:
             F5Monitor("https://bigp2006.sicoob.com.br", "BIGP2006"),
             F5Monitor("https://bigp4006.sicoob.com.br", "BIGP4006")
         ]
+        self.indice_nodes = IndiceNodes()
+        for balancer in self.balancers:
+            balancer.indice_nodes = self.indice_nodes
+        registrar_coletor(self._coletar_metricas)
         self.authenticated_balancers = []
         self.running = True
         self.max_workers = 10
@@ -589,6 +1002,37 @@ class F5Manager:
             except Exception as e:
                 print(f"[{balancer.name}] Erro ao reautenticar: {e}")
 
+    def balancers_do_node(self, node_name, atualizar=False):
+        return executar_sync(self.balancers_dos_nodes_async([node_name], atualizar=atualizar))
+
+    def balancers_dos_nodes(self, node_names, atualizar=False):
+        return executar_sync(self.balancers_dos_nodes_async(node_names, atualizar=atualizar))
+
+    async def balancers_dos_nodes_async(self, node_names, atualizar=False):
+        """Balanceadores autenticados que possuem ao menos um dos nodes (pelo índice).
+
+        atualizar=True para operações que alteram o node: ver IndiceNodes.
+        """
+        return await self.indice_nodes.balancers_dos_nodes_async(list(self.authenticated_balancers), node_names,
+                                                                 atualizar=atualizar)
+
+    def metricas_pools(self):
+        """Uso dos pools de conexão HTTP de todos os balanceadores (nome -> métricas)"""
+        return {balancer.name: balancer.metricas_pool() for balancer in self.balancers}
+
+    def _coletar_metricas(self):
+        """Gauges do endpoint de métricas: uso dos clientes HTTP e dos pools de threads"""
+        gauges = []
+        for balancer in self.balancers:
+            cliente = balancer.async_client
+            gauges.append(("f5_requisicoes_em_andamento", {"balanceador": balancer.name}, cliente.em_uso))
+            gauges.append(("f5_requisicoes_pico", {"balanceador": balancer.name}, cliente.pico))
+        for nome, estatisticas in estatisticas_pools().items():
+            gauges.append(("pool_em_fila", {"pool": nome}, estatisticas["em_fila"]))
+            gauges.append(("pool_em_execucao", {"pool": nome}, estatisticas["em_execucao"]))
+            gauges.append(("pool_limite", {"pool": nome}, estatisticas["limite"]))
+        return gauges
+
     def signal_handler(self, signum, frame):
         print("\n\nEncerrando programa...")
         self.running = False
@@ -599,19 +1043,23 @@ class F5Manager:
         for balancer in self.authenticated_balancers:
             balancer.stop_token_manager()
             balancer.logout()
+        for balancer in self.balancers:
+            try:
+                executar_sync(balancer.async_client.aclose(), timeout=5)
+            except Exception:
+                pass
         self.authenticated_balancers = []
 
     async def _auth_balancer(self, balancer):
         """Autentica um balanceador com timeout"""
         try:
             loop = asyncio.get_event_loop()
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                # Executa a autenticação com timeout
-                result = await asyncio.wait_for(
-                    loop.run_in_executor(executor, balancer.get_auth_token),
-                    timeout=self.auth_timeout
-                )
-                return balancer, result
+            # Executa a autenticação com timeout no pool compartilhado do F5
+            result = await asyncio.wait_for(
+                loop.run_in_executor(obter_pool("f5"), balancer.get_auth_token),
+                timeout=self.auth_timeout
+            )
+            return balancer, result
         except asyncio.TimeoutError:
             logger.warning(f"Timeout na autenticação do {balancer.name}")
             return balancer, False
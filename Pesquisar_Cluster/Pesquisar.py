@@ -1,38 +1,485 @@
+import os
+import json
+import hashlib
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
 
-# Função para obter os dados dos clusters e hosts de PRODUCAO
-def obter_maquinas_producao():
-    url = "https://delivery.sicoob.com.br/sicoob-entrega-continua/configuracoes-clusters?count=1000&page=1"
-    response = requests.get(url)
-    data = response.json()
-    
-    clusters_maquinas_producao = []
-    
-    for cluster in data["resultado"]["dados"]:
+logger = logging.getLogger("pesquisar")
+
+URL_CLUSTERS = "https://delivery.sicoob.com.br/sicoob-entrega-continua/configuracoes-clusters"
+
+# Paginação do catálogo: tamanho de cada página e quantas páginas são baixadas ao mesmo tempo
+TAMANHO_PAGINA = 1000
+PAGINAS_EM_PARALELO = 4
+# Campo de "resultado" com o total de páginas para o count pedido
+CAMPO_TOTAL_PAGINAS = "totalPaginas"
+# Respostas a uma página além do fim do catálogo (o total pode mudar entre as requisições)
+_FORA_DO_CATALOGO = (204, 400, 404)
+
+# Tempo (segundos) que o inventário fica em memória antes de ser baixado novamente
+INVENTARIO_TTL = 900
+
+# Snapshot local do inventário, compartilhado por todos os consoles (ao lado do credenciais.txt)
+ARQUIVO_SNAPSHOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "inventario_clusters.json")
+
+def _clusters_producao(dados):
+    """Converte os clusters de uma página no formato usado pelo inventário (apenas PRODUCAO)"""
+    for cluster in dados:
         nome_cluster = cluster.get("nomeCluster")
         hosts_producao = [host.get("hostname") for host in cluster.get("hosts", []) if host.get("ambiente") == "PRODUCAO"]
-        
+
         if hosts_producao:
-            clusters_maquinas_producao.append({
+            yield {
                 "nomeCluster": nome_cluster,
                 "hostsProducao": hosts_producao
-            })
-    
-    return clusters_maquinas_producao
+            }
 
-# Função de pesquisa usando os dados do endpoint
-def pesquisar(Numero):
-    # Obter os dados de produção dos clusters
-    maquinas_producao = obter_maquinas_producao()
-    
-    # Procurar pelo número da máquina nos hosts de PRODUCAO
-    for cluster in maquinas_producao:
+def _hash_clusters(clusters):
+    return hashlib.sha256(json.dumps(clusters, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _get_pagina(pagina, tamanho_pagina=TAMANHO_PAGINA, headers=None, timeout=60):
+    """Baixa uma página do catálogo. Retorna (response, resultado); resultado é None em 304"""
+    response = requests.get(
+        URL_CLUSTERS,
+        params={"count": tamanho_pagina, "page": pagina},
+        headers=headers or {},
+        timeout=timeout
+    )
+    if response.status_code == 304:
+        return response, None
+    if pagina > 1 and response.status_code in _FORA_DO_CATALOGO:
+        # Página além do fim: tratada como página vazia, que encerra o catálogo
+        return response, {"dados": []}
+    response.raise_for_status()
+    return response, response.json()["resultado"]
+
+def _total_paginas(resultado):
+    """Total de páginas informado pela API (CAMPO_TOTAL_PAGINAS), ou None"""
+    total = resultado.get(CAMPO_TOTAL_PAGINAS)
+    return total if isinstance(total, int) and total > 0 else None
+
+def iterar_clusters_producao(tamanho_pagina=TAMANHO_PAGINA, paralelo=PAGINAS_EM_PARALELO, primeira=None):
+    """Gerador dos clusters de PRODUCAO na ordem do catálogo, página a página.
+
+    As próximas páginas, até o total informado pela API, são baixadas em
+    paralelo enquanto a atual é consumida; página incompleta, vazia ou além do
+    fim encerra o catálogo. Quem parar de iterar (ex.: pesquisa que já encontrou o host) cancela os
+    downloads pendentes. `primeira` permite reaproveitar a página 1 já baixada.
+    """
+    if primeira is None:
+        _, primeira = _get_pagina(1, tamanho_pagina)
+    dados = primeira.get("dados") or []
+    yield from _clusters_producao(dados)
+    if len(dados) < tamanho_pagina:
+        return
+
+    total = _total_paginas(primeira)
+    # Sem o total, a próxima página só é pedida quando a atual vem completa (nada especulativo)
+    paralelo = paralelo if total is not None else 1
+    executor = ThreadPoolExecutor(max_workers=paralelo)
+    pendentes = deque()
+    proxima = 2
+
+    def agendar():
+        nonlocal proxima
+        while len(pendentes) < paralelo and (total is None or proxima <= total):
+            pendentes.append(executor.submit(_get_pagina, proxima, tamanho_pagina))
+            proxima += 1
+
+    try:
+        agendar()
+        while pendentes:
+            _, resultado = pendentes.popleft().result()
+            dados = resultado.get("dados") or []
+            # Página incompleta ou vazia é a última: as demais já agendadas são descartadas
+            completa = len(dados) >= tamanho_pagina
+            if completa:
+                agendar()
+            yield from _clusters_producao(dados)
+            if not completa:
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def baixar_catalogo(etag=None, last_modified=None, timeout=60, ao_receber=None):
+    """Download condicional do catálogo de clusters (todas as páginas).
+
+    Retorna (clusters, meta). clusters é None quando o servidor responde 304
+    (conteúdo não mudou desde o ETag/Last-Modified informado). O ETag só é
+    guardado quando o catálogo cabe em uma página; com várias páginas a
+    comparação é feita pelo hash do conteúdo. ao_receber(cluster) é chamado
+    para cada cluster assim que a página dele chega.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response, primeira = _get_pagina(1, headers=headers, timeout=timeout)
+    meta = {
+        "etag": response.headers.get("ETag") or etag,
+        "last_modified": response.headers.get("Last-Modified") or last_modified,
+    }
+    if primeira is None:
+        return None, meta
+    if len(primeira.get("dados") or []) >= TAMANHO_PAGINA:
+        meta = {"etag": None, "last_modified": None}
+    clusters = []
+    for cluster in iterar_clusters_producao(primeira=primeira):
+        clusters.append(cluster)
+        if ao_receber:
+            ao_receber(cluster)
+    meta["hash"] = _hash_clusters(clusters)
+    return clusters, meta
+
+# Função para obter os dados dos clusters e hosts de PRODUCAO
+def obter_maquinas_producao():
+    clusters, _ = baixar_catalogo()
+    return clusters
+
+def pesquisar_no_catalogo(numero, clusters=None):
+    """Pesquisa direto no catálogo, parando assim que o hostname exato é encontrado.
+
+    Sem nome exato, retorna o primeiro host que contém o termo (como o índice
+    do InventarioClusters). Retorna (host, cluster) ou (None, None).
+    """
+    termo = numero.strip().lower()
+    parcial = (None, None)
+    for cluster in clusters if clusters is not None else iterar_clusters_producao():
         for host in cluster["hostsProducao"]:
-            if Numero.lower() in host.lower():
-                # Retornar o host encontrado e o cluster ao qual ele pertence
+            if not host:
+                continue
+            host_min = host.lower()
+            if host_min == termo or host_min.split(".", 1)[0] == termo:
                 return host, cluster["nomeCluster"]
-    
+            if parcial[0] is None and termo in host_min:
+                parcial = (host, cluster["nomeCluster"])
+    return parcial
+
+class SnapshotInventario:
+    """Arquivo JSON com o último inventário baixado e os metadados da requisição"""
+
+    def __init__(self, caminho=ARQUIVO_SNAPSHOT):
+        self.caminho = caminho
+
+    def ler(self):
+        try:
+            with open(self.caminho, encoding="utf-8") as f:
+                dados = json.load(f)
+            if isinstance(dados.get("clusters"), list) and dados.get("atualizado_em"):
+                return dados
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Snapshot do inventário inválido ({self.caminho}): {e}")
+        return None
+
+    def salvar(self, dados):
+        # Escrita atômica: outros consoles nunca leem um arquivo pela metade
+        tmp = f"{self.caminho}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.caminho)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o snapshot do inventário: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+class _CargaParcial:
+    """Clusters de uma carga do catálogo em andamento, na ordem em que chegam.
+
+    Quem pesquisa com o inventário vazio itera sobre ela enquanto o download
+    continua; a iteração termina quando a carga termina (com ou sem sucesso).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._clusters = []
+        self._fim = False
+
+    def adicionar(self, cluster):
+        with self._cond:
+            self._clusters.append(cluster)
+            self._cond.notify_all()
+
+    def encerrar(self):
+        with self._cond:
+            self._fim = True
+            self._cond.notify_all()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self._clusters) and not self._fim:
+                    self._cond.wait()
+                if i >= len(self._clusters):
+                    return
+                cluster = self._clusters[i]
+            i += 1
+            yield cluster
+
+def _trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+class InventarioClusters:
+    """Cache do inventário de PRODUCAO compartilhado pelo processo.
+
+    O inventário é baixado uma única vez por TTL (mesmo com várias threads
+    pesquisando ao mesmo tempo) e indexado em um dict hostname -> cluster e
+    em um índice de trigramas para a busca por trecho do nome. Uma cópia fica
+    em disco (SnapshotInventario) para que novos consoles iniciem sem esperar
+    o catálogo; cópias vencidas são usadas enquanto a atualização roda em
+    background com requisição condicional (ETag/If-Modified-Since).
+    """
+
+    def __init__(self, ttl=INVENTARIO_TTL, baixar=baixar_catalogo, snapshot=None):
+        self.ttl = ttl
+        self._baixar = baixar
+        self.snapshot = snapshot
+        self._lock = threading.Lock()
+        self._lock_carga = threading.Lock()
+        self._carregado_em = None
+        self._meta = {}
+        self._meta_hash_memoria = None  # hash do conteúdo indexado em memória
+        self._atualizando = False
+        self._carga = None      # Event da atualização em andamento (set ao terminar, com ou sem sucesso)
+        self._parcial = None    # _CargaParcial com os clusters já recebidos pela atualização em andamento
+        self._clusters = []
+        self._hosts = []        # [(host_minusculo, host, cluster)] na ordem do catálogo
+        self._por_nome = {}     # hostname (completo ou curto) -> posição em _hosts
+        self._indice = {}       # trigrama -> [posições em _hosts]
+        self._consultas = {}    # termo pesquisado -> (host, cluster)
+
+    def _expirado(self):
+        return self._carregado_em is None or time.time() - self._carregado_em >= self.ttl
+
+    def atualizar(self, clusters, carregado_em=None):
+        """Substitui o inventário em memória e reconstrói os índices"""
+        hosts = []
+        por_nome = {}
+        indice = {}
+        for cluster in clusters:
+            for host in cluster["hostsProducao"]:
+                if not host:
+                    continue
+                pos = len(hosts)
+                host_min = host.lower()
+                hosts.append((host_min, host, cluster["nomeCluster"]))
+                por_nome.setdefault(host_min, pos)
+                por_nome.setdefault(host_min.split(".", 1)[0], pos)
+                for tri in _trigramas(host_min):
+                    indice.setdefault(tri, []).append(pos)
+
+        with self._lock:
+            self._clusters = clusters
+            self._hosts = hosts
+            self._por_nome = por_nome
+            self._indice = indice
+            self._consultas = {}
+            self._carregado_em = carregado_em or time.time()
+
+    def invalidar(self):
+        """Força novo download na próxima pesquisa"""
+        with self._lock:
+            self._carregado_em = None
+
+    def _carregar_snapshot(self):
+        """Carrega o snapshot do disco se for mais novo que o inventário em memória"""
+        dados = self.snapshot.ler() if self.snapshot else None
+        if not dados or (self._carregado_em and dados["atualizado_em"] <= self._carregado_em):
+            return False
+        self._meta = {k: dados.get(k) for k in ("etag", "last_modified", "hash")}
+        if self._hosts and dados.get("hash") and dados.get("hash") == self._meta_hash_memoria:
+            with self._lock:
+                self._carregado_em = dados["atualizado_em"]
+        else:
+            self.atualizar(dados["clusters"], carregado_em=dados["atualizado_em"])
+            self._meta_hash_memoria = dados.get("hash")
+        return True
+
+    def _atualizar_do_catalogo(self, parcial=None):
+        """Baixa o catálogo (condicional) e grava o snapshot. Chamar com _lock_carga.
+
+        parcial: _CargaParcial que recebe os clusters à medida que as páginas chegam.
+        """
+        # Outro console pode ter acabado de atualizar o snapshot
+        if self._carregar_snapshot() and not self._expirado():
+            return
+        try:
+            clusters, meta = self._baixar(
+                etag=self._meta.get("etag") if self._hosts else None,
+                last_modified=self._meta.get("last_modified") if self._hosts else None,
+                ao_receber=parcial.adicionar if parcial else None,
+            )
+        except Exception as e:
+            if not self._hosts:
+                raise
+            # Mantém o inventário antigo se o catálogo estiver indisponível (nova tentativa em 1 minuto)
+            logger.warning(f"Falha ao atualizar inventário de clusters, usando cópia em memória: {e}")
+            with self._lock:
+                self._carregado_em = time.time() - self.ttl + 60
+            return
+
+        agora = time.time()
+        if clusters is None or (meta.get("hash") and meta.get("hash") == self._meta_hash_memoria):
+            # 304 ou mesmo conteúdo: só renova a validade, sem reindexar
+            meta["hash"] = self._meta_hash_memoria
+            with self._lock:
+                self._carregado_em = agora
+            clusters = self._clusters
+        else:
+            self.atualizar(clusters, carregado_em=agora)
+            self._meta_hash_memoria = meta.get("hash")
+        self._meta = meta
+        if self.snapshot:
+            self.snapshot.salvar(dict(meta, atualizado_em=agora, clusters=clusters))
+
+    def _executar_atualizacao(self, parcial):
+        try:
+            with self._lock_carga:
+                if self._expirado():
+                    self._atualizar_do_catalogo(parcial)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar inventário de clusters: {e}")
+        finally:
+            with self._lock:
+                self._atualizando = False
+                self._parcial = None
+                carga = self._carga
+            parcial.encerrar()
+            carga.set()
+
+    def _disparar_atualizacao(self):
+        """(Event da atualização em andamento, True se esta chamada a iniciou)"""
+        with self._lock:
+            if self._atualizando:
+                return self._carga, False
+            self._atualizando = True
+            self._carga = carga = threading.Event()
+            self._parcial = parcial = _CargaParcial()
+        threading.Thread(target=self._executar_atualizacao, args=(parcial,), daemon=True).start()
+        return carga, True
+
+    def atualizar_em_background(self):
+        """Dispara a atualização do inventário sem bloquear quem chamou"""
+        self._disparar_atualizacao()
+
+    def carregar_em_background(self):
+        """Usado na inicialização: lê o snapshot do disco e atualiza o catálogo em background"""
+        with self._lock_carga:
+            self._carregar_snapshot()
+        if self._expirado():
+            self.atualizar_em_background()
+
+    def garantir_carregado(self):
+        """Garante inventário disponível; cópias vencidas são atualizadas em background"""
+        if not self._expirado():
+            return
+        if self._hosts:
+            self.atualizar_em_background()
+            return
+        with self._lock_carga:
+            if self._hosts:
+                return
+            if not self._carregar_snapshot():
+                self._atualizar_do_catalogo()
+                return
+        if self._expirado():
+            self.atualizar_em_background()
+
+    def clusters(self):
+        self.garantir_carregado()
+        return self._clusters
+
+    def hosts_do_cluster(self, nome_cluster):
+        """Hosts de PRODUCAO do cluster, na ordem do catálogo"""
+        self.garantir_carregado()
+        with self._lock:
+            return [host for _, host, cluster in self._hosts if cluster == nome_cluster]
+
+    def _buscar_indice(self, termo):
+        hosts = self._hosts
+        pos = self._por_nome.get(termo)
+        if pos is not None:
+            return pos
+        if len(termo) < 3:
+            for pos, (host_min, _, _) in enumerate(hosts):
+                if termo in host_min:
+                    return pos
+            return None
+        postings = []
+        for tri in _trigramas(termo):
+            lista = self._indice.get(tri)
+            if not lista:
+                return None
+            postings.append(lista)
+        postings.sort(key=len)
+        candidatas = set(postings[0])
+        for lista in postings[1:]:
+            candidatas.intersection_update(lista)
+            if not candidatas:
+                return None
+        # Preserva a ordem do catálogo: retorna o primeiro host que contém o termo
+        for pos in sorted(candidatas):
+            if termo in hosts[pos][0]:
+                return pos
+        return None
+
+    def buscar(self, numero):
+        """Retorna (host, cluster) para o nome/trecho informado ou (None, None)"""
+        termo = numero.strip().lower()
+        if not self._hosts:
+            with self._lock:
+                carga, parcial = (self._carga, self._parcial) if self._atualizando else (None, None)
+            if carga is None:
+                # Lock ocupado: outra thread está carregando (catálogo ou snapshot); a atualização
+                # disparada abaixo espera por ela em vez de esta pesquisa ficar presa no lock
+                vazio = True
+                if self._lock_carga.acquire(blocking=False):
+                    try:
+                        vazio = not self._hosts and not self._carregar_snapshot()
+                    finally:
+                        self._lock_carga.release()
+                if vazio:
+                    carga, _ = self._disparar_atualizacao()
+                    with self._lock:
+                        parcial = self._parcial
+            if parcial is not None:
+                # Inventário vazio: pesquisa nos clusters da carga em andamento à medida que
+                # chegam, sem percorrer o catálogo de novo; o host exato dispensa esperar o resto
+                host, cluster = pesquisar_no_catalogo(termo, parcial)
+                if host:
+                    return host, cluster
+            if carga is not None:
+                carga.wait()
+        self.garantir_carregado()
+        with self._lock:
+            if termo in self._consultas:
+                return self._consultas[termo]
+            pos = self._buscar_indice(termo)
+            resultado = (None, None) if pos is None else self._hosts[pos][1:]
+            self._consultas[termo] = resultado
+            return resultado
+
+# Inventário compartilhado por todas as pesquisas do processo
+inventario = InventarioClusters(snapshot=SnapshotInventario())
+
+# Função de pesquisa usando os dados do endpoint
+def pesquisar(Numero):
+    # Procurar pelo número da máquina nos hosts de PRODUCAO (inventário em cache)
+    host, nome_cluster = inventario.buscar(Numero)
+    if host:
+        # Retornar o host encontrado e o cluster ao qual ele pertence
+        return host, nome_cluster
+
     # Se a máquina não for encontrada
     print(f"Máquina {Numero} não encontrada em PRODUCAO.")
     return None, None
-
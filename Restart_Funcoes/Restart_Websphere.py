@@ -1,7 +1,7 @@
-import requests
-import time
 import logging
 import os
+from Restart_Funcoes.jenkins_client import obter_cliente
+from Restart_Funcoes.queue_resolver import disparo_na_fila
 
 # Garante que o diretório de log exista
 if not os.path.exists('log'):
@@ -17,23 +17,19 @@ logging.basicConfig(
 )
 
 def _trigger_websphere_job(params, login, senha):
-    """Função interna para disparar o job do Websphere com parâmetros específicos."""
+    """Função interna para disparar o job do Websphere com parâmetros específicos.
+
+    Retorna o dicionário de disparo_na_fila (status QUEUED e queue_url) ou status ERROR.
+    """
     jenkins_url = 'https://deploy.sicoob.com.br/job/Restart/job/Websphere/job/websphere-cluster-action/buildWithParameters'
     try:
         logging.info(f"Disparando job do Websphere com parâmetros: {params}")
-        response = requests.post(jenkins_url, params=params, auth=(login, senha), verify=False)
+        response = obter_cliente(login, senha).disparar(jenkins_url, params=params)
 
         if response.status_code == 201:
             queue_url = response.headers.get('Location')
             logging.info(f"Build iniciado para: {params.get('SELECIONADOS') or params.get('NOMECLUSTER')}")
-            
-            max_attempts = 15
-            for _ in range(max_attempts):
-                job_url = get_job_url(queue_url, login, senha)
-                if job_url:
-                    return {"status": "STARTED", "message": "Build iniciado", "job_url": job_url}
-                time.sleep(2)
-            return {"status": "ERROR", "message": "Timeout aguardando URL do job"}
+            return disparo_na_fila(queue_url)
         else:
             return {"status": "ERROR", "message": f"Falha ao iniciar build: {response.status_code}"}
     except Exception as e:
@@ -70,29 +66,4 @@ def start_websphere(Modo, valor_cluster, valor_codigo, Login, Senha):
         'AMBIENTE': 'PRODUCAO',
         'SELECIONADOS': valor_codigo
     }
-    return _trigger_websphere_job(params, Login, Senha)
-
-def get_job_url(queue_url: str, login: str, senha: str) -> str:
-    """Obtém a URL do job a partir da URL da fila."""
-    try:
-        response = requests.get(queue_url + 'api/json', auth=(login, senha), verify=False)
-        if response.status_code == 200:
-            data = response.json()
-            if 'executable' in data and 'url' in data['executable']:
-                return data['executable']['url']
-    except:
-        pass
-    return None
-
-def check_job_status(job_url, login, senha):
-    """Verifica o status atual do job."""
-    try:
-        response = requests.get(job_url + 'api/json', auth=(login, senha), verify=False)
-        if response.status_code == 200:
-            job_info = response.json()
-            return {
-                "status": "RUNNING" if job_info.get('building', True) else job_info.get('result', 'UNKNOWN'),
-                "building": job_info.get('building', True)
-            }
-    except Exception as e:
-        return {"status": "ERROR", "building": False, "message": str(e)}
\ No newline at end of file
+    return _trigger_websphere_job(params, Login, Senha)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import logging
+from features.acompanhamento import Espera, AcompanhamentoEmLote, RegistroPorUsuario
+from Restart_Funcoes.jenkins_client import obter_cliente
+
+logger = logging.getLogger("build_poller")
+
+# Campos mínimos dos builds de um job; {0,N} limita aos N builds mais recentes
+TREE_BUILDS = "builds[number,building,result,url]{0,%d}"
+
+class _Acompanhamento(Espera):
+    def __init__(self, job_url, pasta, numero, timeout, on_update):
+        super().__init__((pasta, numero), timeout)
+        self.job_url = job_url
+        self.pasta = pasta
+        self.numero = numero
+        self.on_update = on_update
+        self.status = None
+
+def separar_build(job_url):
+    """'<pasta do job>/<número>/' -> ('<pasta do job>/', número)"""
+    pasta, numero = job_url.rstrip('/').rsplit('/', 1)
+    return pasta + '/', int(numero)
+
+class BuildPoller(AcompanhamentoEmLote):
+    """Acompanha todos os builds em andamento de um usuário do Jenkins.
+
+    A cada ciclo é feita uma única requisição por pasta de job, filtrada com
+    tree=builds[number,building,result,url], em vez de um GET completo por build.
+    Cada espera recebe um Future resolvido com {"status", "building", "url"}
+    quando o build termina, ou status TIMEOUT ao estourar o prazo.
+    """
+
+    def __init__(self, cliente, intervalo=5, builds_por_consulta=50):
+        super().__init__()
+        self.cliente = cliente
+        self.intervalo = intervalo
+        self.builds_por_consulta = builds_por_consulta
+
+    def acompanhar(self, job_url, timeout=600, on_update=None):
+        """Registra o build e retorna um Future[dict].
+
+        on_update(job_url, status) é chamado a cada ciclo enquanto o build roda.
+        """
+        pasta, numero = separar_build(self.cliente.url(job_url))
+        return self._registrar(_Acompanhamento(job_url, pasta, numero, timeout, on_update))
+
+    def _consultar_pasta(self, pasta, numeros):
+        """Status dos builds pedidos de uma pasta: {número: build}"""
+        response = self.cliente.get(pasta + 'api/json', params={"tree": TREE_BUILDS % self.builds_por_consulta})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code} em {pasta}")
+        builds = {b.get("number"): b for b in response.json().get("builds", [])}
+        for numero in numeros:
+            if numero not in builds:
+                # Build fora da janela dos mais recentes: consulta direta e enxuta
+                info = self.cliente.get_json(f"{pasta}{numero}/", params={"tree": "number,building,result,url"})
+                if info:
+                    builds[numero] = info
+        return builds
+
+    def _ciclo(self, acompanhamentos):
+        por_pasta = {}
+        for acompanhamento in acompanhamentos:
+            por_pasta.setdefault(acompanhamento.pasta, []).append(acompanhamento)
+
+        for pasta, lista in por_pasta.items():
+            try:
+                builds = self._consultar_pasta(pasta, [a.numero for a in lista])
+            except Exception as e:
+                # Falha temporária: tenta de novo no próximo ciclo até o prazo
+                logger.error(f"Erro ao consultar builds de {pasta}: {e}")
+                continue
+            for acompanhamento in lista:
+                build = builds.get(acompanhamento.numero)
+                if build is None:
+                    continue
+                building = build.get("building", True)
+                status = {
+                    "status": "RUNNING" if building else (build.get("result") or "UNKNOWN"),
+                    "building": building,
+                    "url": build.get("url", acompanhamento.job_url),
+                }
+                acompanhamento.status = status
+                if not building:
+                    self._finalizar(acompanhamento, status)
+                elif acompanhamento.on_update:
+                    try:
+                        acompanhamento.on_update(acompanhamento.job_url, status)
+                    except Exception as e:
+                        logger.error(f"Erro no callback do build {acompanhamento.job_url}: {e}")
+        return self.intervalo
+
+    def _resultado_timeout(self, acompanhamento):
+        return {"status": "TIMEOUT", "building": True, "url": acompanhamento.job_url}
+
+    def em_andamento(self):
+        """Builds acompanhados no momento e o último status conhecido"""
+        return {a.job_url: a.status for a in self._pendentes().values()}
+
+_pollers = RegistroPorUsuario(lambda login, senha: BuildPoller(obter_cliente(login, senha)))
+
+def obter_poller(login, senha):
+    """Poller compartilhado pelo processo para o usuário informado"""
+    return _pollers.obter(login, senha)
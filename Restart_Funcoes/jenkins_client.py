@@ -0,0 +1,106 @@
+import os
+import re
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+from features.metricas import gancho_requests, incrementar
+from features.acompanhamento import RegistroPorUsuario
+
+JENKINS_URL_PADRAO = 'https://deploy.sicoob.com.br'
+
+# Pode ser apontado para outra instância (ex.: ambiente de testes) pela variável JENKINS_URL
+JENKINS_URL = os.environ.get('JENKINS_URL', JENKINS_URL_PADRAO).rstrip('/')
+
+# Timeout padrão de todas as chamadas ao Jenkins: (conexão, leitura) em segundos
+TIMEOUT_PADRAO = (10, 30)
+
+def endpoint_jenkins(url):
+    """Caminho da URL sem query e com números de build/fila trocados por {n} (rótulo das métricas)"""
+    return re.sub(r"/\d+(?=/|$)", "/{n}", urlsplit(url).path)
+
+class JenkinsClient:
+    """Cliente HTTP compartilhado com o Jenkins.
+
+    Mantém uma sessão com pool de conexões (keep-alive entre disparos e
+    consultas de status), guarda o crumb CSRF e só o renova quando o Jenkins
+    responde 403, e aplica o mesmo timeout em todas as chamadas.
+    """
+
+    def __init__(self, login, senha, base_url=JENKINS_URL, timeout=TIMEOUT_PADRAO, pool_maxsize=20, verify=False):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (login, senha)
+        self.session.verify = verify
+        # Repete apenas GETs em 502/503/504; POST de disparo nunca é repetido automaticamente
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=frozenset({"GET"}))
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.hooks['response'].append(gancho_requests("jenkins", endpoint_jenkins))
+        self._crumb = None
+        self._crumb_lock = threading.Lock()
+
+    def url(self, caminho):
+        """Aceita URL completa ou caminho relativo à raiz do Jenkins"""
+        if caminho.startswith(JENKINS_URL_PADRAO):
+            return self.base_url + caminho[len(JENKINS_URL_PADRAO):]
+        if caminho.startswith('http://') or caminho.startswith('https://'):
+            return caminho
+        return f"{self.base_url}/{caminho.lstrip('/')}"
+
+    def _headers_crumb(self, renovar=False):
+        with self._crumb_lock:
+            if self._crumb is None or renovar:
+                self._crumb = {}
+                try:
+                    response = self.session.get(self.url('crumbIssuer/api/json'), timeout=self.timeout)
+                    if response.status_code == 200:
+                        crumb_data = response.json()
+                        if 'crumbRequestField' in crumb_data and 'crumb' in crumb_data:
+                            self._crumb = {crumb_data['crumbRequestField']: crumb_data['crumb']}
+                    else:
+                        logging.warning("Não foi possível obter o crumb do Jenkins. Tentando prosseguir sem ele.")
+                except requests.exceptions.RequestException as e:
+                    logging.warning(f"Erro ao obter o crumb do Jenkins: {e}")
+            return dict(self._crumb)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(self.url(url), **kwargs)
+
+    def get_json(self, url, **kwargs):
+        """GET em <url>api/json; retorna o JSON ou None se o status não for 200"""
+        url = self.url(url)
+        if not url.endswith('/'):
+            url += '/'
+        response = self.get(url + 'api/json', **kwargs)
+        if response.status_code == 200:
+            return response.json()
+        return None
+
+    def post(self, url, **kwargs):
+        """POST com crumb em cache; em 403 renova o crumb e tenta uma única vez mais"""
+        kwargs.setdefault('timeout', self.timeout)
+        extra_headers = kwargs.pop('headers', {}) or {}
+        response = self.session.post(self.url(url), headers={**self._headers_crumb(), **extra_headers}, **kwargs)
+        if response.status_code == 403:
+            incrementar("jenkins_retentativas_total", motivo="crumb")
+            response = self.session.post(self.url(url), headers={**self._headers_crumb(renovar=True), **extra_headers}, **kwargs)
+        return response
+
+    def disparar(self, caminho_job, params=None, data=None):
+        """Dispara buildWithParameters do job; retorna a resposta do Jenkins"""
+        url = self.url(caminho_job)
+        if not url.endswith('/buildWithParameters'):
+            url = url.rstrip('/') + '/buildWithParameters'
+        return self.post(url, params=params, data=data)
+
+_clientes = RegistroPorUsuario(lambda login, senha: JenkinsClient(login, senha))
+
+def obter_cliente(login, senha):
+    """Cliente compartilhado pelo processo para o usuário informado"""
+    return _clientes.obter(login, senha)
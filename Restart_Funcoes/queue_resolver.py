@@ -0,0 +1,140 @@
+import math
+import time
+import logging
+from features.acompanhamento import Espera, AcompanhamentoEmLote, RegistroPorUsuario
+from Restart_Funcoes.jenkins_client import obter_cliente
+
+logger = logging.getLogger("queue_resolver")
+
+# Intervalo (segundos) entre avisos de item ainda aguardando executor
+AVISO_FILA = 30
+
+class _ItemFila(Espera):
+    def __init__(self, queue_url, item_id, timeout, on_update):
+        super().__init__(item_id, math.inf if timeout is None else timeout)
+        self.queue_url = queue_url
+        self.item_id = item_id
+        self.on_update = on_update
+        self.desde = time.time()
+        self.proximo_aviso = self.desde + AVISO_FILA
+
+def id_item_fila(queue_url):
+    """'.../queue/item/123/' -> 123"""
+    return int(queue_url.rstrip('/').rsplit('/', 1)[1])
+
+class QueueResolver(AcompanhamentoEmLote):
+    """Converte itens da fila do Jenkins em URLs de build.
+
+    Todos os itens pendentes de um usuário são acompanhados juntos: a cada
+    ciclo uma única consulta a queue/api/json lista quem ainda espera, e só os
+    itens que saíram da fila são consultados individualmente (uma vez) para
+    obter a URL do build. O intervalo entre ciclos dobra enquanto nada muda e
+    volta ao mínimo quando um novo item é registrado. Cada disparo recebe um
+    Future resolvido com a URL do build, ou None se o item for cancelado, não
+    existir mais no Jenkins ou estourar o prazo (sem prazo por padrão: um item
+    parado na fila continua acompanhado e o build é entregue quando aparecer).
+    """
+
+    def __init__(self, cliente, intervalo_inicial=0.5, intervalo_maximo=8):
+        super().__init__()
+        self.cliente = cliente
+        self.intervalo_inicial = intervalo_inicial
+        self.intervalo_maximo = intervalo_maximo
+        self.intervalo = intervalo_inicial
+
+    def resolver(self, queue_url, timeout=None, on_update=None):
+        """Registra o item da fila e retorna um Future[str | None].
+
+        on_update(queue_url, segundos) é chamado a cada AVISO_FILA segundos
+        enquanto o item aguarda executor.
+        """
+        return self._registrar(_ItemFila(queue_url, id_item_fila(queue_url), timeout, on_update))
+
+    def _ao_registrar(self, item):
+        self.intervalo = self.intervalo_inicial
+
+    def _ids_na_fila(self):
+        response = self.cliente.get('queue/api/json', params={"tree": "items[id]"})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code} em queue/api/json")
+        return {i.get("id") for i in response.json().get("items", [])}
+
+    def _consultar_item(self, item):
+        """Item que saiu da fila: (resolvido, url_build)"""
+        url = item.queue_url if item.queue_url.endswith('/') else item.queue_url + '/'
+        response = self.cliente.get(url + 'api/json', params={"tree": "cancelled,executable[url]"})
+        if response.status_code == 404:
+            # O Jenkins descarta itens alguns minutos após saírem da fila (ex.: retomada após queda)
+            logger.warning(f"Item {item.item_id} não existe mais no Jenkins")
+            return True, None
+        if response.status_code != 200:
+            return False, None
+        data = response.json()
+        if data.get("cancelled"):
+            logger.warning(f"Item {item.item_id} cancelado na fila do Jenkins")
+            return True, None
+        executavel = data.get("executable")
+        if executavel and executavel.get("url"):
+            return True, executavel["url"]
+        return False, None
+
+    def _ciclo(self, pendentes):
+        resolvidos = 0
+        try:
+            na_fila = self._ids_na_fila()
+            for item in pendentes:
+                if item.item_id in na_fila:
+                    continue
+                resolvido, url = self._consultar_item(item)
+                if resolvido:
+                    self._finalizar(item, url)
+                    resolvidos += 1
+        except Exception as e:
+            logger.error(f"Erro ao consultar a fila do Jenkins: {e}")
+
+        agora = time.time()
+        for item in pendentes:
+            if not item.future.done() and agora >= item.proximo_aviso:
+                item.proximo_aviso = agora + AVISO_FILA
+                logger.info(f"Item {item.item_id} aguardando executor há {agora - item.desde:.0f}s")
+                if item.on_update:
+                    try:
+                        item.on_update(item.queue_url, agora - item.desde)
+                    except Exception as e:
+                        logger.error(f"Erro no aviso do item {item.item_id}: {e}")
+
+        with self._cond:
+            if resolvidos == 0:
+                self.intervalo = min(self.intervalo * 2, self.intervalo_maximo)
+            return self.intervalo
+
+    def _expirou(self, item, agora):
+        if agora < item.prazo:
+            return False
+        logger.warning(f"Timeout aguardando o item {item.item_id} sair da fila do Jenkins")
+        return True
+
+    def pendentes(self):
+        """Ids dos itens ainda aguardando executor"""
+        return list(self._pendentes())
+
+_resolvedores = RegistroPorUsuario(lambda login, senha: QueueResolver(obter_cliente(login, senha)))
+
+def obter_resolvedor(login, senha):
+    """Resolvedor de fila compartilhado pelo processo para o usuário informado"""
+    return _resolvedores.obter(login, senha)
+
+def disparo_na_fila(queue_url):
+    """Retorno dos triggers para um build aceito pelo Jenkins (HTTP 201).
+
+    Serializável em JSON (index.html/processamento.html): o executor é
+    atribuído depois; quem disparou obtém a URL do build com
+    obter_resolvedor(login, senha).resolver(queue_url) sem prender thread.
+    """
+    if not queue_url:
+        return {"status": "ERROR", "message": "Jenkins não retornou a URL da fila."}
+    return {
+        "status": "QUEUED",
+        "message": "Build na fila do Jenkins",
+        "queue_url": queue_url,
+    }
@@ -1,119 +1,34 @@
 import os
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from CompletoInputALLB import F5Manager, TokenManager
-from Pesquisar_Cluster.Pesquisar import pesquisar, obter_maquinas_producao
+from concurrent.futures import as_completed
+from CompletoInputALLB import F5Manager, TokenManager, executar_em_balancers
+from Pesquisar_Cluster.Pesquisar import pesquisar, obter_maquinas_producao, inventario
 from mensagens_integracao import sugerir_mensagem_integracao, detectar_tipo_mensagem
 from rich.console import Console
 from rich.table import Table
-from rich.prompt import Prompt
+from rich.prompt import Prompt, IntPrompt
 from rich.panel import Panel
 from rich.text import Text
 from rich import box
-from features.ssh_automation import clean_opt_disk
+from features.ssh_automation import execute_ssh_commands
 from features.outofmemory import move_files_ssh
+from features.ssh_pool import encerrar_sessoes_ssh
+from features.acompanhamento import encerrar_acompanhamentos
+from features.drain_watcher import DrainWatcher
+from features.worker_pools import obter_pool
+from features.component_pipeline import Componente, iniciar_pipeline
+from features.workflow import Passo, Fluxo, Politica, AgendadorFluxos, encadear
+from features.rolling_restart import RollingRestart
+from features.job_store import JobStore
+from features.event_loop import executar_sync, esperar
+from features.metricas import iniciar_servidor as iniciar_servidor_metricas
+import math
 import threading
 import asyncio
 
 console = Console()
 
-# Lista global para acompanhar restarts em andamento
-restart_jobs = []
-
-# Lista global para acompanhar limpezas em andamento
-clean_jobs = []
-
-# Lista global para acompanhar restarts completos com limpeza em andamento
-restart_clear_jobs = []
-
-class RestartJob:
-    def __init__(self, node, manager_f5, user_info):
-        self.node = node
-        self.manager_f5 = manager_f5
-        self.user_info = user_info
-        self.status = "PENDENTE"
-        self.result = None
-        self.thread = threading.Thread(target=self.run)
-        self.start_time = time.strftime("%H:%M:%S")
-        self.end_time = None
-
-    def start(self):
-        self.thread.start()
-
-    def run(self):
-        try:
-            self.status = "EXECUTANDO"
-            result = restart_completo(self.manager_f5, self.node, self.user_info)
-            if result is True:
-                self.status = "FINALIZADO (SUCESSO)"
-                self.result = {"success": True}
-            else:
-                self.status = "FINALIZADO (ERRO)"
-                self.result = {"success": False, "detail": result}
-        except Exception as e:
-            self.status = f"ERRO: {str(e)}"
-        self.end_time = time.strftime("%H:%M:%S")
-
-class CleanJob:
-    def __init__(self, node, cluster_name, user_info):
-        self.node = node
-        self.cluster_name = cluster_name
-        self.user_info = user_info
-        self.status = "PENDENTE"
-        self.result = None
-        self.thread = threading.Thread(target=self.run)
-        self.start_time = time.strftime("%H:%M:%S")
-        self.end_time = None
-
-    def start(self):
-        self.thread.start()
-
-    def run(self):
-        try:
-            self.status = "EXECUTANDO"
-            from Restart_Funcoes.restart_Clear import restart_CleanDisk
-            result = restart_CleanDisk(self.cluster_name, self.node, self.user_info["jenkins_user"], self.user_info["jenkins_token"])
-            if result.get("status") == "STARTED" and result.get("job_url"):
-                sucesso = aguardar_job_jenkins(result.get("job_url"), self.user_info["jenkins_user"], self.user_info["jenkins_token"], node=self.node, component="Limpeza")
-                if sucesso:
-                    self.status = "FINALIZADO (SUCESSO)"
-                else:
-                    self.status = "FINALIZADO (ERRO)"
-            else:
-                self.status = f"ERRO: {result.get('message', 'Falha ao iniciar')}"
-        except Exception as e:
-            self.status = f"ERRO: {str(e)}"
-        self.end_time = time.strftime("%H:%M:%S")
-
-class RestartClearJob:
-    def __init__(self, node, manager_f5, user_info):
-        self.node = node
-        self.manager_f5 = manager_f5
-        self.user_info = user_info
-        self.status = "PENDENTE"
-        self.result = None
-        self.thread = threading.Thread(target=self.run)
-        self.start_time = time.strftime("%H:%M:%S")
-        self.end_time = None
-
-    def start(self):
-        self.thread.start()
-
-    def run(self):
-        try:
-            self.status = "EXECUTANDO"
-            result = restart_completo_clear(self.manager_f5, self.node, self.user_info)
-            if result is True:
-                self.status = "FINALIZADO (SUCESSO)"
-                self.result = {"success": True}
-            else:
-                self.status = "FINALIZADO (ERRO)"
-                self.result = {"success": False, "detail": result}
-        except Exception as e:
-            self.status = f"ERRO: {str(e)}"
-        self.end_time = time.strftime("%H:%M:%S")
-
 def ler_credenciais_arquivo():
     cred_path = os.path.join(os.path.dirname(__file__), "credenciais.txt")
     if not os.path.exists(cred_path):
@@ -147,302 +62,601 @@ def ler_credenciais_arquivo():
         "adm_pass": adm_pass,
     }
 
+def _resultados_em_paralelo(balancers, func, *args, **kwargs):
+    # Coroutines rodam todas juntas no loop compartilhado; funções síncronas no pool do F5
+    if asyncio.iscoroutinefunction(func):
+        yield from executar_sync(executar_em_balancers(balancers, func, *args, **kwargs))
+        return
+    executor = obter_pool("f5")
+    future_to_balancer = {
+        executor.submit(func, balancer, *args, **kwargs): balancer
+        for balancer in balancers
+    }
+    for future in as_completed(future_to_balancer):
+        try:
+            yield future_to_balancer[future], future.result()
+        except Exception as e:
+            yield future_to_balancer[future], e
+
 def executar_em_paralelo(balancers, func, *args, **kwargs):
     resultados = []
-    with ThreadPoolExecutor(max_workers=len(balancers)) as executor:
-        future_to_balancer = {
-            executor.submit(func, balancer, *args, **kwargs): balancer
-            for balancer in balancers
-        }
-        for future in as_completed(future_to_balancer):
-            balancer = future_to_balancer[future]
-            try:
-                resultado = future.result()
-                if resultado is None:
-                    print(f"[{balancer.name}] Token expirado ou inválido. Ignorando este balanceador.")
-                    continue
-            except Exception as e:
-                resultado = f"Erro: {e}"
-            resultados.append((balancer.name, resultado))
+    for balancer, resultado in _resultados_em_paralelo(balancers, func, *args, **kwargs):
+        if isinstance(resultado, Exception):
+            resultado = f"Erro: {resultado}"
+        elif resultado is None:
+            print(f"[{balancer.name}] Token expirado ou inválido. Ignorando este balanceador.")
+            continue
+        resultados.append((balancer.name, resultado))
     return resultados
 
-def consultar_status_node(balancer, node):
-    return balancer.get_node_status(node)
+async def consultar_status_node(balancer, node):
+    return await balancer.get_node_status_async(node)
 
-def forcar_offline_node(balancer, node):
-    return balancer.force_offline_node(node)
+async def consultar_status_nodes(balancer, nodes):
+    return await balancer.get_nodes_status_async(nodes)
 
-def habilitar_node(balancer, node):
-    return balancer.enable_node(node)
+async def forcar_offline_node(balancer, node):
+    return await balancer.force_offline_node_async(node)
 
-def listar_pools(balancer):
-    return balancer.get_available_pools()
+async def habilitar_node(balancer, node):
+    return await balancer.enable_node_async(node)
 
-def listar_membros_pool(balancer, pool):
-    return balancer.get_pool_members(pool)
+def executar_nos_balancers_do_node(manager_f5, func, node):
+    """executar_em_paralelo só nos balanceadores que possuem o node (índice do F5Manager).
 
-def restart_completo(manager_f5, node, user_info):
-    # Fluxo para um único node (mantido para uso interno)
-    console.print(Panel(f"=== RESTART COMPLETO: [bold yellow]{node}[/bold yellow] ===", style="bold cyan", box=box.DOUBLE))
-    console.print(Panel(f"[bold magenta][RESTART COMPLETO][/bold magenta] Isolando node [bold yellow]{node}[/bold yellow] em todos os balanceadores...", style="magenta"))
+    Usado para isolar/habilitar: o índice é atualizado antes da consulta, em vez do cache de leitura.
+    """
+    balancers = manager_f5.balancers_do_node(node, atualizar=True)
+    if not balancers:
+        return [("-", f"Node {node} não encontrado em nenhum balanceador")]
+    return executar_em_paralelo(balancers, func, node)
 
-    resultados_offline = executar_em_paralelo(manager_f5.authenticated_balancers, forcar_offline_node, node)
-    offline_table = Table(title="Resultado - Offline", box=box.SIMPLE)
-    offline_table.add_column("Balanceador", style="bold cyan")
-    offline_table.add_column("Resultado", style="bold yellow")
-    for nome, result in resultados_offline:
-        offline_table.add_row(nome, str(result))
-    console.print(offline_table)
+async def listar_pools(balancer):
+    return await balancer.get_available_pools_async()
 
-    # Adiciona espera de 3 minutos para nodes TRNP após isolamento
-    node_prefix = node[:4].upper()
-    if node_prefix == "TRNP":
-        console.print(Panel("[bold yellow]Node TRNP isolado. Aguardando 3 minutos devido à persistência...[/bold yellow]", style="yellow"))
-        for i in range(3, 0, -1):
-            console.print(f"[yellow]Aguardando {i} minuto(s)...[/yellow]")
-            time.sleep(60)
+async def listar_membros_pool(balancer, pool):
+    return await balancer.get_pool_members_async(pool)
 
-    console.print(Panel("[bold blue]Aguardando conexões zerarem...[/bold blue]", style="blue"))
-    max_attempts = 60
-    sleep_interval = 10
-    for attempt in range(max_attempts):
-        resultados_status = executar_em_paralelo(manager_f5.authenticated_balancers, consultar_status_node, node)
-        total_conns = 0
-        detalhes = []
-        todos_zero = True
-        for nome, status in resultados_status:
-            conns = status.get("connections", 0) if isinstance(status, dict) else 0
-            detalhes.append(f"[bold]{nome}[/bold]: [green]{conns}[/green] conexões")
-            if conns > 0:
-                todos_zero = False
-                total_conns += conns
-        console.print(f"[yellow]Conexões ativas:[/yellow] [bold]{total_conns}[/bold] | Detalhes: {', '.join(detalhes)}")
-        if todos_zero:
-            console.print(Panel("[bold green]Todas as conexões zeradas![/bold green]", style="green"))
-            break
-        time.sleep(sleep_interval)
-    else:
-        console.print(Panel("[bold red]Timeout esperando conexões zerarem. Abortando restart.[/bold red]", style="red"))
-        return False
+# Serviço compartilhado de acompanhamento da drenagem de conexões (criado sob demanda)
+_drain_watcher = None
+_drain_watcher_lock = threading.Lock()
 
-    console.print(Panel(f"[bold blue]Executando restart via Jenkins para máquina {node}...[/bold blue]", style="blue"))
-    from Restart_Funcoes.Restart_Websphere import restart_Websphere, check_job_status
-    from Restart_Funcoes.Restart_SWS import restart_SWS
-    from Restart_Funcoes.Restart_Liberty import restart_liberty
-    host, cluster_name = pesquisar(node)
-    if not cluster_name:
-        console.print(Panel("[bold red]Cluster não encontrado para o node.[/bold red]", style="red"))
-        return False
-    node_prefix = node[:4].upper()
-    login = user_info["jenkins_user"]
-    senha = user_info["jenkins_token"]
-    sucesso = False
-
-    if node_prefix in ['WASP', 'TRNP']:
-        console.print(Panel(f"[bold cyan]Restartando Websphere na máquina {node}...[/bold cyan]", style="cyan"))
-        result = restart_Websphere("PARALELO", cluster_name, node, login, senha)
-        console.print(Panel(f"[bold cyan]Resultado Websphere ({node}):[/bold cyan] {result}", style="cyan"))
-        if result.get("status") == "STARTED" and result.get("job_url"):
-            sucesso = aguardar_job_jenkins(result.get("job_url"), login, senha, node=node, component="Websphere")
-        else:
-            sucesso = False
-    elif node_prefix == 'CTRP':
-        # Para CTRP executa Websphere, SRTB e Liberty
-        from Restart_Funcoes.Restart_SRTB import restart_SRTB
-        component_results = {}
-
-        console.print(Panel(f"[bold cyan]Restartando Websphere na máquina {node}...[/bold cyan]", style="cyan"))
-        result_ws = restart_Websphere("PARALELO", cluster_name, node, login, senha)
-        console.print(Panel(f"[bold cyan]Resultado Websphere ({node}):[/bold cyan] {result_ws}", style="cyan"))
-        if result_ws.get("status") == "STARTED" and result_ws.get("job_url"):
-            component_results['Websphere'] = aguardar_job_jenkins(result_ws.get("job_url"), login, senha, node=node, component="Websphere")
-        else:
-            component_results['Websphere'] = False
+def obter_drain_watcher(manager_f5):
+    global _drain_watcher
+    with _drain_watcher_lock:
+        if _drain_watcher is None:
+            _drain_watcher = DrainWatcher(lambda: manager_f5.authenticated_balancers,
+                                          balancers_do_node=manager_f5.balancers_do_node)
+        return _drain_watcher
 
-        console.print(Panel(f"[bold cyan]Restartando SRTB na máquina {node}...[/bold cyan]", style="cyan"))
-        result_srtb = restart_SRTB("PARALELO", cluster_name, node, login, senha)
-        console.print(Panel(f"[bold cyan]Resultado SRTB ({node}):[/bold cyan] {result_srtb}", style="cyan"))
-        if result_srtb.get("status") == "STARTED" and result_srtb.get("job_url"):
-            component_results['SRTB'] = aguardar_job_jenkins(result_srtb.get("job_url"), login, senha, node=node, component="SRTB")
-        else:
-            component_results['SRTB'] = False
+def _progresso_drenagem(node, total_conns, detalhes):
+    detalhes_fmt = [f"[bold]{nome}[/bold]: [green]{conns}[/green] conexões" for nome, conns in detalhes]
+    console.print(f"[yellow]Conexões ativas ({node}):[/yellow] [bold]{total_conns}[/bold] | Detalhes: {', '.join(detalhes_fmt)}")
 
-        console.print(Panel(f"[bold cyan]Restartando Liberty na máquina {node}...[/bold cyan]", style="cyan"))
-        result_lib = restart_liberty("PARALELO", cluster_name, node, login, senha)
-        console.print(Panel(f"[bold cyan]Resultado Liberty ({node}):[/bold cyan] {result_lib}", style="cyan"))
-        if result_lib.get("status") == "STARTED" and result_lib.get("job_url"):
-            component_results['Liberty'] = aguardar_job_jenkins(result_lib.get("job_url"), login, senha, node=node, component="Liberty")
-        else:
-            component_results['Liberty'] = False
+def aguardar_conexoes_zerarem(manager_f5, node, timeout=600):
+    """Bloqueia até o node zerar conexões em todos os balanceadores (False em timeout)"""
+    return obter_drain_watcher(manager_f5).aguardar(node, timeout=timeout, on_update=_progresso_drenagem).result()
 
-        sucesso = all(component_results.values())
-        # Mostrar resumo por componente
-        for comp, ok in component_results.items():
-            if ok:
-                console.print(Panel(f"[bold green]{comp} finalizado com sucesso em {node}[/bold green]", style="green"))
-            else:
-                console.print(Panel(f"[bold red]{comp} NÃO finalizado com sucesso em {node}[/bold red]", style="red"))
-    else:
-        console.print(Panel("[bold red]Prefixo de node não reconhecido para restart.[/bold red]", style="red"))
+def acompanhar_job_jenkins(job_url, login, senha, node=None, component=None, timeout=600):
+    """Future[bool] do build; o acompanhamento é feito pelo poller compartilhado
+    (uma consulta por pasta de job para todos os builds em andamento)"""
+    from Restart_Funcoes.build_poller import obter_poller
+    label = f"{component} - {node}" if component or node else "Jenkins Job"
+
+    def progresso(url, status):
+        console.print(f"[yellow]Job {label} em execução...[/yellow]")
+
+    def concluir(status):
+        if status.get("status") == "SUCCESS":
+            console.print(Panel(f"[bold green]Job {label} finalizado com sucesso![/bold green]", style="green"))
+            return True
+        if status.get("status") == "TIMEOUT":
+            console.print(Panel(f"[bold red]Timeout aguardando conclusão do job {label}.[/bold red]", style="red"))
+            return False
+        console.print(Panel(f"[bold red]Job {label} falhou: {status.get('status')}[/bold red]", style="red"))
         return False
 
-    if sucesso:
-        console.print(Panel(f"[bold green]Restart de {node} concluído com sucesso. Habilitando node em todos os balanceadores...[/bold green]", style="green"))
-        resultados_enable = executar_em_paralelo(manager_f5.authenticated_balancers, habilitar_node, node)
-        enable_table = Table(title="Resultado - Enable", box=box.SIMPLE)
-        enable_table.add_column("Balanceador", style="bold cyan")
-        enable_table.add_column("Resultado", style="bold green")
-        for nome, result in resultados_enable:
-            enable_table.add_row(nome, str(result))
-        console.print(enable_table)
-        console.print(Panel("[bold green]Restart completo realizado com sucesso![/bold green]", style="green"))
-    else:
-        console.print(Panel(f"[bold red]Falha ao iniciar ou concluir restart via Jenkins para {node}. Processo NÃO COMPLETO.[/bold red]", style="red"))
-    return sucesso
+    return encadear(obter_poller(login, senha).acompanhar(job_url, timeout=timeout, on_update=progresso), concluir)
 
-def restart_completo_clear(manager_f5, node, user_info):
-    # Fluxo para um único node: isolamento, limpeza via Jenkins, habilitação
-    console.print(Panel(f"=== RESTART COMPLETO COM LIMPEZA: [bold yellow]{node}[/bold yellow] ===", style="bold cyan", box=box.DOUBLE))
-    console.print(Panel(f"[bold magenta][RESTART COMPLETO CLEAR][/bold magenta] Isolando node [bold yellow]{node}[/bold yellow] em todos os balanceadores...", style="magenta"))
+# ---------------------------------------------------------------------------
+# Fluxos de restart/limpeza
+# ---------------------------------------------------------------------------
+
+def _disparar_websphere(execucao):
+    from Restart_Funcoes.Restart_Websphere import restart_Websphere
+    return restart_Websphere("PARALELO", execucao.dados["cluster_name"], execucao.node, execucao.dados["login"], execucao.dados["senha"])
+
+def _disparar_srtb(execucao):
+    from Restart_Funcoes.Restart_SRTB import restart_SRTB
+    return restart_SRTB("PARALELO", execucao.dados["cluster_name"], execucao.node, execucao.dados["login"], execucao.dados["senha"])
+
+def _disparar_liberty(execucao):
+    from Restart_Funcoes.Restart_Liberty import restart_liberty
+    return restart_liberty("PARALELO", execucao.dados["cluster_name"], execucao.node, execucao.dados["login"], execucao.dados["senha"])
 
-    resultados_offline = executar_em_paralelo(manager_f5.authenticated_balancers, forcar_offline_node, node)
+def _disparar_limpeza(execucao):
+    from Restart_Funcoes.restart_Clear import restart_CleanDisk
+    return restart_CleanDisk(execucao.dados["cluster_name"], execucao.node, execucao.dados["login"], execucao.dados["senha"])
+
+# Componentes do Jenkins: nome -> (ação exibida, disparo)
+COMPONENTES_JENKINS = {
+    "Websphere": ("Restartando Websphere", _disparar_websphere),
+    "SRTB": ("Restartando SRTB", _disparar_srtb),
+    "Liberty": ("Restartando Liberty", _disparar_liberty),
+    "Limpeza": ("Executando limpeza", _disparar_limpeza),
+}
+
+# Parâmetros por prefixo de node
+POLITICAS_PREFIXO = {
+    "WASP": Politica(),
+    # TRNP mantém sessões persistentes: aguarda 3 minutos após o isolamento
+    "TRNP": Politica(espera_isolamento=180),
+    "CTRP": Politica(),
+}
+
+def passo_localizar_cluster(execucao):
+    node = execucao.node
+    console.print(Panel(f"=== {execucao.fluxo.descricao.upper()}: [bold yellow]{node}[/bold yellow] ===", style="bold cyan", box=box.DOUBLE))
+    if execucao.fluxo.componentes_do_node(node) is None:
+        console.print(Panel(f"[bold red]Prefixo de node não reconhecido para {execucao.fluxo.descricao.lower()}.[/bold red]", style="red"))
+        return False
+    if not execucao.dados.get("cluster_name"):
+        host, cluster_name = pesquisar(node)
+        if not cluster_name:
+            console.print(Panel("[bold red]Cluster não encontrado para o node.[/bold red]", style="red"))
+            return False
+        execucao.dados["cluster_name"] = cluster_name
+    return True
+
+def passo_isolar(execucao):
+    node = execucao.node
+    manager_f5 = execucao.recursos["manager_f5"]
+    console.print(Panel(f"[bold magenta][{execucao.fluxo.descricao.upper()}][/bold magenta] Isolando node [bold yellow]{node}[/bold yellow] nos balanceadores...", style="magenta"))
+    resultados_offline = executar_nos_balancers_do_node(manager_f5, forcar_offline_node, node)
     offline_table = Table(title="Resultado - Offline", box=box.SIMPLE)
     offline_table.add_column("Balanceador", style="bold cyan")
     offline_table.add_column("Resultado", style="bold yellow")
     for nome, result in resultados_offline:
         offline_table.add_row(nome, str(result))
     console.print(offline_table)
+    return True
 
-    # Adiciona espera de 3 minutos para nodes TRNP após isolamento
-    node_prefix = node[:4].upper()
-    if node_prefix == "TRNP":
-        console.print(Panel("[bold yellow]Node TRNP isolado. Aguardando 3 minutos devido à persistência...[/bold yellow]", style="yellow"))
-        for i in range(3, 0, -1):
-            console.print(f"[yellow]Aguardando {i} minuto(s)...[/yellow]")
-            time.sleep(60)
+def passo_espera_isolamento(execucao):
+    segundos = execucao.politica.espera_isolamento
+    if not segundos:
+        return True
+    console.print(Panel(f"[bold yellow]Node {execucao.node[:4].upper()} isolado. Aguardando {segundos // 60} minutos devido à persistência...[/bold yellow]", style="yellow"))
+    return esperar(segundos)
 
+def passo_drenar(execucao):
     console.print(Panel("[bold blue]Aguardando conexões zerarem...[/bold blue]", style="blue"))
-    max_attempts = 60
-    sleep_interval = 10
-    for attempt in range(max_attempts):
-        resultados_status = executar_em_paralelo(manager_f5.authenticated_balancers, consultar_status_node, node)
-        total_conns = 0
-        detalhes = []
-        todos_zero = True
-        for nome, status in resultados_status:
-            conns = status.get("connections", 0) if isinstance(status, dict) else 0
-            detalhes.append(f"[bold]{nome}[/bold]: [green]{conns}[/green] conexões")
-            if conns > 0:
-                todos_zero = False
-            total_conns += conns
-        console.print(f"[yellow]Conexões ativas:[/yellow] [bold]{total_conns}[/bold] | Detalhes: {', '.join(detalhes)}")
-        if todos_zero:
-            console.print(Panel("[bold green]Todas as conexões zeradas![/bold green]", style="green"))
-            break
-        time.sleep(sleep_interval)
-    else:
-        console.print(Panel("[bold red]Timeout esperando conexões zerarem. Abortando restart.[/bold red]", style="red"))
-        return False
+    watcher = execucao.recursos["drain_watcher"]
 
-    console.print(Panel(f"[bold blue]Executando limpeza via Jenkins para máquina {node}...[/bold blue]", style="blue"))
-    from Restart_Funcoes.restart_Clear import restart_CleanDisk
-    host, cluster_name = pesquisar(node)
-    if not cluster_name:
-        console.print(Panel("[bold red]Cluster não encontrado para o node.[/bold red]", style="red"))
-        return False
-    node_prefix = node[:4].upper()
-    login = user_info["jenkins_user"]
-    senha = user_info["jenkins_token"]
-    sucesso = False
-
-    if node_prefix in ['WASP', 'TRNP']:
-        console.print(Panel(f"[bold cyan]Executando limpeza na máquina {node}...[/bold cyan]", style="cyan"))
-        result = restart_CleanDisk(cluster_name, node, login, senha)
-        console.print(Panel(f"[bold cyan]Resultado Limpeza ({node}):[/bold cyan] {result}", style="cyan"))
-        if result.get("status") == "STARTED" and result.get("job_url"):
-            sucesso = aguardar_job_jenkins(result.get("job_url"), login, senha, node=node, component="Limpeza")
-        else:
-            sucesso = False
-    elif node_prefix == 'CTRP':
-        # Para CTRP executa Limpeza, SRTB e Liberty
-        from Restart_Funcoes.Restart_SRTB import restart_SRTB
-        from Restart_Funcoes.Restart_Liberty import restart_liberty
-        component_results = {}
-
-        console.print(Panel(f"[bold cyan]Executando limpeza na máquina {node}...[/bold cyan]", style="cyan"))
-        result_clear = restart_CleanDisk(cluster_name, node, login, senha)
-        console.print(Panel(f"[bold cyan]Resultado Limpeza ({node}):[/bold cyan] {result_clear}", style="cyan"))
-        if result_clear.get("status") == "STARTED" and result_clear.get("job_url"):
-            component_results['Limpeza'] = aguardar_job_jenkins(result_clear.get("job_url"), login, senha, node=node, component="Limpeza")
+    def concluir(zerou):
+        if zerou:
+            console.print(Panel("[bold green]Todas as conexões zeradas![/bold green]", style="green"))
         else:
-            component_results['Limpeza'] = False
+            console.print(Panel("[bold red]Timeout esperando conexões zerarem. Abortando restart.[/bold red]", style="red"))
+        return zerou
 
-        console.print(Panel(f"[bold cyan]Restartando SRTB na máquina {node}...[/bold cyan]", style="cyan"))
-        result_srtb = restart_SRTB("PARALELO", cluster_name, node, login, senha)
-        console.print(Panel(f"[bold cyan]Resultado SRTB ({node}):[/bold cyan] {result_srtb}", style="cyan"))
-        if result_srtb.get("status") == "STARTED" and result_srtb.get("job_url"):
-            component_results['SRTB'] = aguardar_job_jenkins(result_srtb.get("job_url"), login, senha, node=node, component="SRTB")
-        else:
-            component_results['SRTB'] = False
+    return encadear(watcher.aguardar(execucao.node, timeout=execucao.politica.timeout_drenagem, on_update=_progresso_drenagem), concluir)
 
-        console.print(Panel(f"[bold cyan]Restartando Liberty na máquina {node}...[/bold cyan]", style="cyan"))
-        result_lib = restart_liberty("PARALELO", cluster_name, node, login, senha)
-        console.print(Panel(f"[bold cyan]Resultado Liberty ({node}):[/bold cyan] {result_lib}", style="cyan"))
-        if result_lib.get("status") == "STARTED" and result_lib.get("job_url"):
-            component_results['Liberty'] = aguardar_job_jenkins(result_lib.get("job_url"), login, senha, node=node, component="Liberty")
-        else:
-            component_results['Liberty'] = False
+def _componente_jenkins(execucao, nome, depende_de=()):
+    """Componente do pipeline que dispara um job do Jenkins e devolve o Future do build.
 
-        sucesso = all(component_results.values())
-        # Mostrar resumo por componente
-        for comp, ok in component_results.items():
-            if ok:
-                console.print(Panel(f"[bold green]{comp} concluído com sucesso![/bold green]", style="green"))
-            else:
-                console.print(Panel(f"[bold red]Falha em {comp}.[/bold red]", style="red"))
-    else:
-        console.print(Panel("[bold red]Prefixo de node não reconhecido para restart completo clear.[/bold red]", style="red"))
-        return False
+    A fila e o build de cada componente ficam registrados no store assim que
+    conhecidos; na retomada de uma execução interrompida o componente reanexa
+    ao build, volta a resolver o item da fila ou, se nunca foi disparado, dispara.
+    """
+    acao, disparar = COMPONENTES_JENKINS[nome]
+    node = execucao.node
+    login, senha = execucao.dados["login"], execucao.dados["senha"]
 
-    if sucesso:
-        console.print(Panel(f"[bold green]Restart completo com limpeza de {node} concluído com sucesso. Habilitando node em todos os balanceadores...[/bold green]", style="green"))
-        resultados_enable = executar_em_paralelo(manager_f5.authenticated_balancers, habilitar_node, node)
-        enable_table = Table(title="Resultado - Enable", box=box.SIMPLE)
-        enable_table.add_column("Balanceador", style="bold cyan")
-        enable_table.add_column("Resultado", style="bold green")
-        for nome, result in resultados_enable:
-            enable_table.add_row(nome, str(result))
-        console.print(enable_table)
-        console.print(Panel("[bold green]Restart completo com limpeza realizado com sucesso![/bold green]", style="green"))
-    else:
-        console.print(Panel(f"[bold red]Falha ao executar limpeza/restart via Jenkins para {node}. Processo NÃO COMPLETO.[/bold red]", style="red"))
-    return sucesso
-
-def aguardar_job_jenkins(job_url, login, senha, node=None, component=None, max_attempts=60, sleep_interval=10):
-    from Restart_Funcoes.Restart_Websphere import check_job_status
-    label = f"{component} - {node}" if component or node else "Jenkins Job"
-    for attempt in range(max_attempts):
-        status = check_job_status(job_url, login, senha)
-        if status.get("status") == "RUNNING":
-            console.print(f"[yellow]Job {label} em execução... ({attempt+1}/{max_attempts})[/yellow]")
-        elif status.get("status") == "SUCCESS":
-            console.print(Panel(f"[bold green]Job {label} finalizado com sucesso![/bold green]", style="green"))
-            return True
-        elif status.get("status") in ["FAILURE", "ERROR"]:
-            console.print(Panel(f"[bold red]Job {label} falhou: {status.get('message', '')}[/bold red]", style="red"))
+    def acompanhar(job_url):
+        if not job_url:
+            console.print(Panel(f"[bold red]Resultado {nome} ({node}):[/bold red] item da fila cancelado ou removido do Jenkins", style="red"))
             return False
-        time.sleep(sleep_interval)
-    console.print(Panel(f"[bold red]Timeout aguardando conclusão do job {label}.[/bold red]", style="red"))
-    return False
+        console.print(Panel(f"[bold cyan]Resultado {nome} ({node}):[/bold cyan] build iniciado em {job_url}", style="cyan"))
+        # Registrado no store para reanexar ao build se o console cair
+        execucao.anotar_item("builds", nome, job_url)
+        return acompanhar_job_jenkins(job_url, login, senha, node=node, component=nome, timeout=execucao.politica.timeout_build)
+
+    def na_fila(queue_url, segundos):
+        console.print(f"[yellow]Job {nome} - {node} aguardando executor na fila do Jenkins há {segundos:.0f}s...[/yellow]")
+
+    def aguardar_fila(queue_url):
+        # Sem prazo: o item segue acompanhado enquanto estiver na fila e o build é
+        # acompanhado quando aparecer; só cancelamento no Jenkins encerra a espera
+        from Restart_Funcoes.queue_resolver import obter_resolvedor
+        return encadear(obter_resolvedor(login, senha).resolver(queue_url, on_update=na_fila), acompanhar)
+
+    def executar():
+        build = (execucao.dados.get("builds") or {}).get(nome)
+        filas = execucao.dados.get("filas") or {}
+        if build:
+            console.print(Panel(f"[bold blue]Reanexando ao build {nome} de {node}: {build}[/bold blue]", style="blue"))
+            return acompanhar(build)
+        if nome in filas:
+            if not filas[nome]:
+                # Caiu entre o disparo e a resposta do Jenkins: disparar de novo pode repetir o restart
+                console.print(Panel(f"[bold red]Disparo de {nome} ({node}) interrompido sem registro na fila. Verifique no Jenkins.[/bold red]", style="red"))
+                return False
+            console.print(Panel(f"[bold blue]Aguardando o item da fila de {nome} ({node}): {filas[nome]}[/bold blue]", style="blue"))
+            return aguardar_fila(filas[nome])
+
+        console.print(Panel(f"[bold cyan]{acao} na máquina {node}...[/bold cyan]", style="cyan"))
+        # Disparo em andamento: sem a URL da fila, a retomada não sabe se o job entrou
+        execucao.anotar_item("filas", nome, None)
+        result = disparar(execucao)
+        if result.get("status") == "QUEUED":
+            execucao.anotar_item("filas", nome, result["queue_url"])
+            # A fila é resolvida pelo resolvedor compartilhado; nenhuma thread do pool espera o executor
+            return aguardar_fila(result["queue_url"])
+        console.print(Panel(f"[bold cyan]Resultado {nome} ({node}):[/bold cyan] {result}", style="cyan"))
+        return False
+    return Componente(nome, executar, depende_de)
+
+def componentes_jenkins(execucao):
+    """Componentes do fluxo para o node; na retomada, os do fluxo interrompido (dados["fluxo_origem"])"""
+    fluxo = FLUXOS_POR_NOME.get(execucao.dados.get("fluxo_origem"), execucao.fluxo)
+    return fluxo.componentes_do_node(execucao.node)
+
+def passo_jenkins(execucao):
+    node = execucao.node
+    console.print(Panel(f"[bold blue]Executando {execucao.fluxo.descricao.lower()} via Jenkins para máquina {node}...[/bold blue]", style="blue"))
+    componentes = [_componente_jenkins(execucao, nome, deps) for nome, deps in componentes_jenkins(execucao) or []]
+    if not componentes:
+        console.print(Panel(f"[bold red]Componentes do Jenkins desconhecidos para {node}.[/bold red]", style="red"))
+        return False
+
+    def concluir(component_results):
+        if len(component_results) > 1:
+            # Resumo por componente
+            for comp, ok in component_results.items():
+                if ok:
+                    console.print(Panel(f"[bold green]{comp} finalizado com sucesso em {node}[/bold green]", style="green"))
+                else:
+                    console.print(Panel(f"[bold red]{comp} NÃO finalizado com sucesso em {node}[/bold red]", style="red"))
+        sucesso = all(component_results.values())
+        if not sucesso:
+            console.print(Panel(f"[bold red]Falha ao executar {execucao.fluxo.descricao.lower()} via Jenkins para {node}. Processo NÃO COMPLETO.[/bold red]", style="red"))
+        return sucesso
+
+    return encadear(iniciar_pipeline(componentes), concluir)
+
+def passo_habilitar(execucao):
+    node = execucao.node
+    manager_f5 = execucao.recursos["manager_f5"]
+    console.print(Panel(f"[bold green]{execucao.fluxo.descricao} de {node} concluído com sucesso. Habilitando node nos balanceadores...[/bold green]", style="green"))
+    resultados_enable = executar_nos_balancers_do_node(manager_f5, habilitar_node, node)
+    enable_table = Table(title="Resultado - Enable", box=box.SIMPLE)
+    enable_table.add_column("Balanceador", style="bold cyan")
+    enable_table.add_column("Resultado", style="bold green")
+    for nome, result in resultados_enable:
+        enable_table.add_row(nome, str(result))
+    console.print(enable_table)
+    console.print(Panel(f"[bold green]{execucao.fluxo.descricao} realizado com sucesso![/bold green]", style="green"))
+    return True
+
+_ETAPAS_RESTART = [
+    Passo("cluster", passo_localizar_cluster),
+    Passo("isolar", passo_isolar),
+    Passo("persistencia", passo_espera_isolamento),
+    Passo("drenar", passo_drenar),
+    Passo("jenkins", passo_jenkins),
+    Passo("habilitar", passo_habilitar),
+]
+
+FLUXO_RESTART = Fluxo("Restart", "Restart completo", _ETAPAS_RESTART, componentes={
+    "WASP": [("Websphere", ())],
+    "TRNP": [("Websphere", ())],
+    # Websphere primeiro; SRTB e Liberty em paralelo assim que ele terminar
+    "CTRP": [("Websphere", ()), ("SRTB", ("Websphere",)), ("Liberty", ("Websphere",))],
+})
+
+FLUXO_RESTART_CLEAR = Fluxo("Restart Clear", "Restart completo com limpeza", _ETAPAS_RESTART, componentes={
+    "WASP": [("Limpeza", ())],
+    "TRNP": [("Limpeza", ())],
+    # Limpeza primeiro; SRTB e Liberty em paralelo assim que ela terminar
+    "CTRP": [("Limpeza", ()), ("SRTB", ("Limpeza",)), ("Liberty", ("Limpeza",))],
+})
+
+# Limpeza avulsa: sem isolamento, qualquer prefixo
+FLUXO_LIMPEZA = Fluxo("Limpeza", "Limpeza", [
+    Passo("cluster", passo_localizar_cluster),
+    Passo("jenkins", passo_jenkins),
+], componentes={"*": [("Limpeza", ())]})
+
+# Fluxos de recuperação de execuções interrompidas (console fechado no meio do fluxo)
+# Na retomada a etapa de Jenkins usa os componentes do fluxo interrompido (dados["fluxo_origem"])
+FLUXO_RETOMADA = Fluxo("Retomada", "Retomada de restart", [
+    Passo("reanexar", passo_jenkins),
+    Passo("habilitar", passo_habilitar),
+])
+FLUXO_RETOMADA_LIMPEZA = Fluxo("Retomada Limpeza", "Retomada de limpeza", [
+    Passo("reanexar", passo_jenkins),
+])
+FLUXO_ROLLBACK = Fluxo("Rollback", "Rollback do isolamento", [
+    Passo("habilitar", passo_habilitar),
+])
+
+FLUXOS = [FLUXO_RESTART, FLUXO_LIMPEZA, FLUXO_RESTART_CLEAR, FLUXO_RETOMADA, FLUXO_RETOMADA_LIMPEZA, FLUXO_ROLLBACK]
+FLUXOS_POR_NOME = {fluxo.nome: fluxo for fluxo in FLUXOS}
+
+# Agendador único dos fluxos: dono do manager F5, do acompanhamento de drenagem e do pool de jobs
+_agendador = None
+_agendador_lock = threading.Lock()
+
+def obter_agendador(manager_f5):
+    global _agendador
+    with _agendador_lock:
+        if _agendador is None:
+            try:
+                store = JobStore()
+            except Exception as e:
+                console.print(f"[red]Banco de execuções indisponível, fluxos não serão retomáveis: {e}[/red]")
+                store = None
+            _agendador = AgendadorFluxos(
+                recursos={"manager_f5": manager_f5, "drain_watcher": obter_drain_watcher(manager_f5)},
+                politicas=POLITICAS_PREFIXO,
+                store=store,
+            )
+        return _agendador
+
+def iniciar_fluxo(manager_f5, fluxo, node, user_info, cluster_name=None):
+    """Inicia o fluxo em segundo plano e retorna a execução (acompanhada na opção 9)"""
+    return obter_agendador(manager_f5).iniciar(
+        fluxo, node,
+        login=user_info["jenkins_user"], senha=user_info["jenkins_token"], cluster_name=cluster_name,
+    )
+
+# Fim da descrição das ações que deixam o node fora dos balanceadores para o operador verificar
+PERMANECE_ISOLADO = "node permanece isolado"
+
+def _plano_recuperacao(orfa):
+    """(fluxo de recuperação ou None, descrição) a partir das etapas e dos dados gravados.
+
+    O node só é habilitado depois que todos os componentes que o fluxo
+    interrompido exige para ele concluíram: a retomada reanexa aos builds
+    registrados, resolve os itens de fila e dispara os que não chegaram a ser
+    disparados. Se isso não é possível, o node fica isolado.
+    """
+    eventos = {}
+    for passo, evento in orfa["passos"]:
+        eventos.setdefault(passo, set()).add(evento)
+    dados = orfa["dados"]
+    habilitado = "ok" in eventos.get("habilitar", set())
+
+    if orfa["fluxo"] == FLUXO_ROLLBACK.nome:
+        if habilitado:
+            return None, "node já habilitado"
+        return FLUXO_ROLLBACK, "repetir habilitação interrompida"
+
+    retomada = orfa["fluxo"] in (FLUXO_RETOMADA.nome, FLUXO_RETOMADA_LIMPEZA.nome)
+    # A retomada de restart só existe para nodes isolados pelo fluxo original
+    isolado = orfa["fluxo"] == FLUXO_RETOMADA.nome or (not retomada and "isolar" in eventos)
+    jenkins = eventos.get("reanexar" if retomada else "jenkins", set())
+    if habilitado:
+        return None, "node já habilitado"
+    if "falha" in jenkins:
+        return None, f"build falhou antes da queda: {PERMANECE_ISOLADO}" if isolado else "build falhou antes da queda"
+    if "ok" in jenkins:
+        if isolado:
+            return FLUXO_ROLLBACK, "builds concluídos: habilitar node"
+        return None, "builds concluídos"
+    if not retomada and not jenkins:
+        # Nenhum job disparado: o node não foi tocado
+        if isolado:
+            return FLUXO_ROLLBACK, "desfazer isolamento (habilitar node)"
+        return None, "nada a desfazer (nenhum job disparado)"
+
+    origem = FLUXOS_POR_NOME.get(dados.get("fluxo_origem") or orfa["fluxo"])
+    componentes = origem.componentes_do_node(orfa["node"]) if origem else None
+    if not componentes:
+        return None, f"componentes do fluxo desconhecidos: {PERMANECE_ISOLADO}" if isolado else "componentes do fluxo desconhecidos"
+    builds = dados.get("builds") or {}
+    filas = dados.get("filas") or {}
+    reanexar, resolver, disparar, incertos = [], [], [], []
+    for nome, _ in componentes:
+        if builds.get(nome):
+            reanexar.append(nome)
+        elif filas.get(nome):
+            resolver.append(nome)
+        elif nome in filas:
+            incertos.append(nome)
+        else:
+            disparar.append(nome)
+    if incertos:
+        # Sem a URL da fila não há como saber se o job entrou; disparar de novo repetiria o restart
+        detalhe = f"disparo de {', '.join(incertos)} sem registro na fila, verificar no Jenkins"
+        return None, f"{detalhe}: {PERMANECE_ISOLADO}" if isolado else detalhe
+    if not isolado:
+        if not reanexar and not resolver:
+            return None, "nada a desfazer (limpeza sem isolamento)"
+        # Limpeza avulsa: acompanha o que já foi disparado, sem disparar por conta própria
+        disparar = []
+    acoes = []
+    if reanexar:
+        acoes.append(f"reanexar a {', '.join(reanexar)}")
+    if resolver:
+        acoes.append(f"aguardar fila de {', '.join(resolver)}")
+    if disparar:
+        acoes.append(f"disparar {', '.join(disparar)}")
+    if isolado:
+        return FLUXO_RETOMADA, "; ".join(acoes) + " e habilitar ao concluir"
+    return FLUXO_RETOMADA_LIMPEZA, "; ".join(acoes)
+
+def recuperar_execucoes(manager_f5, user_info):
+    """Retoma ou desfaz execuções deixadas abertas por consoles encerrados"""
+    agendador = obter_agendador(manager_f5)
+    if not agendador.store:
+        return
+    try:
+        orfas = agendador.store.orfas()
+    except Exception as e:
+        console.print(f"[red]Erro ao ler execuções interrompidas: {e}[/red]")
+        return
+    if not orfas:
+        return
+    table = Table(title="Execuções interrompidas encontradas", box=box.SIMPLE)
+    table.add_column("Fluxo", style="bold magenta")
+    table.add_column("Node", style="bold yellow")
+    table.add_column("Última etapa", style="cyan")
+    table.add_column("Ação", style="green")
+    isolados = []
+    for orfa in orfas:
+        fluxo, acao = _plano_recuperacao(orfa)
+        if not agendador.store.assumir(orfa["id"], f"RECUPERADO: {acao}"):
+            # Outro console já assumiu esta execução
+            continue
+        table.add_row(orfa["fluxo"], orfa["node"], orfa["passo_atual"] or "-", acao)
+        if acao.endswith(PERMANECE_ISOLADO):
+            isolados.append(orfa["node"])
+        if fluxo:
+            dados = {k: v for k, v in orfa["dados"].items() if k not in ("login", "senha")}
+            dados["fluxo_origem"] = dados.get("fluxo_origem") or orfa["fluxo"]
+            agendador.iniciar(fluxo, orfa["node"], login=user_info["jenkins_user"], senha=user_info["jenkins_token"], **dados)
+    console.print(table)
+    if isolados:
+        console.print(Panel(f"[bold red]Nodes mantidos isolados para verificação manual: {', '.join(isolados)}[/bold red]", style="red"))
 
-def restart_completo_multi(manager_f5, nodes, user_info):
-    # Executa o restart completo de múltiplos nodes em paralelo
-    def worker(node):
-        restart_completo(manager_f5, node, user_info)
-    with ThreadPoolExecutor(max_workers=len(nodes)) as executor:
-        futures = [executor.submit(worker, node) for node in nodes]
-        for future in as_completed(futures):
-            pass
+def restart_completo(manager_f5, node, user_info):
+    return iniciar_fluxo(manager_f5, FLUXO_RESTART, node, user_info).resultado.result()
+
+def restart_completo_clear(manager_f5, node, user_info):
+    return iniciar_fluxo(manager_f5, FLUXO_RESTART_CLEAR, node, user_info).resultado.result()
+
+# ---------------------------------------------------------------------------
+# Restart em lote por cluster (rolling)
+# ---------------------------------------------------------------------------
+
+# Nodes reiniciados ao mesmo tempo em cada cluster (padrão da opção 4)
+NODES_POR_CLUSTER = 1
+# Capacidade mínima de cada pool durante o restart: membros saudáveis
+# (up + enabled) que precisam sobrar após isolar o próximo node
+MINIMO_MEMBROS_SAUDAVEIS = 1
+FRACAO_MINIMA_SAUDAVEIS = 0.5
+# Validade do mapa node -> pools de cada balanceador
+TTL_POOLS_POR_NODE = 300
+# Espera máxima por capacidade de um node antes de falhar (e cancelar o resto do cluster)
+ESPERA_MAXIMA_CAPACIDADE = 900
+
+_pools_por_node = {}
+_pools_por_node_lock = threading.Lock()
+
+async def _pools_por_node_async(balancer):
+    """Mapa node -> pools do balanceador, em cache por TTL_POOLS_POR_NODE segundos"""
+    with _pools_por_node_lock:
+        cache = _pools_por_node.get(balancer.name)
+    if cache and time.time() - cache[0] < TTL_POOLS_POR_NODE:
+        return cache[1]
+    mapa = await balancer.get_pools_por_node_async()
+    if mapa is not None:
+        with _pools_por_node_lock:
+            _pools_por_node[balancer.name] = (time.time(), mapa)
+    return mapa
+
+def verificar_capacidade(manager_f5, node, em_andamento):
+    """(permitido, motivo): isolar o node mantém o mínimo de membros saudáveis em
+    todos os pools de que ele participa? Nodes em andamento contam como fora."""
+    balancers = manager_f5.balancers_do_node(node)
+    fora = {n.upper() for n in em_andamento}
+    node_upper = node.upper()
+
+    async def consultar():
+        mapas = await asyncio.gather(*(_pools_por_node_async(b) for b in balancers), return_exceptions=True)
+        consultas = [
+            (b, pool)
+            for b, mapa in zip(balancers, mapas) if isinstance(mapa, dict)
+            for pool in mapa.get(node_upper, [])
+        ]
+        membros = await asyncio.gather(*(b.get_pool_members_async(pool) for b, pool in consultas), return_exceptions=True)
+        return list(zip(consultas, membros))
+
+    for (balancer, pool), resultado in executar_sync(consultar()):
+        if not isinstance(resultado, list) or not resultado:
+            return False, f"{balancer.name}/{pool}: membros indisponíveis"
+        membros = resultado[0].get("members", [])
+        saudaveis = [
+            m for m in membros
+            if m.get("state") == "up" and m.get("status") == "enabled"
+            and m.get("name", "").split(":")[0].upper() not in fora | {node_upper}
+        ]
+        minimo = max(MINIMO_MEMBROS_SAUDAVEIS, math.ceil(FRACAO_MINIMA_SAUDAVEIS * len(membros)))
+        if len(saudaveis) < minimo:
+            return False, f"{balancer.name}/{pool}: {len(saudaveis)} saudáveis após isolar, mínimo {minimo}"
+    return True, None
+
+def pools_degradados(manager_f5, nodes):
+    """{node: motivo} dos nodes cujos pools já estão abaixo do mínimo antes de qualquer
+    isolamento (pool de um membro, membros fora, consulta indisponível): esperar não resolve"""
+    degradados = {}
+    for node in nodes:
+        try:
+            permitido, motivo = verificar_capacidade(manager_f5, node, [])
+        except Exception as e:
+            permitido, motivo = False, f"erro ao consultar capacidade: {e}"
+        if not permitido:
+            degradados[node] = motivo
+    return degradados
+
+def confirmar_pools_degradados(degradados):
+    """Pergunta ao operador se os nodes com pools já degradados podem ser reiniciados assim mesmo"""
+    table = Table(title="Pools já abaixo da capacidade mínima", box=box.SIMPLE)
+    table.add_column("Node", style="bold yellow")
+    table.add_column("Motivo", style="red")
+    for node, motivo in degradados.items():
+        table.add_row(node, motivo)
+    console.print(table)
+    resposta = Prompt.ask("Reiniciar esses nodes mesmo assim (sem checagem de capacidade)?", choices=["s", "n"], default="n")
+    return resposta == "s"
+
+# Restarts em lote em andamento (acompanhados na opção 9)
+rolling_restarts = []
+
+def iniciar_restart_rolling(manager_f5, nodes, user_info, por_cluster=NODES_POR_CLUSTER, confirmar_degradados=None):
+    """Agrupa os nodes por cluster (Pesquisar) e reinicia `por_cluster` de cada vez,
+    respeitando a capacidade mínima dos pools. Retorna o RollingRestart.
+
+    Nodes com pools já degradados antes do restart só são iniciados se
+    confirmar_degradados({node: motivo}) retornar True (sem checagem de
+    capacidade); caso contrário ficam fora do lote com o motivo.
+    """
+    # Node informado duas vezes (inclusive com outra caixa) reiniciaria duas vezes no cluster
+    unicos = {}
+    for node in nodes:
+        unicos.setdefault(node.upper(), node)
+    nodes = list(unicos.values())
+    degradados = pools_degradados(manager_f5, nodes)
+    liberados = bool(degradados) and confirmar_degradados is not None and confirmar_degradados(degradados)
+    recusados = {} if liberados else {node: f"não iniciado: {motivo}" for node, motivo in degradados.items()}
+
+    grupos = {}
+    for node in nodes:
+        if node in recusados:
+            continue
+        host, cluster_name = pesquisar(node)
+        grupos.setdefault(cluster_name or f"sem cluster ({node})", []).append(node)
+
+    limites = {}
+    for cluster_name, membros in grupos.items():
+        hosts = inventario.hosts_do_cluster(cluster_name)
+        # Nunca isola o cluster inteiro de uma vez, mesmo sem dados de pool
+        limite = min(por_cluster, len(hosts) - MINIMO_MEMBROS_SAUDAVEIS) if hosts else por_cluster
+        limites[cluster_name] = (membros, max(1, limite))
+
+    rolling = RollingRestart(
+        iniciar=lambda node: iniciar_fluxo(manager_f5, FLUXO_RESTART, node, user_info),
+        capacidade=lambda node, em_andamento: verificar_capacidade(manager_f5, node, em_andamento),
+        espera_maxima=ESPERA_MAXIMA_CAPACIDADE,
+    )
+    rolling_restarts.append(rolling)
+    rolling.executar(limites, forcados=degradados if liberados else (), recusados=recusados)
+    return rolling
+
+def restart_completo_multi(manager_f5, nodes, user_info, por_cluster=NODES_POR_CLUSTER, confirmar_degradados=None):
+    # Restart completo de múltiplos nodes, por cluster, aguardando todos
+    return iniciar_restart_rolling(manager_f5, nodes, user_info, por_cluster, confirmar_degradados).resultado.result()
 
 def verificar_balancers_autenticados(manager_f5):
     # Verifica TODOS os balanceadores configurados (exige que todos estejam com token válido)
@@ -484,20 +698,21 @@ def verificar_balancers_autenticados(manager_f5):
     return False
 
 def limpar_disco_e_outofmemory(nodes, adm_user, adm_pass):
-    from concurrent.futures import ThreadPoolExecutor, as_completed
     hosts = [node.strip() for node in nodes.split(',')]
     results = []
 
     def worker(host):
-        result_opt = clean_opt_disk(host, adm_user, adm_pass)
+        # Chama a limpeza do host direto (sem clean_opt_disk) para não aninhar tarefas no pool SSH;
+        # as duas etapas usam a mesma sessão SSH do pool de sessões
+        result_opt = {"status": "success", "message": execute_ssh_commands(host, adm_user, adm_pass)}
         result_oom = move_files_ssh(host, adm_user, adm_pass)
         return host, result_opt, result_oom
 
-    with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
-        futures = [executor.submit(worker, host) for host in hosts]
-        for future in as_completed(futures):
-            host, result_opt, result_oom = future.result()
-            results.append((host, result_opt, result_oom))
+    executor = obter_pool("ssh")
+    futures = [executor.submit(worker, host) for host in hosts]
+    for future in as_completed(futures):
+        host, result_opt, result_oom = future.result()
+        results.append((host, result_opt, result_oom))
     return results
 
 def main_menu(manager_f5, user_info):
@@ -525,18 +740,23 @@ def main_menu(manager_f5, user_info):
             table.add_column("Node", style="bold yellow")
             table.add_column("Cluster", style="bold magenta")
             table.add_column("Resumo", style="bold cyan")
-            for node in nodes.split(","):
+            node_list = [node for node in nodes.split(",") if node]
+            # Uma única consulta de stats por balanceador, só nos que possuem algum dos nodes
+            resultados = executar_em_paralelo(manager_f5.balancers_dos_nodes(node_list), consultar_status_nodes, node_list)
+            for node in node_list:
                 host, cluster_name = pesquisar(node)
-                resultados = executar_em_paralelo(manager_f5.authenticated_balancers, consultar_status_node, node)
-                for nome, status in resultados:
+                resumos = []
+                for nome, por_node in resultados:
+                    status = por_node.get(node) if isinstance(por_node, dict) else por_node
                     if isinstance(status, dict) and status.get("found"):
-                        resumo = (
+                        resumos.append(
                             f"[bold yellow]Servidor {status.get('servidor')}[/bold yellow] - "
                             f"Status [bold green]{status.get('status')}[/bold green] - "
                             f"connections [bold blue]{status.get('connections', 0)}[/bold blue]"
                         )
-                    else:
-                        resumo = "[red]Não encontrado ou erro[/red]"
+                    elif not isinstance(status, dict):
+                        resumos.append(f"[red]{nome}: erro na consulta[/red]")
+                for resumo in resumos or ["[red]Não encontrado em nenhum balanceador[/red]"]:
                     table.add_row(
                         f"[bold]{node}[/bold]",
                         f"[magenta]{cluster_name if cluster_name else '-'}[/magenta]",
@@ -549,7 +769,7 @@ def main_menu(manager_f5, user_info):
             table.add_column("Balanceador")
             table.add_column("Resultado")
             for node in nodes.split(","):
-                resultados = executar_em_paralelo(manager_f5.authenticated_balancers, forcar_offline_node, node)
+                resultados = executar_nos_balancers_do_node(manager_f5, forcar_offline_node, node)
                 for nome, result in resultados:
                     table.add_row(nome, str(result))
             console.print(table)
@@ -559,7 +779,7 @@ def main_menu(manager_f5, user_info):
             table.add_column("Balanceador")
             table.add_column("Resultado")
             for node in nodes.split(","):
-                resultados = executar_em_paralelo(manager_f5.authenticated_balancers, habilitar_node, node)
+                resultados = executar_nos_balancers_do_node(manager_f5, habilitar_node, node)
                 for nome, result in resultados:
                     table.add_row(nome, str(result))
             console.print(table)
@@ -579,10 +799,10 @@ def main_menu(manager_f5, user_info):
                 style="cyan"
             ))
             
-            for node in node_list:
-                job = RestartJob(node, manager_f5, user_info)
-                restart_jobs.append(job)
-                job.start()
+            por_cluster = NODES_POR_CLUSTER
+            if len(node_list) > 1:
+                por_cluster = IntPrompt.ask("Nodes simultâneos por cluster", default=NODES_POR_CLUSTER)
+            iniciar_restart_rolling(manager_f5, node_list, user_info, por_cluster, confirmar_degradados=confirmar_pools_degradados)
             console.print(Panel("[bold blue]Restart(s) iniciado(s) em segundo plano![/bold blue]\nUse a opção 9 para acompanhar.", style="blue"))
         elif opcao == '6':
             sub = Prompt.ask("Opção 6 - Escolha: 1) Listar todos pools  2) Pesquisar pools", choices=["1","2"], default="1")
@@ -686,6 +906,8 @@ def main_menu(manager_f5, user_info):
         elif opcao == '11':
             console.print("[bold red]Saindo...[/bold red]")
             manager_f5.cleanup()
+            encerrar_sessoes_ssh()
+            encerrar_acompanhamentos()
             break
         elif opcao == '8':
             # Tenta obter ADM do arquivo de credenciais (retornado em user_info)
@@ -718,61 +940,47 @@ def main_menu(manager_f5, user_info):
             table.add_column("Status", style="bold cyan")
             table.add_column("Início", style="green")
             table.add_column("Fim", style="red")
-            for job in restart_jobs:
-                # Colorir status: sucesso=verde, erro=vermelho, executando=amarelo
-                st = (job.status or "").upper()
-                if "SUCESSO" in st or "FINALIZADO (SUCESSO)" in st:
-                    status_col = f"[green]{job.status}[/green]"
-                elif "EXECUTANDO" in st or "RUNNING" in st:
-                    status_col = f"[yellow]{job.status}[/yellow]"
-                else:
-                    # tratar como erro/falha por padrão
-                    status_col = f"[red]{job.status}[/red]"
-
-                table.add_row(
-                    "Restart",
-                    job.node,
-                    status_col,
-                    job.start_time,
-                    job.end_time if job.end_time else "-"
-                )
-            for job in clean_jobs:
-                # Colorir status: sucesso=verde, erro=vermelho, executando=amarelo
-                st = (job.status or "").upper()
-                if "SUCESSO" in st or "FINALIZADO (SUCESSO)" in st:
-                    status_col = f"[green]{job.status}[/green]"
-                elif "EXECUTANDO" in st or "RUNNING" in st:
-                    status_col = f"[yellow]{job.status}[/yellow]"
-                else:
-                    # tratar como erro/falha por padrão
-                    status_col = f"[red]{job.status}[/red]"
-
-                table.add_row(
-                    "Limpeza",
-                    job.node,
-                    status_col,
-                    job.start_time,
-                    job.end_time if job.end_time else "-"
-                )
-            for job in restart_clear_jobs:
-                # Colorir status: sucesso=verde, erro=vermelho, executando=amarelo
-                st = (job.status or "").upper()
-                if "SUCESSO" in st or "FINALIZADO (SUCESSO)" in st:
-                    status_col = f"[green]{job.status}[/green]"
-                elif "EXECUTANDO" in st or "RUNNING" in st:
-                    status_col = f"[yellow]{job.status}[/yellow]"
-                else:
-                    # tratar como erro/falha por padrão
-                    status_col = f"[red]{job.status}[/red]"
-
-                table.add_row(
-                    "Restart Clear",
-                    job.node,
-                    status_col,
-                    job.start_time,
-                    job.end_time if job.end_time else "-"
-                )
+            for fluxo in FLUXOS:
+                for job in obter_agendador(manager_f5).execucoes(fluxo.nome):
+                    # Colorir status: sucesso=verde, erro=vermelho, executando=amarelo
+                    st = (job.status or "").upper()
+                    if "SUCESSO" in st or "FINALIZADO (SUCESSO)" in st:
+                        status_col = f"[green]{job.status}[/green]"
+                    elif "EXECUTANDO" in st or "RUNNING" in st:
+                        status_col = f"[yellow]{job.status} ({job.passo_atual})[/yellow]"
+                    else:
+                        # tratar como erro/falha por padrão
+                        status_col = f"[red]{job.status}[/red]"
+
+                    table.add_row(
+                        fluxo.nome,
+                        job.node,
+                        status_col,
+                        job.start_time,
+                        job.end_time if job.end_time else "-"
+                    )
+            for rolling in rolling_restarts:
+                for node, motivo in rolling.aguardando().items():
+                    table.add_row("Restart (fila)", node, f"[cyan]AGUARDANDO: {motivo}[/cyan]", "-", "-")
+                for node, motivo in rolling.motivos().items():
+                    table.add_row("Restart (fila)", node, f"[red]{motivo}[/red]", "-", "-")
             console.print(table)
+
+            # Uso das conexões HTTP por balanceador (reaproveitamento de TLS)
+            pools_table = Table(title="Conexões HTTP por Balanceador", box=box.SIMPLE)
+            pools_table.add_column("Balanceador", style="bold cyan")
+            pools_table.add_column("Requisições", style="green")
+            pools_table.add_column("Conexões criadas", style="yellow")
+            pools_table.add_column("Req. simultâneas / Pico / Limite conexões", style="magenta")
+            for nome, metricas in manager_f5.metricas_pools().items():
+                sync, assincrono = metricas["sync"], metricas["async"]
+                pools_table.add_row(
+                    nome,
+                    str(sync["requisicoes"] + assincrono["requisicoes"]),
+                    str(sync["conexoes_criadas"] + assincrono.get("conexoes_abertas", 0)),
+                    f"{assincrono['em_uso']} / {assincrono['pico']} / {assincrono['max_conexoes']}"
+                )
+            console.print(pools_table)
         elif opcao == '10':
             nodes = Prompt.ask("Nome(s) do node (separados por vírgula)").strip().upper().replace(" ", "")
             for node in nodes.split(","):
@@ -780,9 +988,7 @@ def main_menu(manager_f5, user_info):
                 if not cluster_name:
                     console.print(Panel("[bold red]Cluster não encontrado para o node.[/bold red]", style="red"))
                     continue
-                job = CleanJob(node, cluster_name, user_info)
-                clean_jobs.append(job)
-                job.start()
+                iniciar_fluxo(manager_f5, FLUXO_LIMPEZA, node, user_info, cluster_name=cluster_name)
                 console.print(Panel(f"[bold green]Limpeza iniciada para {node} em background.[/bold green]", style="green"))
         elif opcao == '5':
             nodes = Prompt.ask("Nome(s) do node (separados por vírgula)").strip().upper().replace(" ", "")
@@ -791,16 +997,18 @@ def main_menu(manager_f5, user_info):
                 if not cluster_name:
                     console.print(Panel("[bold red]Cluster não encontrado para o node.[/bold red]", style="red"))
                     continue
-                job = RestartClearJob(node, manager_f5, user_info)
-                restart_clear_jobs.append(job)
-                job.start()
+                iniciar_fluxo(manager_f5, FLUXO_RESTART_CLEAR, node, user_info, cluster_name=cluster_name)
                 console.print(Panel(f"[bold green]Restart completo com limpeza iniciado para {node} em background.[/bold green]", style="green"))
         else:
             console.print("[red]Opção inválida.[/red]")
 
 def main():
     print("=== SISTEMA F5 TERMINAL ===")
+    # Endpoint Prometheus local (/metrics); eventos em JSONL só com METRICAS_ARQUIVO definido
+    iniciar_servidor_metricas()
     user_info = ler_credenciais_arquivo()
+    # Carrega o inventário de clusters do snapshot local e atualiza em background
+    inventario.carregar_em_background()
     manager_f5 = F5Manager()
     # Pre-configura username/password e token_manager em cada balancer
     for balancer in manager_f5.balancers:
@@ -818,6 +1026,8 @@ def main():
         print("Nenhum balanceador autenticado. Verifique suas credenciais.")
         sys.exit(1)
     print(f"{len(manager_f5.authenticated_balancers)} balanceadores autenticados.")
+    # Execuções abertas de consoles encerrados: reanexa aos builds ou reabilita os nodes isolados
+    recuperar_execucoes(manager_f5, user_info)
     main_menu(manager_f5, user_info)
 
 if __name__ == "__main__":
@@ -0,0 +1,287 @@
+"""Benchmarks do console contra balanceadores F5 e Jenkins simulados.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.executar --nodes 1,10,100,500
+    python -m benchmarks.executar --nodes 100 --latencia 0.03 --salvar --comparar
+
+Cada tamanho sobe seus próprios simuladores F5 (um por balanceador) e roda os
+cenários escolhidos; o Jenkins simulado é único para a execução. Os resultados
+podem ser acumulados em benchmarks/resultados/f5_historico.jsonl e comparados com
+uma baseline para detectar regressões antes de subir mudanças.
+"""
+import os
+import io
+import sys
+import time
+import logging
+import argparse
+import threading
+import contextlib
+from concurrent.futures import wait
+from benchmarks.mock_f5 import SimuladorF5
+from benchmarks.mock_jenkins import SimuladorJenkins
+from benchmarks import regressao
+
+CENARIOS = ("status", "isolar_habilitar", "drenagem", "membros_pool", "fluxos")
+
+LOGIN_BENCH = "bench"
+SENHA_BENCH = "bench"
+
+def _resumo(latencias, duracao, falhas=0, requisicoes_f5=0, requisicoes_jenkins=0):
+    return regressao.resumo(latencias, duracao, falhas, req_f5=requisicoes_f5, req_jenkins=requisicoes_jenkins)
+
+class AmbienteF5:
+    """Simuladores F5 + F5Manager apontando para eles.
+
+    Cada node existe em `presenca` balanceadores consecutivos (como os pares
+    de produção) e os nodes de um mesmo grupo formam pools de
+    membros_por_pool membros.
+    """
+
+    def __init__(self, quantidade, args):
+        from CompletoInputALLB import F5Monitor, F5Manager
+
+        self.nodes = [f"{args.prefixo}{i:04d}" for i in range(1, quantidade + 1)]
+        presenca = max(1, min(args.presenca, args.balanceadores))
+        grupos = max(1, args.balanceadores // presenca)
+        nodes_por_balancer = [[] for _ in range(args.balanceadores)]
+        pools_por_balancer = [{} for _ in range(args.balanceadores)]
+        self.balancers_do_pool = {}
+        for grupo in range(grupos):
+            membros_grupo = self.nodes[grupo::grupos]
+            indices = [grupo * presenca + k for k in range(presenca)]
+            for indice in indices:
+                nodes_por_balancer[indice].extend(membros_grupo)
+            for inicio in range(0, len(membros_grupo), args.membros_por_pool):
+                pool = f"POOL_G{grupo}_{inicio // args.membros_por_pool}"
+                membros = [f"{n}:9080" for n in membros_grupo[inicio:inicio + args.membros_por_pool]]
+                for indice in indices:
+                    pools_por_balancer[indice][pool] = membros
+                self.balancers_do_pool[pool] = [f"SIM{indice}" for indice in indices]
+
+        self.simuladores = [
+            SimuladorF5(f"SIM{i}", nodes_por_balancer[i], pools_por_balancer[i], latencia=args.latencia, conexoes=args.conexoes)
+            for i in range(args.balanceadores)
+        ]
+        monitores = []
+        for simulador in self.simuladores:
+            monitor = F5Monitor(simulador.iniciar(), simulador.nome)
+            monitor.set_credentials(LOGIN_BENCH, SENHA_BENCH)
+            monitores.append(monitor)
+        self.manager = F5Manager(monitores)
+        self.manager.authenticated_balancers = list(monitores)
+
+    def requisicoes(self):
+        return sum(s.total_requisicoes() for s in self.simuladores)
+
+    def zerar_contadores(self):
+        for simulador in self.simuladores:
+            simulador.zerar_contadores()
+
+    def restaurar_nodes(self):
+        for simulador in self.simuladores:
+            simulador.restaurar_nodes()
+
+    def encerrar(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.manager.cleanup()
+        for simulador in self.simuladores:
+            simulador.parar()
+
+def _em_paralelo(funcao, itens):
+    """Executa funcao(item) para cada item no pool "jobs" e retorna [(latência, resultado)]"""
+    from features.worker_pools import obter_pool
+
+    def medir(item):
+        inicio = time.perf_counter()
+        resultado = funcao(item)
+        return time.perf_counter() - inicio, resultado
+
+    futures = [obter_pool("jobs").submit(medir, item) for item in itens]
+    wait(futures)
+    return [f.result() for f in futures]
+
+def cenario_status(ambiente, args, jenkins):
+    """Opção 1: status de todos os nodes (uma consulta de stats por balanceador)"""
+    import backend
+
+    # Primeira consulta fora da medição: carrega o índice node -> balanceadores
+    backend.executar_em_paralelo(ambiente.manager.balancers_dos_nodes(ambiente.nodes), backend.consultar_status_nodes, ambiente.nodes)
+    ambiente.zerar_contadores()
+    latencias = []
+    inicio = time.perf_counter()
+    for _ in range(args.repeticoes):
+        t0 = time.perf_counter()
+        backend.executar_em_paralelo(ambiente.manager.balancers_dos_nodes(ambiente.nodes), backend.consultar_status_nodes, ambiente.nodes)
+        latencias.append(time.perf_counter() - t0)
+    return _resumo(latencias, time.perf_counter() - inicio, requisicoes_f5=ambiente.requisicoes())
+
+def cenario_isolar_habilitar(ambiente, args, jenkins):
+    """Opções 2 e 3: isolar e reabilitar cada node, todos os nodes em paralelo"""
+    import backend
+
+    def isolar_e_habilitar(node):
+        offline = backend.executar_nos_balancers_do_node(ambiente.manager, backend.forcar_offline_node, node)
+        enable = backend.executar_nos_balancers_do_node(ambiente.manager, backend.habilitar_node, node)
+        return all(isinstance(r, dict) and r.get("found") for _, r in offline + enable)
+
+    inicio = time.perf_counter()
+    medidas = _em_paralelo(isolar_e_habilitar, ambiente.nodes)
+    falhas = sum(1 for _, ok in medidas if not ok)
+    return _resumo([l for l, _ in medidas], time.perf_counter() - inicio, falhas, ambiente.requisicoes())
+
+def cenario_drenagem(ambiente, args, jenkins):
+    """Todos os nodes isolados e acompanhados juntos pelo DrainWatcher até zerar"""
+    import backend
+    from features.drain_watcher import DrainWatcher
+
+    _em_paralelo(lambda node: backend.executar_nos_balancers_do_node(ambiente.manager, backend.forcar_offline_node, node), ambiente.nodes)
+    ambiente.zerar_contadores()
+    watcher = DrainWatcher(lambda: ambiente.manager.authenticated_balancers, intervalo_rapido=args.intervalo,
+                           intervalo_lento=args.intervalo, balancers_do_node=ambiente.manager.balancers_do_node)
+    latencias = []
+    lock = threading.Lock()
+    inicio = time.perf_counter()
+
+    def registrar(t0):
+        def concluido(future):
+            with lock:
+                latencias.append(time.perf_counter() - t0)
+        return concluido
+
+    futures = []
+    for node in ambiente.nodes:
+        future = watcher.aguardar(node, timeout=args.timeout)
+        future.add_done_callback(registrar(time.perf_counter()))
+        futures.append(future)
+    wait(futures)
+    duracao = time.perf_counter() - inicio
+    requisicoes = ambiente.requisicoes()
+    falhas = sum(1 for f in futures if not f.result())
+    ambiente.restaurar_nodes()
+    return _resumo(latencias, duracao, falhas, requisicoes)
+
+def cenario_membros_pool(ambiente, args, jenkins):
+    """get_pool_members de todos os pools nos balanceadores que os possuem"""
+    import backend
+
+    balancers = {b.name: b for b in ambiente.manager.authenticated_balancers}
+
+    def membros(pool):
+        resultados = backend.executar_em_paralelo([balancers[n] for n in ambiente.balancers_do_pool[pool]], backend.listar_membros_pool, pool)
+        return all(isinstance(r, list) and r and r[0].get("members") for _, r in resultados)
+
+    inicio = time.perf_counter()
+    medidas = _em_paralelo(membros, list(ambiente.balancers_do_pool))
+    falhas = sum(1 for _, ok in medidas if not ok)
+    return _resumo([l for l, _ in medidas], time.perf_counter() - inicio, falhas, ambiente.requisicoes())
+
+def cenario_fluxos(ambiente, args, jenkins):
+    """Restart completo (isolar, drenar, Jenkins, habilitar) de todos os nodes ao mesmo tempo"""
+    import backend
+    from features.drain_watcher import DrainWatcher
+    from features.workflow import AgendadorFluxos, Politica
+
+    agendador = AgendadorFluxos(
+        recursos={
+            "manager_f5": ambiente.manager,
+            "drain_watcher": DrainWatcher(lambda: ambiente.manager.authenticated_balancers, intervalo_rapido=args.intervalo,
+                                          intervalo_lento=args.intervalo, balancers_do_node=ambiente.manager.balancers_do_node),
+        },
+        politicas={"*": Politica(timeout_drenagem=args.timeout, timeout_build=args.timeout)},
+    )
+    latencias = []
+    lock = threading.Lock()
+    inicio = time.perf_counter()
+
+    def registrar(t0):
+        def concluido(future):
+            with lock:
+                latencias.append(time.perf_counter() - t0)
+        return concluido
+
+    execucoes = []
+    for node in ambiente.nodes:
+        execucao = agendador.iniciar(backend.FLUXO_RESTART, node, login=LOGIN_BENCH, senha=SENHA_BENCH, cluster_name="CLUSTER_BENCH")
+        execucao.resultado.add_done_callback(registrar(time.perf_counter()))
+        execucoes.append(execucao)
+    wait([e.resultado for e in execucoes])
+    duracao = time.perf_counter() - inicio
+    falhas = sum(1 for e in execucoes if not e.resultado.result())
+    resumo = _resumo(latencias, duracao, falhas, ambiente.requisicoes(), jenkins.total_requisicoes())
+    ambiente.restaurar_nodes()
+    return resumo
+
+FUNCOES_CENARIOS = {
+    "status": cenario_status,
+    "isolar_habilitar": cenario_isolar_habilitar,
+    "drenagem": cenario_drenagem,
+    "membros_pool": cenario_membros_pool,
+    "fluxos": cenario_fluxos,
+}
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks contra F5 e Jenkins simulados")
+    parser.add_argument("--nodes", default="1,10,100,500", help="Quantidades de nodes, separadas por vírgula")
+    parser.add_argument("--cenarios", default=",".join(CENARIOS), help=f"Cenários a executar ({', '.join(CENARIOS)})")
+    parser.add_argument("--prefixo", default="WASP", help="Prefixo dos nodes simulados (define o fluxo do Jenkins)")
+    parser.add_argument("--balanceadores", type=int, default=6)
+    parser.add_argument("--presenca", type=int, default=2, help="Balanceadores em que cada node existe")
+    parser.add_argument("--membros-por-pool", type=int, default=4)
+    parser.add_argument("--conexoes", type=int, default=3, help="Conexões iniciais de cada node (drenagem)")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latência de cada requisição ao F5 simulado (s)")
+    parser.add_argument("--latencia-jenkins", type=float, default=0.0, help="Latência de cada requisição ao Jenkins simulado (s)")
+    parser.add_argument("--atraso-fila", type=float, default=0.2, help="Tempo de cada disparo na fila do Jenkins (s)")
+    parser.add_argument("--duracao-build", type=float, default=0.5, help="Duração de cada build (s)")
+    parser.add_argument("--intervalo", type=float, default=0.1, help="Intervalo dos pollers de drenagem/fila/build (s)")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Repetições do cenário status")
+    parser.add_argument("--timeout", type=float, default=300, help="Prazo de drenagem e de build por node (s)")
+    parser.add_argument("--verbose", action="store_true", help="Mantém os logs da aplicação")
+    regressao.adicionar_argumentos(parser, "f5")
+    args = parser.parse_args(argv)
+    args.lista_nodes = [int(n) for n in args.nodes.split(",") if n.strip()]
+    args.lista_cenarios = [c.strip() for c in args.cenarios.split(",") if c.strip()]
+    desconhecidos = [c for c in args.lista_cenarios if c not in FUNCOES_CENARIOS]
+    if desconhecidos:
+        parser.error(f"Cenários desconhecidos: {', '.join(desconhecidos)}")
+    return args
+
+def main(argv=None):
+    args = _argumentos(argv)
+
+    jenkins = SimuladorJenkins(args.atraso_fila, args.duracao_build, args.latencia_jenkins)
+    # O cliente do Jenkins lê JENKINS_URL na importação: os módulos do projeto só são importados depois
+    os.environ["JENKINS_URL"] = jenkins.iniciar()
+
+    import backend
+    from Restart_Funcoes.build_poller import obter_poller
+    from Restart_Funcoes.queue_resolver import obter_resolvedor
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    backend.console.quiet = True
+    obter_poller(LOGIN_BENCH, SENHA_BENCH).intervalo = args.intervalo
+    resolvedor = obter_resolvedor(LOGIN_BENCH, SENHA_BENCH)
+    resolvedor.intervalo_inicial = args.intervalo
+    resolvedor.intervalo_maximo = args.intervalo * 4
+
+    resultados = {}
+    print(f"{'cenário':<18}{'nodes':>6}{'ops':>7}{'falhas':>7}{'duração':>10}{'vazão/s':>10}{'p50':>9}{'p95':>9}{'max':>9}{'req F5':>9}{'req Jk':>8}")
+    for quantidade in args.lista_nodes:
+        ambiente = AmbienteF5(quantidade, args)
+        try:
+            for cenario in args.lista_cenarios:
+                ambiente.zerar_contadores()
+                jenkins.zerar_contadores()
+                r = FUNCOES_CENARIOS[cenario](ambiente, args, jenkins)
+                resultados[f"{cenario}/{quantidade}"] = r
+                print(f"{cenario:<18}{quantidade:>6}{r['ops']:>7}{r['falhas']:>7}{r['duracao']:>10.3f}{r['vazao']:>10.1f}"
+                      f"{r['p50']:>9.3f}{r['p95']:>9.3f}{r['max']:>9.3f}{r['req_f5']:>9}{r['req_jenkins']:>8}")
+        finally:
+            ambiente.encerrar()
+    jenkins.parar()
+
+    return regressao.finalizar(args, resultados)
+
+if __name__ == "__main__":
+    sys.exit(main())
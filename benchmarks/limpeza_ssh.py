@@ -0,0 +1,92 @@
+"""Benchmark da opção 8 (Limpeza Disco-Opt + OutOfMemory) contra hosts SSH simulados.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.limpeza_ssh --hosts 1,10,50,200
+    python -m benchmarks.limpeza_ssh --hosts 50 --latencia-comando 0.05 --salvar --comparar
+
+Cada tamanho sobe uma frota de servidores SSH locais (paramiko), um por host,
+com temp e profile de WAS populados, e chama backend.limpar_disco_e_outofmemory
+com todos eles. A latência por host é medida pelo servidor (da primeira conexão
+ao fim do último comando); um host falha se a limpeza não deixou o sistema de
+arquivos no estado esperado. Resultados em benchmarks/resultados/ssh_*.
+"""
+import io
+import sys
+import time
+import logging
+import argparse
+import contextlib
+from benchmarks.mock_ssh import FrotaSSH
+from benchmarks import regressao
+
+USUARIO_BENCH = "bench"
+SENHA_BENCH = "bench"
+
+def executar_frota(quantidade, args):
+    """Roda a opção 8 em `quantidade` hosts simulados e retorna o resumo"""
+    import backend
+    from features.ssh_pool import encerrar_sessoes_ssh
+
+    frota = FrotaSSH(quantidade, USUARIO_BENCH, SENHA_BENCH, args.latencia_comando, args.latencia_conexao)
+    try:
+        frota.popular_was(arquivos_temp=args.arquivos, tamanho=args.tamanho_arquivo, dumps=args.dumps)
+        enderecos = frota.iniciar()
+        inicio = time.perf_counter()
+        # move_files_ssh imprime linhas [DEBUG] no stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend.limpar_disco_e_outofmemory(",".join(enderecos), USUARIO_BENCH, SENHA_BENCH)
+        duracao = time.perf_counter() - inicio
+
+        latencias, esperas, falhas = [], [], 0
+        for host in frota.hosts:
+            if host.primeira_conexao is None or not host.fs.limpeza_correta():
+                falhas += 1
+            if host.primeira_conexao is not None:
+                latencias.append(host.ultima_atividade - host.primeira_conexao)
+                esperas.append(host.primeira_conexao - inicio)
+        return regressao.resumo(
+            latencias, duracao, falhas,
+            espera_p95=round(regressao.percentil(esperas, 0.95), 4),
+            conexoes=sum(h.conexoes for h in frota.hosts),
+            comandos=sum(len(h.comandos) for h in frota.hosts),
+        )
+    finally:
+        # Sessões do pool apontam para portas desta frota: fecha antes do próximo tamanho
+        encerrar_sessoes_ssh()
+        frota.parar()
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(description="Benchmark da limpeza Disco-Opt + OutOfMemory contra hosts SSH simulados")
+    parser.add_argument("--hosts", default="1,10,50,200", help="Quantidades de hosts, separadas por vírgula")
+    parser.add_argument("--arquivos", type=int, default=40, help="Arquivos no temp de cada host (~1/5 é mantido)")
+    parser.add_argument("--tamanho-arquivo", type=int, default=256 * 1024, help="Tamanho de cada arquivo do temp (bytes)")
+    parser.add_argument("--dumps", type=int, default=4, help="Conjuntos dmp/txt/phd/trc no profile de cada host")
+    parser.add_argument("--latencia-comando", type=float, default=0.0, help="Latência de cada comando remoto (s)")
+    parser.add_argument("--latencia-conexao", type=float, default=0.0, help="Latência antes de cada handshake SSH (s)")
+    parser.add_argument("--verbose", action="store_true", help="Mantém os logs da aplicação")
+    regressao.adicionar_argumentos(parser, "ssh")
+    args = parser.parse_args(argv)
+    args.lista_hosts = [int(n) for n in args.hosts.split(",") if n.strip()]
+    return args
+
+def main(argv=None):
+    args = _argumentos(argv)
+
+    import backend
+
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    backend.console.quiet = True
+
+    resultados = {}
+    print(f"{'hosts':>6}{'falhas':>7}{'duração':>10}{'hosts/s':>9}{'p50':>9}{'p95':>9}{'max':>9}{'espera p95':>12}{'conexões':>10}{'comandos':>10}")
+    for quantidade in args.lista_hosts:
+        r = executar_frota(quantidade, args)
+        resultados[f"limpeza/{quantidade}"] = r
+        print(f"{quantidade:>6}{r['falhas']:>7}{r['duracao']:>10.3f}{r['vazao']:>9.1f}{r['p50']:>9.3f}{r['p95']:>9.3f}"
+              f"{r['max']:>9.3f}{r['espera_p95']:>12.3f}{r['conexoes']:>10}{r['comandos']:>10}")
+
+    return regressao.finalizar(args, resultados)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import json
+import re
+import time
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote
+
+class SimuladorF5:
+    """Balanceador F5 local com os endpoints iControl REST usados pelo F5Monitor.
+
+    nodes: nomes dos nodes do balanceador; pools: {pool: ["NODE:porta", ...]};
+    latencia: segundos somados a cada requisição; conexoes: conexões iniciais de
+    cada node. Um node desabilitado perde drenagem_por_consulta conexões a cada
+    leitura de stats, simulando a drenagem.
+    """
+
+    def __init__(self, nome, nodes=(), pools=None, latencia=0.0, conexoes=5, drenagem_por_consulta=1):
+        self.nome = nome
+        self.latencia = latencia
+        self.conexoes_iniciais = conexoes
+        self.drenagem_por_consulta = drenagem_por_consulta
+        self.nodes = {n.upper(): {"habilitado": True, "conexoes": conexoes} for n in nodes}
+        self.pools = {p: list(membros) for p, membros in (pools or {}).items()}
+        self.requisicoes = Counter()
+        self._lock = threading.Lock()
+        self._servidor = None
+        self.url = None
+
+    def iniciar(self):
+        """Sobe o servidor em uma porta livre de 127.0.0.1 e retorna a URL base"""
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), _HandlerF5)
+        self._servidor.daemon_threads = True
+        self._servidor.simulador = self
+        threading.Thread(target=self._servidor.serve_forever, name=f"mock-f5-{self.nome}", daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._servidor.server_port}"
+        return self.url
+
+    def parar(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def total_requisicoes(self):
+        with self._lock:
+            return sum(self.requisicoes.values())
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.requisicoes.clear()
+
+    def restaurar_nodes(self):
+        """Todos os nodes habilitados e com as conexões iniciais"""
+        with self._lock:
+            for estado in self.nodes.values():
+                estado["habilitado"] = True
+                estado["conexoes"] = self.conexoes_iniciais
+
+    def _stats_node(self, nome):
+        estado = self.nodes[nome]
+        if not estado["habilitado"] and estado["conexoes"] > 0:
+            estado["conexoes"] = max(0, estado["conexoes"] - self.drenagem_por_consulta)
+        return {
+            "tmName": {"description": f"/Common/{nome}"},
+            "status.enabledState": {"description": "enabled" if estado["habilitado"] else "disabled"},
+            "serverside.curConns": {"value": estado["conexoes"]},
+        }
+
+    def _stats_membro(self, membro):
+        node = membro.split(":")[0]
+        estado = self.nodes.get(node, {"habilitado": True, "conexoes": 0})
+        return {
+            "nodeName": {"description": f"/Common/{node}"},
+            "status.availabilityState": {"description": "available"},
+            "status.enabledState": {"description": "enabled" if estado["habilitado"] else "disabled"},
+            "serverside.curConns": {"value": estado["conexoes"]},
+        }
+
+    def responder(self, metodo, caminho, consulta, corpo):
+        """(status, json) da requisição; chamado pelo handler HTTP"""
+        with self._lock:
+            self.requisicoes[(metodo, re.sub(r"~Common~[^/]+", "~Common~{nome}", caminho))] += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        with self._lock:
+            if caminho == "/mgmt/shared/authn/login":
+                return 200, {"token": {"token": f"token-{self.nome}"}}
+            if caminho.startswith("/mgmt/shared/authz/tokens"):
+                return 200, {"items": []}
+            if caminho == "/mgmt/tm/ltm/node":
+                return 200, {"items": [{"name": n} for n in self.nodes]}
+            if caminho == "/mgmt/tm/ltm/node/stats":
+                return 200, {"entries": {
+                    f"https://localhost/mgmt/tm/ltm/node/~Common~{n}/stats": {"nestedStats": {"entries": self._stats_node(n)}}
+                    for n in self.nodes
+                }}
+            m = re.fullmatch(r"/mgmt/tm/ltm/node/(?:~Common~)?([^/]+)(/stats)?", caminho)
+            if m:
+                nome = m.group(1).upper()
+                if nome not in self.nodes:
+                    return 404, {"code": 404, "message": f"The requested Node (/Common/{m.group(1)}) was not found."}
+                if m.group(2):
+                    return 200, {"entries": {
+                        f"https://localhost/mgmt/tm/ltm/node/~Common~{m.group(1)}/stats": {"nestedStats": {"entries": self._stats_node(nome)}}
+                    }}
+                if metodo == "PATCH":
+                    self.nodes[nome]["habilitado"] = corpo.get("session") == "user-enabled"
+                return 200, {"name": m.group(1)}
+            if caminho == "/mgmt/tm/ltm/pool":
+                if "expandSubcollections" in consulta:
+                    return 200, {"items": [
+                        {"name": p, "membersReference": {"items": [{"name": membro} for membro in membros]}}
+                        for p, membros in self.pools.items()
+                    ]}
+                return 200, {"items": [{"name": p} for p in self.pools]}
+            m = re.fullmatch(r"/mgmt/tm/ltm/pool/~Common~([^/]+)/members(/stats)?", caminho)
+            if m:
+                membros = self.pools.get(m.group(1))
+                if membros is None:
+                    return 404, {"code": 404, "message": "pool not found"}
+                if m.group(2):
+                    return 200, {"entries": {
+                        f"https://localhost/mgmt/tm/ltm/pool/~Common~{m.group(1)}/members/~Common~{membro}/stats":
+                            {"nestedStats": {"entries": self._stats_membro(membro)}}
+                        for membro in membros
+                    }}
+                return 200, {"items": [{"name": membro, "address": "10.0.0.1"} for membro in membros]}
+            m = re.fullmatch(r"/mgmt/tm/ltm/pool/~Common~([^/]+)/members/~Common~([^/]+)(/stats)?", caminho)
+            if m:
+                if m.group(2) not in self.pools.get(m.group(1), []):
+                    return 404, {"code": 404, "message": "member not found"}
+                if m.group(3):
+                    return 200, {"entries": {
+                        f"https://localhost{caminho}": {"nestedStats": {"entries": self._stats_membro(m.group(2))}}
+                    }}
+                return 200, {"name": m.group(2)}
+        return 404, {"code": 404, "message": f"Endpoint não simulado: {caminho}"}
+
+class _HandlerF5(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Sem Nagle a resposta não espera o ACK atrasado do cliente (~40ms por requisição nas medições)
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _tratar(self, metodo):
+        partes = urlsplit(self.path)
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        corpo = json.loads(self.rfile.read(tamanho) or b"{}") if tamanho else {}
+        status, dados = self.server.simulador.responder(metodo, unquote(partes.path), unquote(partes.query), corpo)
+        saida = json.dumps(dados).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(saida)))
+        self.end_headers()
+        self.wfile.write(saida)
+
+    def do_GET(self):
+        self._tratar("GET")
+
+    def do_POST(self):
+        self._tratar("POST")
+
+    def do_PATCH(self):
+        self._tratar("PATCH")
+
+    def do_DELETE(self):
+        self._tratar("DELETE")
@@ -0,0 +1,134 @@
+import re
+import json
+import time
+import itertools
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+class SimuladorJenkins:
+    """Jenkins local com o fluxo buildWithParameters -> fila -> build.
+
+    Cada disparo fica atraso_fila segundos na fila antes de ganhar um build,
+    que termina com `resultado` após duracao_build segundos. latencia é
+    somada a cada requisição. Atende crumbIssuer, queue/api/json,
+    queue/item/N/api/json, <job>/api/json (lista de builds) e <job>/N/api/json.
+    """
+
+    def __init__(self, atraso_fila=0.2, duracao_build=0.5, latencia=0.0, resultado="SUCCESS"):
+        self.atraso_fila = atraso_fila
+        self.duracao_build = duracao_build
+        self.latencia = latencia
+        self.resultado = resultado
+        self.requisicoes = Counter()
+        self._fila = {}  # id -> (instante do disparo, caminho do job)
+        self._builds = {}  # número -> (instante de início, caminho do job)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._servidor = None
+        self.url = None
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), _HandlerJenkins)
+        self._servidor.daemon_threads = True
+        self._servidor.simulador = self
+        threading.Thread(target=self._servidor.serve_forever, name="mock-jenkins", daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._servidor.server_port}"
+        return self.url
+
+    def parar(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def total_requisicoes(self):
+        with self._lock:
+            return sum(self.requisicoes.values())
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.requisicoes.clear()
+
+    def _build(self, numero, agora):
+        inicio, job = self._builds[numero]
+        terminou = agora - inicio >= self.duracao_build
+        return {
+            "number": numero,
+            "building": not terminou,
+            "result": self.resultado if terminou else None,
+            "url": f"{self.url}{job}/{numero}/",
+        }
+
+    def _sair_da_fila(self, agora):
+        # Itens com o atraso cumprido viram builds (o número do build é o id da fila)
+        for item, (instante, job) in list(self._fila.items()):
+            if agora - instante >= self.atraso_fila and item not in self._builds:
+                self._builds[item] = (instante + self.atraso_fila, job)
+
+    def responder(self, metodo, caminho):
+        """(status, json, cabeçalhos extras) da requisição"""
+        with self._lock:
+            self.requisicoes[(metodo, re.sub(r"/\d+(?=/|$)", "/{n}", caminho))] += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        agora = time.time()
+        with self._lock:
+            self._sair_da_fila(agora)
+            if caminho == "/crumbIssuer/api/json":
+                return 200, {"crumbRequestField": "Jenkins-Crumb", "crumb": "crumb-simulado"}, {}
+            if metodo == "POST" and caminho.endswith("/buildWithParameters"):
+                item = next(self._ids)
+                self._fila[item] = (agora, caminho[:-len("/buildWithParameters")])
+                return 201, {}, {"Location": f"{self.url}/queue/item/{item}/"}
+            if caminho == "/queue/api/json":
+                return 200, {"items": [{"id": item} for item in self._fila if item not in self._builds]}, {}
+            m = re.fullmatch(r"/queue/item/(\d+)/api/json", caminho)
+            if m:
+                item = int(m.group(1))
+                if item not in self._fila:
+                    return 404, {}, {}
+                if item not in self._builds:
+                    return 200, {"id": item, "why": "Waiting for next available executor"}, {}
+                return 200, {"id": item, "executable": {"number": item, "url": f"{self.url}{self._builds[item][1]}/{item}/"}}, {}
+            m = re.fullmatch(r"(.*)/(\d+)/api/json", caminho)
+            if m:
+                numero = int(m.group(2))
+                if numero not in self._builds:
+                    return 404, {}, {}
+                return 200, self._build(numero, agora), {}
+            m = re.fullmatch(r"(.*)/api/json", caminho)
+            if m:
+                builds = [self._build(n, agora) for n in sorted(self._builds, reverse=True) if self._builds[n][1] == m.group(1)]
+                return 200, {"builds": builds[:50]}, {}
+        return 404, {}, {}
+
+class _HandlerJenkins(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Sem Nagle a resposta não espera o ACK atrasado do cliente (~40ms por requisição nas medições)
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _tratar(self, metodo):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho:
+            self.rfile.read(tamanho)
+        status, dados, cabecalhos = self.server.simulador.responder(metodo, urlsplit(self.path).path)
+        saida = json.dumps(dados).encode()
+        self.send_response(status)
+        for chave, valor in cabecalhos.items():
+            self.send_header(chave, valor)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(saida)))
+        self.end_headers()
+        self.wfile.write(saida)
+
+    def do_GET(self):
+        self._tratar("GET")
+
+    def do_POST(self):
+        self._tratar("POST")
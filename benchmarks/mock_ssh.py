@@ -0,0 +1,715 @@
+import os
+import math
+import glob
+import time
+import shutil
+import socket
+import fnmatch
+import logging
+import posixpath
+import tempfile
+import threading
+import paramiko
+
+logger = logging.getLogger("mock_ssh")
+# Transportes do lado servidor: o reset do cliente ao fechar a sessão não é erro aqui
+logging.getLogger("mock_ssh.transporte").setLevel(logging.CRITICAL)
+
+# Diretórios dos hosts WAS tocados pela limpeza Disco-Opt + OutOfMemory (opção 8)
+DIR_TEMP = "/opt/IBM/WAS/WebSphere/AppServer/temp"
+DIR_PROFILE = "/opt/IBM/WAS/WebSphere/AppServer/profiles/sicoob"
+DIR_DUMP = "/media/dump"
+
+# Arquivos que a limpeza deve remover do temp e mover do profile
+PADROES_TEMP_REMOVIDOS = ("*.tmp", "C*", "*.ttf", "*.pdf")
+PADROES_DUMP = ("*.dmp", "*.txt", "*.phd", "*.trc")
+
+_chave_host = None
+_chave_lock = threading.Lock()
+
+def _obter_chave():
+    # Gerar chave RSA é caro: uma só para todos os hosts simulados do processo
+    global _chave_host
+    with _chave_lock:
+        if _chave_host is None:
+            _chave_host = paramiko.RSAKey.generate(2048)
+        return _chave_host
+
+def tamanho_humano(tamanho):
+    """Tamanho no formato de `du -h`/`ls -h` (arredondado para cima)"""
+    if tamanho < 1024:
+        return str(tamanho)
+    valor = float(tamanho)
+    for unidade in "KMGTP":
+        valor /= 1024
+        if valor < 1024 or unidade == "P":
+            if valor < 10:
+                return f"{math.ceil(valor * 10) / 10:.1f}{unidade}"
+            return f"{math.ceil(valor)}{unidade}"
+
+class SistemaArquivos:
+    """Árvore de arquivos de um host simulado, guardada em um diretório local"""
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+
+    def local(self, caminho, cwd="/"):
+        absoluto = posixpath.normpath(posixpath.join(cwd, caminho))
+        return os.path.join(self.raiz, absoluto.lstrip("/"))
+
+    def remoto(self, local):
+        relativo = os.path.relpath(local, self.raiz).replace(os.sep, "/")
+        return "/" if relativo == "." else "/" + relativo
+
+    def criar_arquivo(self, caminho, tamanho, idade=0):
+        """Arquivo esparso do tamanho informado, com mtime de `idade` segundos atrás"""
+        local = self.local(caminho)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        with open(local, "wb") as arquivo:
+            arquivo.truncate(tamanho)
+        if idade:
+            instante = time.time() - idade
+            os.utime(local, (instante, instante))
+
+    def popular_was(self, arquivos_temp=40, tamanho=256 * 1024, dumps=4):
+        """Temp e profile de um WAS com lixo para a limpeza; ~1/5 dos arquivos do temp é mantido"""
+        os.makedirs(self.local(DIR_DUMP), exist_ok=True)
+        nomes = ("arquivo{}.tmp", "C{}_cache.bin", "fonte{}.ttf", "relatorio{}.pdf", "manter{}.log")
+        for i in range(arquivos_temp):
+            subpasta = "/sessao" if i % 3 == 0 else ""
+            self.criar_arquivo(f"{DIR_TEMP}{subpasta}/{nomes[i % len(nomes)].format(i)}", tamanho, idade=i * 3600)
+        for i in range(dumps):
+            for modelo in ("core.{}.dmp", "javacore.{}.txt", "heapdump.{}.phd", "Snap.{}.trc"):
+                self.criar_arquivo(f"{DIR_PROFILE}/{modelo.format(i)}", tamanho * 4)
+        self.criar_arquivo(f"{DIR_PROFILE}/server.xml", 4096)
+
+    def limpeza_correta(self):
+        """True se o temp não tem mais os padrões removidos e o profile não tem mais dumps"""
+        for raiz, _, arquivos in os.walk(self.local(DIR_TEMP)):
+            if any(fnmatch.fnmatchcase(a, p) for a in arquivos for p in PADROES_TEMP_REMOVIDOS):
+                return False
+        restantes = os.listdir(self.local(DIR_PROFILE))
+        return not any(fnmatch.fnmatchcase(a, p) for a in restantes for p in PADROES_DUMP)
+
+class _ErroComando(Exception):
+    def __init__(self, mensagem, codigo=1):
+        super().__init__(mensagem)
+        self.codigo = codigo
+
+def _tokens(comando):
+    """Palavras do comando como (texto, citado); operadores como (op, None)"""
+    tokens, atual, citado, tem = [], [], False, False
+
+    def fechar():
+        nonlocal atual, citado, tem
+        if tem:
+            tokens.append(("".join(atual), citado))
+        atual, citado, tem = [], False, False
+
+    i = 0
+    while i < len(comando):
+        c = comando[i]
+        if c in "'\"":
+            fim = comando.find(c, i + 1)
+            if fim < 0:
+                raise _ErroComando("bash: unexpected EOF while looking for matching quote", 2)
+            atual.append(comando[i + 1:fim])
+            citado = tem = True
+            i = fim + 1
+        elif c == "\\" and i + 1 < len(comando):
+            atual.append(comando[i + 1])
+            tem = True
+            i += 2
+        elif c.isspace():
+            fechar()
+            i += 1
+        elif comando.startswith("&&", i) or comando.startswith("||", i):
+            fechar()
+            tokens.append((comando[i:i + 2], None))
+            i += 2
+        elif c in ";|":
+            fechar()
+            tokens.append((c, None))
+            i += 1
+        else:
+            atual.append(c)
+            tem = True
+            i += 1
+    fechar()
+    return tokens
+
+class Interpretador:
+    """Shell mínimo sobre um SistemaArquivos: listas com ; && ||, sudo, sh -c, cd, du,
+    find, mv, ls, rm, echo, true/false e redirecionamentos 2>/dev/null, >/dev/null, 2>&1"""
+
+    def __init__(self, fs, senha_sudo, ler_stdin):
+        self.fs = fs
+        self.senha_sudo = senha_sudo
+        self.ler_stdin = ler_stdin
+        self.cwd = "/"
+        self.sudo_autenticado = False
+
+    def executar(self, comando):
+        saida, erro, codigo = [], [], 0
+        try:
+            tokens = _tokens(comando)
+        except _ErroComando as e:
+            return "", str(e) + "\n", e.codigo
+        operador = None
+        simples = []
+        for token in tokens + [(";", None)]:
+            if token[1] is not None:
+                simples.append(token)
+                continue
+            if token[0] == "|":
+                return "".join(saida), "".join(erro) + "bash: pipes não suportados pelo simulador\n", 2
+            if simples and (operador is None or operador == ";" or (operador == "&&") == (codigo == 0)):
+                codigo = self._executar_simples(simples, saida, erro)
+            simples = []
+            operador = token[0]
+        return "".join(saida), "".join(erro), codigo
+
+    def _executar_simples(self, tokens, saida, erro):
+        palavras, destino_saida, destino_erro = [], saida, erro
+        for texto, citado in tokens:
+            if not citado and texto in ("2>/dev/null", ">/dev/null", "1>/dev/null", "2>&1"):
+                if texto == "2>/dev/null":
+                    destino_erro = None
+                elif texto == "2>&1":
+                    destino_erro = destino_saida
+                else:
+                    destino_saida = None
+                continue
+            palavras.append((texto, citado))
+        out, err = [], []
+        try:
+            codigo = self._comando(palavras, out, err)
+        except _ErroComando as e:
+            err.append(str(e) + "\n")
+            codigo = e.codigo
+        if destino_saida is not None:
+            destino_saida.extend(out)
+        if destino_erro is not None:
+            destino_erro.extend(err)
+        return codigo
+
+    def _expandir(self, palavras):
+        """Globs sem aspas expandidos no cwd; sem correspondência, a palavra fica literal (como no bash)"""
+        resultado = []
+        for texto, citado in palavras:
+            if citado or not any(c in texto for c in "*?["):
+                resultado.append(texto)
+                continue
+            encontrados = sorted(glob.glob(self.fs.local(texto, self.cwd)))
+            if not encontrados:
+                resultado.append(texto)
+            elif texto.startswith("/"):
+                resultado.extend(self.fs.remoto(e) for e in encontrados)
+            else:
+                resultado.extend(posixpath.relpath(self.fs.remoto(e), self.cwd) for e in encontrados)
+        return resultado
+
+    def _comando(self, palavras, out, err):
+        if not palavras:
+            return 0
+        nome = palavras[0][0]
+        if nome == "sudo":
+            return self._sudo(palavras[1:], out, err)
+        argumentos = palavras[1:]
+        metodo = getattr(self, f"_cmd_{nome}", None)
+        if metodo is None:
+            err.append(f"bash: {nome}: command not found\n")
+            return 127
+        return metodo(argumentos, out, err)
+
+    def _sudo(self, palavras, out, err):
+        nao_interativo = False
+        while palavras and palavras[0][0].startswith("-"):
+            opcao = palavras.pop(0)[0]
+            nao_interativo = nao_interativo or "n" in opcao
+            if opcao == "-p" and palavras:
+                palavras.pop(0)
+        if not self.sudo_autenticado:
+            if nao_interativo:
+                err.append("sudo: a password is required\n")
+                return 1
+            # Como `sudo -S`: senha pela entrada padrão, válida para o resto do comando
+            senha = self.ler_stdin()
+            if senha is None or senha != self.senha_sudo:
+                err.append("Sorry, try again.\nsudo: 1 incorrect password attempt\n")
+                return 1
+            self.sudo_autenticado = True
+        return self._comando(palavras, out, err)
+
+    def _cmd_true(self, argumentos, out, err):
+        return 0
+
+    def _cmd_false(self, argumentos, out, err):
+        return 1
+
+    def _cmd_sh(self, argumentos, out, err):
+        if len(argumentos) < 2 or argumentos[0][0] != "-c":
+            err.append("sh: o simulador só aceita 'sh -c <script>'\n")
+            return 2
+        # Subshell: mudanças de diretório não voltam para o comando externo
+        cwd = self.cwd
+        saida, erro, codigo = self.executar(argumentos[1][0])
+        self.cwd = cwd
+        out.append(saida)
+        err.append(erro)
+        return codigo
+
+    _cmd_bash = _cmd_sh
+
+    def _cmd_echo(self, argumentos, out, err):
+        out.append(" ".join(self._expandir(argumentos)) + "\n")
+        return 0
+
+    def _cmd_cd(self, argumentos, out, err):
+        destino = argumentos[0][0] if argumentos else "/"
+        if not os.path.isdir(self.fs.local(destino, self.cwd)):
+            err.append(f"bash: cd: {destino}: No such file or directory\n")
+            return 1
+        self.cwd = posixpath.normpath(posixpath.join(self.cwd, destino))
+        return 0
+
+    def _tamanho_total(self, local):
+        if not os.path.isdir(local):
+            return os.path.getsize(local)
+        total = 4096
+        for raiz, pastas, arquivos in os.walk(local):
+            total += 4096 * len(pastas)
+            total += sum(os.path.getsize(os.path.join(raiz, a)) for a in arquivos)
+        return total
+
+    def _cmd_du(self, argumentos, out, err):
+        opcoes = "".join(t[1:] for t in self._expandir(argumentos) if t.startswith("-"))
+        caminhos = [t for t in self._expandir(argumentos) if not t.startswith("-")] or ["."]
+        codigo = 0
+        for caminho in caminhos:
+            local = self.fs.local(caminho, self.cwd)
+            if not os.path.exists(local):
+                err.append(f"du: cannot access '{caminho}': No such file or directory\n")
+                codigo = 1
+                continue
+            tamanho = self._tamanho_total(local)
+            if "b" in opcoes:
+                texto = str(tamanho)
+            elif "h" in opcoes:
+                texto = tamanho_humano(tamanho)
+            else:
+                texto = str(math.ceil(tamanho / 1024))
+            out.append(f"{texto}\t{caminho}\n")
+        return codigo
+
+    def _cmd_ls(self, argumentos, out, err):
+        expandidos = self._expandir(argumentos)
+        opcoes = "".join(t[1:] for t in expandidos if t.startswith("-"))
+        caminhos = [t for t in expandidos if not t.startswith("-")] or ["."]
+        codigo = 0
+        for caminho in caminhos:
+            local = self.fs.local(caminho, self.cwd)
+            if not os.path.exists(local):
+                err.append(f"ls: cannot access '{caminho}': No such file or directory\n")
+                codigo = 2
+                continue
+            nomes = sorted(n for n in os.listdir(local) if "a" in opcoes or not n.startswith(".")) if os.path.isdir(local) else [caminho]
+            if "l" not in opcoes:
+                out.extend(n + "\n" for n in nomes)
+                continue
+            linhas, blocos = [], 0
+            for nome in nomes:
+                alvo = os.path.join(local, nome) if os.path.isdir(local) else local
+                info = os.stat(alvo)
+                blocos += math.ceil(info.st_size / 1024)
+                tamanho = tamanho_humano(info.st_size) if "h" in opcoes else str(info.st_size)
+                tipo = "drwxr-xr-x" if os.path.isdir(alvo) else "-rw-r--r--"
+                data = time.strftime("%b %d %H:%M", time.localtime(info.st_mtime))
+                linhas.append(f"{tipo} 1 wasadm wasadm {tamanho:>5} {data} {nome}\n")
+            out.append(f"total {tamanho_humano(blocos * 1024) if 'h' in opcoes else blocos}\n")
+            out.extend(linhas)
+        return codigo
+
+    def _cmd_mv(self, argumentos, out, err):
+        expandidos = [t for t in self._expandir(argumentos) if not t.startswith("-")]
+        if len(expandidos) < 2:
+            err.append("mv: missing destination file operand\n")
+            return 1
+        *origens, destino = expandidos
+        local_destino = self.fs.local(destino, self.cwd)
+        if len(origens) > 1 and not os.path.isdir(local_destino):
+            err.append(f"mv: target '{destino}' is not a directory\n")
+            return 1
+        codigo = 0
+        for origem in origens:
+            local_origem = self.fs.local(origem, self.cwd)
+            if not os.path.exists(local_origem):
+                err.append(f"mv: cannot stat '{origem}': No such file or directory\n")
+                codigo = 1
+                continue
+            alvo = os.path.join(local_destino, os.path.basename(local_origem)) if os.path.isdir(local_destino) else local_destino
+            shutil.move(local_origem, alvo)
+        return codigo
+
+    def _cmd_rm(self, argumentos, out, err):
+        expandidos = self._expandir(argumentos)
+        opcoes = "".join(t[1:] for t in expandidos if t.startswith("-"))
+        codigo = 0
+        for caminho in (t for t in expandidos if not t.startswith("-")):
+            local = self.fs.local(caminho, self.cwd)
+            if os.path.isdir(local) and "r" in opcoes:
+                shutil.rmtree(local)
+            elif os.path.isfile(local):
+                os.remove(local)
+            elif "f" not in opcoes:
+                err.append(f"rm: cannot remove '{caminho}': No such file or directory\n")
+                codigo = 1
+        return codigo
+
+    def _cmd_find(self, argumentos, out, err):
+        return _Find(self, [t for t, _ in argumentos], out, err).executar()
+
+class _Find:
+    """find com -name/-iname/-path/-type/-mmin/-mtime/-size/-empty, ! -not -a -o ( ),
+    -maxdepth/-mindepth e as ações -print, -printf e -delete"""
+
+    ACOES = ("-print", "-printf", "-delete")
+
+    def __init__(self, shell, argumentos, out, err):
+        self.shell = shell
+        self.out = out
+        self.err = err
+        self.codigo = 0
+        self.maxdepth = None
+        self.mindepth = 0
+        self.caminhos = []
+        while argumentos and not argumentos[0].startswith("-") and argumentos[0] not in ("(", "!"):
+            self.caminhos.append(argumentos.pop(0))
+        self.caminhos = self.caminhos or ["."]
+        self.argumentos = []
+        while argumentos:
+            token = argumentos.pop(0)
+            if token in ("-maxdepth", "-mindepth"):
+                setattr(self, token[1:], int(argumentos.pop(0)))
+            elif token not in ("-xdev", "-depth", "-mount"):
+                self.argumentos.append(token)
+        self.tem_acao = any(t in self.ACOES for t in self.argumentos)
+        self.apaga = "-delete" in self.argumentos
+        self.pos = 0
+        self.expressao = self._ou() if self.argumentos else (lambda entrada: True)
+        if self.pos < len(self.argumentos):
+            raise _ErroComando(f"find: paths must precede expression: `{self.argumentos[self.pos]}'")
+
+    # Expressão: ou := e (-o e)* ; e := fator ([-a] fator)* ; fator := ! fator | ( ou ) | primário
+    def _ou(self):
+        esquerda = self._e()
+        while self.pos < len(self.argumentos) and self.argumentos[self.pos] in ("-o", "-or"):
+            self.pos += 1
+            direita = self._e()
+            esquerda = (lambda a, b: lambda entrada: a(entrada) or b(entrada))(esquerda, direita)
+        return esquerda
+
+    def _e(self):
+        esquerda = self._fator()
+        while self.pos < len(self.argumentos) and self.argumentos[self.pos] not in ("-o", "-or", ")"):
+            if self.argumentos[self.pos] in ("-a", "-and"):
+                self.pos += 1
+            direita = self._fator()
+            esquerda = (lambda a, b: lambda entrada: a(entrada) and b(entrada))(esquerda, direita)
+        return esquerda
+
+    def _fator(self):
+        token = self._proximo()
+        if token in ("!", "-not"):
+            interno = self._fator()
+            return lambda entrada: not interno(entrada)
+        if token == "(":
+            interno = self._ou()
+            if self._proximo() != ")":
+                raise _ErroComando("find: invalid expression; missing `)'")
+            return interno
+        return self._primario(token)
+
+    def _proximo(self):
+        if self.pos >= len(self.argumentos):
+            raise _ErroComando("find: invalid expression")
+        token = self.argumentos[self.pos]
+        self.pos += 1
+        return token
+
+    @staticmethod
+    def _comparar(valor, especificacao):
+        if especificacao.startswith("+"):
+            return lambda atual: atual > valor
+        if especificacao.startswith("-"):
+            return lambda atual: atual < valor
+        return lambda atual: atual == valor
+
+    def _primario(self, token):
+        if token in ("-name", "-iname"):
+            padrao = self._proximo()
+            if token == "-iname":
+                return lambda e: fnmatch.fnmatchcase(e["nome"].lower(), padrao.lower())
+            return lambda e: fnmatch.fnmatchcase(e["nome"], padrao)
+        if token == "-path":
+            padrao = self._proximo()
+            return lambda e: fnmatch.fnmatchcase(e["caminho"], padrao)
+        if token == "-type":
+            tipo = self._proximo()
+            return lambda e: ("d" if e["diretorio"] else "f") == tipo
+        if token in ("-mmin", "-mtime"):
+            especificacao = self._proximo()
+            teste = self._comparar(int(especificacao.lstrip("+-")), especificacao)
+            if token == "-mmin":
+                return lambda e: teste(math.ceil((time.time() - e["stat"].st_mtime) / 60))
+            return lambda e: teste(int((time.time() - e["stat"].st_mtime) // 86400))
+        if token == "-size":
+            especificacao = self._proximo()
+            numero = especificacao.lstrip("+-")
+            unidades = {"c": 1, "k": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+            unidade = unidades.get(numero[-1], 512)
+            valor = int(numero[:-1] if numero[-1] in unidades or numero[-1] == "b" else numero)
+            teste = self._comparar(valor, especificacao)
+            return lambda e: not e["diretorio"] and teste(math.ceil(e["stat"].st_size / unidade))
+        if token == "-empty":
+            return lambda e: (not os.listdir(e["local"])) if e["diretorio"] else e["stat"].st_size == 0
+        if token in ("-true", "-false"):
+            return lambda e: token == "-true"
+        if token == "-print":
+            return lambda e: self.out.append(e["caminho"] + "\n") or True
+        if token == "-printf":
+            formato = self._proximo()
+            return lambda e: self.out.append(self._printf(formato, e)) or True
+        if token == "-delete":
+            return self._apagar
+        raise _ErroComando(f"find: unknown predicate `{token}'")
+
+    def _printf(self, formato, entrada):
+        substituicoes = {
+            "p": entrada["caminho"],
+            "f": entrada["nome"],
+            "h": posixpath.dirname(entrada["caminho"]),
+            "s": str(entrada["stat"].st_size),
+            "T@": f"{entrada['stat'].st_mtime:.10f}",
+            "%": "%",
+        }
+        saida, i = [], 0
+        while i < len(formato):
+            if formato[i] == "\\" and i + 1 < len(formato):
+                saida.append({"n": "\n", "t": "\t", "0": "\0"}.get(formato[i + 1], formato[i + 1]))
+                i += 2
+            elif formato[i] == "%" and i + 1 < len(formato):
+                chave = "T@" if formato.startswith("%T@", i) else formato[i + 1]
+                saida.append(substituicoes.get(chave, ""))
+                i += len(chave) + 1
+            else:
+                saida.append(formato[i])
+                i += 1
+        return "".join(saida)
+
+    def _apagar(self, entrada):
+        try:
+            if entrada["diretorio"]:
+                os.rmdir(entrada["local"])
+            else:
+                os.remove(entrada["local"])
+            return True
+        except OSError as e:
+            self.err.append(f"find: cannot delete '{entrada['caminho']}': {e.strerror}\n")
+            self.codigo = 1
+            return False
+
+    def _entradas(self, caminho):
+        local = self.shell.fs.local(caminho, self.shell.cwd)
+        if not os.path.exists(local):
+            self.err.append(f"find: '{caminho}': No such file or directory\n")
+            self.codigo = 1
+            return
+        pilha = [(local, caminho, 0)]
+        ordem = []
+        while pilha:
+            atual, remoto, profundidade = pilha.pop()
+            ordem.append((atual, remoto, profundidade))
+            if os.path.isdir(atual) and (self.maxdepth is None or profundidade < self.maxdepth):
+                for nome in sorted(os.listdir(atual), reverse=True):
+                    pilha.append((os.path.join(atual, nome), posixpath.join(remoto, nome), profundidade + 1))
+        # -delete implica -depth: filhos antes dos pais
+        for atual, remoto, profundidade in (reversed(ordem) if self.apaga else ordem):
+            if profundidade < self.mindepth or not os.path.lexists(atual):
+                continue
+            yield {
+                "local": atual, "caminho": remoto, "nome": posixpath.basename(remoto) or remoto,
+                "diretorio": os.path.isdir(atual), "stat": os.stat(atual),
+            }
+
+    def executar(self):
+        for caminho in self.caminhos:
+            for entrada in self._entradas(caminho):
+                if self.expressao(entrada) and not self.tem_acao:
+                    self.out.append(entrada["caminho"] + "\n")
+        return self.codigo
+
+class _InterfaceServidor(paramiko.ServerInterface):
+    def __init__(self, host):
+        self.host = host
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if username == self.host.usuario and password == self.host.senha:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self.host._executar_canal, args=(channel, command.decode("utf-8", "replace")), daemon=True).start()
+        return True
+
+class HostSimulado:
+    """Servidor SSH (paramiko) de um host WAS, com shell e sistema de arquivos simulados.
+
+    latencia_conexao é somada antes do handshake e latencia_comando a cada exec.
+    Registra conexões e comandos, e os instantes da primeira conexão e do fim
+    do último comando (latência por host vista pelo servidor; sessões mantidas
+    abertas por um pool no cliente não contam).
+    """
+
+    def __init__(self, nome, usuario, senha, raiz, latencia_comando=0.0, latencia_conexao=0.0):
+        self.nome = nome
+        self.usuario = usuario
+        self.senha = senha
+        self.fs = SistemaArquivos(raiz)
+        self.latencia_comando = latencia_comando
+        self.latencia_conexao = latencia_conexao
+        self.conexoes = 0
+        self.conexoes_abertas = 0
+        self.pico_conexoes = 0
+        self.comandos = []  # (comando, duração, código de saída)
+        self.primeira_conexao = None
+        self.ultima_atividade = None
+        self._lock = threading.Lock()
+        self._socket = None
+        self.endereco = None
+
+    def iniciar(self):
+        """Escuta em uma porta livre de 127.0.0.1 e retorna 'host:porta'"""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(64)
+        threading.Thread(target=self._aceitar, name=f"mock-ssh-{self.nome}", daemon=True).start()
+        self.endereco = f"127.0.0.1:{self._socket.getsockname()[1]}"
+        return self.endereco
+
+    def parar(self):
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+    def _aceitar(self):
+        while self._socket:
+            try:
+                cliente, _ = self._socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._atender, args=(cliente,), daemon=True).start()
+
+    def _atender(self, cliente):
+        if self.latencia_conexao:
+            time.sleep(self.latencia_conexao)
+        transporte = paramiko.Transport(cliente)
+        transporte.set_log_channel("mock_ssh.transporte")
+        transporte.add_server_key(_obter_chave())
+        try:
+            transporte.start_server(server=_InterfaceServidor(self))
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            logger.debug(f"[{self.nome}] Handshake falhou: {e}")
+            transporte.close()
+            return
+        with self._lock:
+            self.conexoes += 1
+            self.conexoes_abertas += 1
+            self.pico_conexoes = max(self.pico_conexoes, self.conexoes_abertas)
+            if self.primeira_conexao is None:
+                self.primeira_conexao = time.perf_counter()
+        canais = []
+        try:
+            while transporte.is_active():
+                # Os canais são atendidos em check_channel_exec_request; aqui só os mantém
+                # referenciados (um Channel coletado pelo GC é fechado)
+                canal = transporte.accept(timeout=0.5)
+                if canal is not None:
+                    canais.append(canal)
+                    canais = [c for c in canais if not c.closed]
+        finally:
+            transporte.close()
+            with self._lock:
+                self.conexoes_abertas -= 1
+
+    def _ler_linha(self, canal, timeout=5):
+        canal.settimeout(timeout)
+        dados = b""
+        try:
+            while not dados.endswith(b"\n"):
+                parte = canal.recv(1)
+                if not parte:
+                    break
+                dados += parte
+        except socket.timeout:
+            return None
+        return dados.decode("utf-8", "replace").rstrip("\r\n")
+
+    def _executar_canal(self, canal, comando):
+        inicio = time.perf_counter()
+        if self.latencia_comando:
+            time.sleep(self.latencia_comando)
+        interpretador = Interpretador(self.fs, self.senha, lambda: self._ler_linha(canal))
+        try:
+            saida, erro, codigo = interpretador.executar(comando)
+        except Exception as e:
+            saida, erro, codigo = "", f"simulador: {e}\n", 255
+        try:
+            if saida:
+                canal.sendall(saida.encode())
+            if erro:
+                canal.sendall_stderr(erro.encode())
+            canal.send_exit_status(codigo)
+            # Só EOF: fechar o canal aqui pode chegar ao cliente antes da resposta do exec
+            # ("Channel closed"); o fechamento fica com o cliente ou com o fim da sessão
+            canal.shutdown_write()
+        except (OSError, EOFError):
+            pass
+        with self._lock:
+            self.comandos.append((comando, time.perf_counter() - inicio, codigo))
+            self.ultima_atividade = time.perf_counter()
+
+class FrotaSSH:
+    """Vários HostSimulado com o mesmo usuário/senha, cada um em sua porta e com seu diretório"""
+
+    def __init__(self, quantidade, usuario, senha, latencia_comando=0.0, latencia_conexao=0.0):
+        self.raiz = tempfile.mkdtemp(prefix="mock_ssh_")
+        self.hosts = [
+            HostSimulado(f"WASP{i:04d}", usuario, senha, os.path.join(self.raiz, f"host{i:04d}"), latencia_comando, latencia_conexao)
+            for i in range(1, quantidade + 1)
+        ]
+
+    def popular_was(self, **kwargs):
+        for host in self.hosts:
+            host.fs.popular_was(**kwargs)
+
+    def iniciar(self):
+        """Endereços 'host:porta' dos hosts, na ordem"""
+        return [host.iniciar() for host in self.hosts]
+
+    def parar(self):
+        for host in self.hosts:
+            host.parar()
+        shutil.rmtree(self.raiz, ignore_errors=True)
@@ -0,0 +1,98 @@
+import os
+import json
+import subprocess
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+# Métricas comparadas com a baseline (maior é pior)
+METRICAS_REGRESSAO = ("duracao", "p95")
+# Diferenças absolutas abaixo disso (segundos) são tratadas como ruído
+PISO_REGRESSAO = 0.05
+
+def percentil(valores, fracao):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(fracao * (len(ordenados) - 1))))]
+
+def resumo(latencias, duracao, falhas=0, **contadores):
+    """Resumo padrão de um cenário: vazão e latências (s), mais contadores extras (requisições etc.)"""
+    return {
+        "ops": len(latencias),
+        "falhas": falhas,
+        "duracao": round(duracao, 4),
+        "vazao": round(len(latencias) / duracao, 2) if duracao else 0.0,
+        "p50": round(percentil(latencias, 0.5), 4),
+        "p95": round(percentil(latencias, 0.95), 4),
+        "max": round(max(latencias), 4) if latencias else 0.0,
+        **contadores,
+    }
+
+def commit_atual():
+    try:
+        saida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, timeout=10)
+        return saida.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def comparar(resultados, baseline, tolerancia):
+    """Lista de regressões: métricas acima de baseline * (1 + tolerancia) e do piso absoluto"""
+    regressoes = []
+    for chave, atual in resultados.items():
+        anterior = baseline.get(chave)
+        if not anterior:
+            continue
+        for metrica in METRICAS_REGRESSAO:
+            antes, agora = anterior.get(metrica, 0), atual.get(metrica, 0)
+            if agora > antes * (1 + tolerancia) and agora - antes > PISO_REGRESSAO:
+                regressoes.append(f"{chave} {metrica}: {antes:.3f}s -> {agora:.3f}s (+{(agora / antes - 1) * 100 if antes else 100:.0f}%)")
+        if atual.get("falhas", 0) > anterior.get("falhas", 0):
+            regressoes.append(f"{chave} falhas: {anterior.get('falhas', 0)} -> {atual['falhas']}")
+    return regressoes
+
+def adicionar_argumentos(parser, nome):
+    """Opções de histórico/baseline; os arquivos ficam em benchmarks/resultados/<nome>_*"""
+    historico = os.path.join(PASTA_RESULTADOS, f"{nome}_historico.jsonl")
+    parser.add_argument("--salvar", action="store_true", help=f"Acrescenta o resultado em {os.path.relpath(historico, RAIZ)}")
+    parser.add_argument("--gravar-baseline", action="store_true", help="Grava o resultado como nova baseline")
+    parser.add_argument("--comparar", action="store_true", help="Compara com a baseline; sai com código 1 se houver regressão")
+    parser.add_argument("--baseline", default=os.path.join(PASTA_RESULTADOS, f"{nome}_baseline.json"))
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora relativa aceita antes de apontar regressão")
+    parser.set_defaults(historico=historico)
+
+def finalizar(args, resultados):
+    """Grava histórico/baseline conforme as opções e retorna o código de saída (1 se regrediu)"""
+    registro = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_atual(),
+        "parametros": {k: v for k, v in vars(args).items() if not k.startswith("lista_") and k not in ("historico", "baseline")},
+        "resultados": resultados,
+    }
+    if args.salvar or args.gravar_baseline:
+        os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+    if args.salvar:
+        with open(args.historico, "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        print(f"\nResultado acrescentado em {args.historico}")
+
+    codigo = 0
+    if args.comparar:
+        if not os.path.exists(args.baseline):
+            print(f"\nBaseline {args.baseline} não encontrada; use --gravar-baseline para criá-la.")
+        else:
+            with open(args.baseline, encoding="utf-8") as arquivo:
+                baseline = json.load(arquivo)
+            regressoes = comparar(resultados, baseline.get("resultados", {}), args.tolerancia)
+            print(f"\nComparação com a baseline de {baseline.get('data')} (commit {baseline.get('commit')}):")
+            for regressao in regressoes:
+                print(f"  REGRESSÃO {regressao}")
+            if not regressoes:
+                print("  Nenhuma regressão acima da tolerância.")
+            codigo = 1 if regressoes else 0
+    if args.gravar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as arquivo:
+            json.dump(registro, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nBaseline gravada em {args.baseline}")
+    return codigo
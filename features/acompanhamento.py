@@ -0,0 +1,161 @@
+import time
+import weakref
+import threading
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger("acompanhamento")
+
+# Serviços criados no processo, para encerrar_acompanhamentos na saída do console
+_servicos = weakref.WeakSet()
+_servicos_lock = threading.Lock()
+
+class Espera:
+    """Item acompanhado por um AcompanhamentoEmLote: chave única, prazo e Future do resultado"""
+
+    def __init__(self, chave, timeout):
+        self.chave = chave
+        self.prazo = time.time() + timeout
+        self.future = Future()
+
+def _repassar(origem, destino):
+    def concluir(f):
+        if not destino.done():
+            destino.set_result(f.result())
+    origem.add_done_callback(concluir)
+
+class AcompanhamentoEmLote:
+    """Base dos serviços que acompanham muitas esperas com um único worker.
+
+    As esperas ficam em um dicionário por chave protegido por uma Condition; a
+    thread de trabalho só existe enquanto houver o que acompanhar e, a cada
+    ciclo, entrega todas as pendentes a _ciclo(esperas), que consulta em lote,
+    resolve as concluídas com _finalizar e retorna o intervalo até o próximo
+    ciclo. Quem registra uma chave já acompanhada recebe um Future próprio
+    resolvido com o mesmo resultado. Esperas que passam do prazo são resolvidas
+    com _resultado_timeout(espera); encerrar() resolve as restantes da mesma
+    forma e para a thread.
+    """
+
+    intervalo = 5
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._esperas = {}
+        self._thread = None
+        self._encerrado = False
+        with _servicos_lock:
+            _servicos.add(self)
+
+    def _registrar(self, espera):
+        """Inclui a espera no próximo ciclo e retorna o Future dela"""
+        with self._cond:
+            encerrado = self._encerrado
+            anterior = self._esperas.get(espera.chave)
+            if anterior is not None and anterior.future.done():
+                anterior = None
+            if not encerrado and anterior is None:
+                self._esperas[espera.chave] = espera
+                self._ao_registrar(espera)
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name=type(self).__name__, daemon=True)
+                    self._thread.start()
+                # Novas esperas acordam o loop antes do intervalo
+                self._cond.notify()
+        # Callbacks dos Futures rodam fora do lock
+        if encerrado:
+            espera.future.set_result(self._resultado_timeout(espera))
+        elif anterior is not None:
+            # Mesma chave já acompanhada por outra espera: compartilha o resultado
+            _repassar(anterior.future, espera.future)
+        return espera.future
+
+    def _ao_registrar(self, espera):
+        """Chamado com o lock ao registrar uma espera nova (ex.: reiniciar backoff)"""
+
+    def _ciclo(self, esperas):
+        """Consulta as esperas pendentes; retorna o intervalo até o próximo ciclo"""
+        raise NotImplementedError
+
+    def _resultado_timeout(self, espera):
+        return None
+
+    def _expirou(self, espera, agora):
+        return agora >= espera.prazo
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._esperas and not self._encerrado:
+                    self._cond.wait()
+                if self._encerrado:
+                    return
+                esperas = list(self._esperas.values())
+
+            intervalo = self.intervalo
+            try:
+                intervalo = self._ciclo(esperas)
+            except Exception as e:
+                # Falha temporária: tenta de novo no próximo ciclo até o prazo
+                logger.error(f"Erro no ciclo de {type(self).__name__}: {e}")
+
+            agora = time.time()
+            for espera in esperas:
+                if not espera.future.done() and self._expirou(espera, agora):
+                    self._finalizar(espera, self._resultado_timeout(espera))
+
+            with self._cond:
+                if self._encerrado:
+                    return
+                self._cond.wait(intervalo)
+
+    def _finalizar(self, espera, resultado):
+        with self._cond:
+            if self._esperas.get(espera.chave) is espera:
+                del self._esperas[espera.chave]
+        if not espera.future.done():
+            espera.future.set_result(resultado)
+
+    def _pendentes(self):
+        with self._cond:
+            return dict(self._esperas)
+
+    def encerrar(self, timeout=5):
+        """Para a thread de trabalho; esperas pendentes recebem o resultado de timeout"""
+        with self._cond:
+            self._encerrado = True
+            esperas = list(self._esperas.values())
+            self._esperas.clear()
+            thread = self._thread
+            self._cond.notify_all()
+        for espera in esperas:
+            if not espera.future.done():
+                espera.future.set_result(self._resultado_timeout(espera))
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+def encerrar_acompanhamentos():
+    """Encerra todos os serviços de acompanhamento do processo"""
+    with _servicos_lock:
+        servicos = list(_servicos)
+    for servico in servicos:
+        servico.encerrar()
+
+class RegistroPorUsuario:
+    """Instâncias compartilhadas pelo processo, uma por (login, senha).
+
+    fabrica(login, senha) cria a instância na primeira chamada de obter.
+    """
+
+    def __init__(self, fabrica):
+        self._fabrica = fabrica
+        self._instancias = {}
+        self._lock = threading.Lock()
+
+    def obter(self, login, senha):
+        with self._lock:
+            instancia = self._instancias.get((login, senha))
+            if instancia is None:
+                instancia = self._fabrica(login, senha)
+                self._instancias[(login, senha)] = instancia
+            return instancia
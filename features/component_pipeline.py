@@ -0,0 +1,96 @@
+import threading
+import logging
+from concurrent.futures import Future
+from features.worker_pools import obter_pool
+
+logger = logging.getLogger("component_pipeline")
+
+class Componente:
+    """Etapa do pipeline: executar() retorna bool ou um Future[bool].
+
+    depende_de lista os componentes que precisam terminar antes deste começar.
+    """
+
+    def __init__(self, nome, executar, depende_de=()):
+        self.nome = nome
+        self.executar = executar
+        self.depende_de = tuple(depende_de)
+
+def _validar(componentes):
+    nomes = {c.nome for c in componentes}
+    if len(nomes) != len(componentes):
+        raise ValueError("Nomes de componentes repetidos no pipeline")
+    for c in componentes:
+        faltando = [d for d in c.depende_de if d not in nomes]
+        if faltando:
+            raise ValueError(f"Componente {c.nome} depende de componentes inexistentes: {faltando}")
+    # Ordenação topológica só para detectar ciclos
+    pendentes = {c.nome: set(c.depende_de) for c in componentes}
+    while pendentes:
+        prontos = [n for n, deps in pendentes.items() if not deps]
+        if not prontos:
+            raise ValueError(f"Dependência circular entre componentes: {sorted(pendentes)}")
+        for n in prontos:
+            del pendentes[n]
+        for deps in pendentes.values():
+            deps.difference_update(prontos)
+
+def iniciar_pipeline(componentes, pool=None):
+    """Inicia os componentes respeitando as dependências e retorna Future[{nome: bool}].
+
+    Cada componente é disparado assim que todos os seus pré-requisitos terminam
+    (com sucesso ou não, como no fluxo sequencial original); componentes sem
+    dependência entre si rodam em paralelo no pool informado (padrão: "jenkins").
+    """
+    _validar(componentes)
+    pool = pool or obter_pool("jenkins")
+    por_nome = {c.nome: c for c in componentes}
+    dependentes = {c.nome: [] for c in componentes}
+    faltam = {}
+    for c in componentes:
+        faltam[c.nome] = len(c.depende_de)
+        for d in c.depende_de:
+            dependentes[d].append(c.nome)
+
+    resultados = {}
+    lock = threading.Lock()
+    concluido = Future()
+    if not componentes:
+        concluido.set_result({})
+
+    def finalizar(nome, ok):
+        liberados = []
+        with lock:
+            resultados[nome] = bool(ok)
+            for dep in dependentes[nome]:
+                faltam[dep] -= 1
+                if faltam[dep] == 0:
+                    liberados.append(dep)
+            terminou = len(resultados) == len(componentes)
+            if terminou:
+                final = {c.nome: resultados[c.nome] for c in componentes}
+        for dep in liberados:
+            iniciar(dep)
+        if terminou and not concluido.done():
+            concluido.set_result(final)
+
+    def ao_terminar(nome, future):
+        try:
+            ok = future.result()
+        except Exception as e:
+            logger.error(f"Erro no componente {nome}: {e}")
+            ok = False
+        if isinstance(ok, Future):
+            ok.add_done_callback(lambda f: ao_terminar(nome, f))
+            return
+        finalizar(nome, ok)
+
+    def iniciar(nome):
+        future = pool.submit(por_nome[nome].executar)
+        future.add_done_callback(lambda f: ao_terminar(nome, f))
+
+    for c in componentes:
+        if not c.depende_de:
+            iniciar(c.nome)
+
+    return concluido
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from features.event_loop import executar_sync
+from features.acompanhamento import Espera, AcompanhamentoEmLote
+
+logger = logging.getLogger("drain_watcher")
+
+class _Drenagem(Espera):
+    def __init__(self, node, timeout, on_update):
+        super().__init__(node, timeout)
+        self.node = node
+        self.on_update = on_update
+        self.conexoes = None
+        # Balanceadores que não precisam mais ser consultados: nome -> "zero" | "ausente"
+        self.concluidos = {}
+        # Últimas conexões conhecidas nos balanceadores onde o node existe
+        self.por_balancer = {}
+        self.confirmando = False
+
+class DrainWatcher(AcompanhamentoEmLote):
+    """Acompanha o esvaziamento de conexões dos nodes isolados nos balanceadores.
+
+    Todos os nodes em drenagem são consultados juntos: uma única requisição de
+    stats por balanceador a cada ciclo (F5Monitor.get_nodes_status_async), em vez de
+    um loop por job. Um balanceador onde o node já zerou ou não existe deixa
+    de ser consultado para aquele node; só os que ainda têm conexões entram no
+    ciclo seguinte. Um balanceador que falha na consulta mantém a última
+    contagem conhecida e impede a conclusão até responder zero. Com confirmar=True, ao zerar em todos é feita uma
+    rechecagem curta nos balanceadores que tinham conexões antes de concluir.
+    Com balancers_do_node(node), os balanceadores que não possuem o node já
+    começam como "ausente" e nunca são consultados para ele.
+    O intervalo entre ciclos é curto quando restam poucas conexões e longo
+    quando ainda há muitas. Cada job recebe um Future que é resolvido com True
+    assim que o node zera em todos os balanceadores, ou False ao estourar o prazo.
+    """
+
+    def __init__(self, get_balancers, intervalo_rapido=3, intervalo_lento=10, limite_rapido=20, confirmar=False,
+                 balancers_do_node=None):
+        super().__init__()
+        self._get_balancers = get_balancers
+        self._balancers_do_node = balancers_do_node
+        self.intervalo_rapido = intervalo_rapido
+        self.intervalo_lento = intervalo_lento
+        self.limite_rapido = limite_rapido
+        self.confirmar = confirmar
+        self.intervalo = intervalo_rapido
+
+    def aguardar(self, node, timeout=600, on_update=None):
+        """Registra o node para acompanhamento e retorna um Future[bool].
+
+        on_update(node, total_conexoes, detalhes) é chamado a cada ciclo com
+        detalhes = [(nome_balanceador, conexoes), ...] dos balanceadores onde o node existe.
+        """
+        drenagem = _Drenagem(node, timeout, on_update)
+        if self._balancers_do_node:
+            try:
+                membros = {b.name for b in self._balancers_do_node(node)}
+                for balancer in self._get_balancers():
+                    if balancer.name not in membros:
+                        drenagem.concluidos[balancer.name] = "ausente"
+            except Exception as e:
+                # Sem índice consulta todos os balanceadores, como antes
+                logger.error(f"Erro ao consultar balanceadores do node {node}: {e}")
+        # Mesmo node já em drenagem (outro job): compartilha o mesmo resultado
+        return self._registrar(drenagem)
+
+    def _consultar(self, balancers, drenagens):
+        """Uma consulta de stats por balanceador, só com os nodes ainda pendentes nele.
+
+        Retorna {nome_balanceador: {node: status}} apenas dos balanceadores que responderam.
+        """
+        consultas = []
+        for balancer in balancers:
+            nodes = [d.node for d in drenagens if balancer.name not in d.concluidos]
+            if nodes:
+                consultas.append((balancer, nodes))
+        if not consultas:
+            return {}
+
+        async def consultar_todos():
+            return await asyncio.gather(*(b.get_nodes_status_async(nodes) for b, nodes in consultas), return_exceptions=True)
+
+        resultados = {}
+        for (balancer, _), por_node in zip(consultas, executar_sync(consultar_todos())):
+            nome = balancer.name
+            if isinstance(por_node, Exception):
+                logger.error(f"[{nome}] Erro ao consultar conexões: {por_node}")
+                continue
+            if por_node is None:
+                # Token expirado ou inválido: balanceador ignorado neste ciclo
+                continue
+            resultados[nome] = por_node
+        return resultados
+
+    def _ciclo(self, drenagens):
+        balancers = list(self._get_balancers())
+        # Balanceadores ainda não concluídos de cada node, fixados antes da consulta
+        pendentes = {id(d): [b.name for b in balancers if b.name not in d.concluidos] for d in drenagens}
+        resultados = self._consultar(balancers, drenagens)
+        maior_restante = 0
+        confirmacao_pendente = False
+        for drenagem in drenagens:
+            total = 0
+            sem_resposta = False
+            for nome in pendentes[id(drenagem)]:
+                status = resultados.get(nome, {}).get(drenagem.node)
+                if status is None:
+                    # Erro ou token inválido neste ciclo: vale a última contagem conhecida e
+                    # o node não é dado como drenado sem uma resposta zero deste balanceador
+                    sem_resposta = True
+                    total += drenagem.por_balancer.get(nome, 0)
+                    continue
+                if not isinstance(status, dict) or not status.get("found", True):
+                    drenagem.concluidos[nome] = "ausente"
+                    drenagem.por_balancer.pop(nome, None)
+                    continue
+                conns = status.get("connections", 0)
+                drenagem.por_balancer[nome] = conns
+                if conns == 0:
+                    drenagem.concluidos[nome] = "zero"
+                total += conns
+            drenagem.conexoes = total
+            if drenagem.on_update:
+                try:
+                    drenagem.on_update(drenagem.node, total, sorted(drenagem.por_balancer.items()))
+                except Exception as e:
+                    logger.error(f"Erro no callback de drenagem de {drenagem.node}: {e}")
+            if total == 0 and not sem_resposta:
+                if self.confirmar and not drenagem.confirmando:
+                    # Rechecagem curta só onde o node existe e já teve conexões
+                    drenagem.confirmando = True
+                    for nome in [n for n, motivo in drenagem.concluidos.items() if motivo == "zero"]:
+                        del drenagem.concluidos[nome]
+                    confirmacao_pendente = True
+                else:
+                    self._finalizar(drenagem, True)
+            else:
+                # Sem resposta durante a rechecagem também a cancela: o prazo volta a valer
+                drenagem.confirmando = False
+                maior_restante = max(maior_restante, total)
+
+        return self.intervalo_rapido if maior_restante <= self.limite_rapido or confirmacao_pendente else self.intervalo_lento
+
+    def _expirou(self, drenagem, agora):
+        # Node zerado aguardando a rechecagem não estoura o prazo no meio da confirmação
+        return agora >= drenagem.prazo and not drenagem.confirmando
+
+    def _resultado_timeout(self, drenagem):
+        return False
+
+    def em_drenagem(self):
+        """Nodes acompanhados no momento e suas últimas conexões"""
+        return {node: d.conexoes for node, d in self._pendentes().items()}
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+# Loop asyncio compartilhado pelo processo, executado em uma thread dedicada.
+# Código síncrono (menus, jobs em threads) usa executar_sync/agendar para
+# rodar coroutines nele sem criar um loop por chamada, e agendar_em/esperar
+# para esperas sem thread bloqueada (timers do próprio loop).
+_loop = None
+_lock = threading.Lock()
+
+def obter_loop():
+    """Retorna o loop compartilhado, iniciando a thread na primeira chamada"""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="asyncio-compartilhado", daemon=True).start()
+        return _loop
+
+def agendar(coro):
+    """Agenda a coroutine no loop compartilhado e retorna um concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, obter_loop())
+
+def executar_sync(coro, timeout=None):
+    """Executa a coroutine no loop compartilhado e bloqueia até o resultado"""
+    loop = obter_loop()
+    try:
+        atual = asyncio.get_running_loop()
+    except RuntimeError:
+        atual = None
+    if atual is loop:
+        coro.close()
+        raise RuntimeError("executar_sync não pode ser chamado de dentro do loop compartilhado; use await")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+class Temporizador:
+    """Chamada agendada no loop compartilhado; cancelar() pode vir de qualquer thread"""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._handle = None
+        self.cancelado = False
+
+    def cancelar(self):
+        self.cancelado = True
+        self._loop.call_soon_threadsafe(lambda: self._handle and self._handle.cancel())
+
+def agendar_em(segundos, funcao, *args):
+    """Executa funcao(*args) na thread do loop após o tempo informado.
+
+    A função deve ser rápida (resolver um Future, enviar trabalho a um pool);
+    nenhuma thread fica parada durante a espera.
+    """
+    loop = obter_loop()
+    temporizador = Temporizador(loop)
+
+    def executar():
+        if temporizador.cancelado:
+            return
+        try:
+            funcao(*args)
+        except Exception as e:
+            logging.getLogger("event_loop").error(f"Erro em chamada agendada: {e}")
+
+    def registrar():
+        if not temporizador.cancelado:
+            temporizador._handle = loop.call_later(segundos, executar)
+
+    loop.call_soon_threadsafe(registrar)
+    return temporizador
+
+def esperar(segundos):
+    """concurrent.futures.Future resolvido com True após o tempo informado"""
+    future = Future()
+    agendar_em(segundos, lambda: future.done() or future.set_result(True))
+    return future
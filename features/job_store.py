@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("job_store")
+
+# Banco local das execuções, compartilhado por todos os consoles (ao lado do credenciais.txt)
+ARQUIVO_JOBS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "jobs.db")
+
+# Sessão sem heartbeat há mais tempo que isso é considerada encerrada (console fechado/travado)
+HEARTBEAT_INTERVALO = 30
+HEARTBEAT_EXPIRA = 120
+
+# Dados da execução que nunca vão para o disco
+CHAVES_SENSIVEIS = {"senha"}
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sessoes (
+    sessao TEXT PRIMARY KEY,
+    pid INTEGER,
+    heartbeat REAL,
+    maquina TEXT
+);
+CREATE TABLE IF NOT EXISTS execucoes (
+    id TEXT PRIMARY KEY,
+    sessao TEXT,
+    fluxo TEXT,
+    node TEXT,
+    dados TEXT,
+    status TEXT,
+    passo_atual TEXT,
+    iniciado_em REAL,
+    finalizado_em REAL
+);
+CREATE TABLE IF NOT EXISTS passos (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    execucao_id TEXT,
+    passo TEXT,
+    evento TEXT,
+    instante REAL
+);
+CREATE INDEX IF NOT EXISTS idx_execucoes_aberta ON execucoes (finalizado_em);
+CREATE INDEX IF NOT EXISTS idx_passos_execucao ON passos (execucao_id);
+"""
+
+def processo_ativo(pid):
+    """True se o processo existe nesta máquina (sem sinalizá-lo; no Windows os.kill(pid, 0) o encerraria)"""
+    if not pid or pid <= 0:
+        return False
+    if os.name == "nt":
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            codigo = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(codigo))) and codigo.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+class JobStore:
+    """Registro durável das execuções de fluxo (SQLite em modo WAL).
+
+    Cada transição de etapa é gravada na hora; se o console fechar no meio de
+    um restart, o próximo console encontra a execução aberta de uma sessão sem
+    heartbeat (ou cujo processo, nesta máquina, já terminou) e pode retomá-la
+    ou desfazer o isolamento.
+    """
+
+    def __init__(self, caminho=ARQUIVO_JOBS):
+        self.caminho = caminho
+        self.sessao = uuid.uuid4().hex
+        self._heartbeat = None
+        self._parar_heartbeat = threading.Event()
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_ESQUEMA)
+            colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(sessoes)")}
+            if "maquina" not in colunas:
+                # Bancos criados antes da coluna: sessões antigas só expiram por heartbeat
+                conn.execute("ALTER TABLE sessoes ADD COLUMN maquina TEXT")
+
+    @contextmanager
+    def _conectar(self):
+        # Uma conexão por operação (commit ao sair): seguro entre threads e entre consoles
+        conn = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _executar(self, sql, parametros=()):
+        try:
+            with self._conectar() as conn:
+                conn.execute(sql, parametros)
+        except sqlite3.Error as e:
+            # Falha no registro nunca interrompe o fluxo
+            logger.error(f"Erro ao gravar no banco de execuções: {e}")
+
+    def iniciar_sessao(self):
+        """Registra esta sessão e mantém o heartbeat em background"""
+        self._executar("INSERT OR REPLACE INTO sessoes (sessao, pid, heartbeat, maquina) VALUES (?, ?, ?, ?)",
+                       (self.sessao, os.getpid(), time.time(), socket.gethostname()))
+        if self._heartbeat is None:
+            # Thread própria: o heartbeat nunca fica na fila atrás das etapas dos fluxos no pool
+            self._heartbeat = threading.Thread(target=self._manter_heartbeat, name="job-store-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _manter_heartbeat(self):
+        while not self._parar_heartbeat.wait(HEARTBEAT_INTERVALO):
+            self._executar("UPDATE sessoes SET heartbeat = ? WHERE sessao = ?", (time.time(), self.sessao))
+
+    def encerrar_sessao(self):
+        """Para o heartbeat; as execuções abertas desta sessão ficam órfãs após HEARTBEAT_EXPIRA"""
+        self._parar_heartbeat.set()
+
+    @staticmethod
+    def _dados_publicos(dados):
+        return json.dumps({k: v for k, v in dados.items() if k not in CHAVES_SENSIVEIS}, default=str)
+
+    def registrar_execucao(self, execucao):
+        if self._heartbeat is None:
+            self.iniciar_sessao()
+        self._executar(
+            "INSERT INTO execucoes VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+            (execucao.id, self.sessao, execucao.fluxo.nome, execucao.node, self._dados_publicos(execucao.dados),
+             execucao.status, execucao.passo_atual, time.time()),
+        )
+
+    def registrar_passo(self, execucao, passo, evento):
+        """evento: inicio | ok | falha"""
+        try:
+            with self._conectar() as conn:
+                conn.execute("INSERT INTO passos (execucao_id, passo, evento, instante) VALUES (?, ?, ?, ?)",
+                             (execucao.id, passo, evento, time.time()))
+                conn.execute("UPDATE execucoes SET status = ?, passo_atual = ? WHERE id = ?",
+                             (execucao.status, execucao.passo_atual, execucao.id))
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao gravar etapa no banco de execuções: {e}")
+
+    def atualizar_dados(self, execucao):
+        self._executar("UPDATE execucoes SET dados = ? WHERE id = ?", (self._dados_publicos(execucao.dados), execucao.id))
+
+    def finalizar(self, execucao):
+        self._executar("UPDATE execucoes SET status = ?, passo_atual = NULL, finalizado_em = ? WHERE id = ?",
+                       (execucao.status, time.time(), execucao.id))
+
+    def orfas(self):
+        """Execuções abertas de sessões encerradas, com suas etapas.
+
+        Uma sessão está encerrada se o heartbeat expirou ou, logo após uma queda
+        (heartbeat ainda recente), se foi aberta nesta máquina e o pid já não existe.
+        """
+        limite = time.time() - HEARTBEAT_EXPIRA
+        maquina = socket.gethostname()
+        with self._conectar() as conn:
+            linhas = conn.execute(
+                """SELECT e.id, e.fluxo, e.node, e.dados, e.status, e.passo_atual, e.iniciado_em,
+                          s.heartbeat, s.pid, s.maquina
+                   FROM execucoes e LEFT JOIN sessoes s ON s.sessao = e.sessao
+                   WHERE e.finalizado_em IS NULL AND e.sessao != ?
+                   ORDER BY e.iniciado_em""",
+                (self.sessao,),
+            ).fetchall()
+            resultado = []
+            for id_, fluxo, node, dados, status, passo_atual, iniciado_em, heartbeat, pid, maquina_sessao in linhas:
+                expirada = heartbeat is None or heartbeat < limite
+                if not expirada and not (maquina_sessao == maquina and not processo_ativo(pid)):
+                    continue
+                passos = conn.execute(
+                    "SELECT passo, evento FROM passos WHERE execucao_id = ? ORDER BY seq", (id_,)
+                ).fetchall()
+                resultado.append({
+                    "id": id_, "fluxo": fluxo, "node": node, "dados": json.loads(dados or "{}"),
+                    "status": status, "passo_atual": passo_atual, "iniciado_em": iniciado_em,
+                    "passos": passos,
+                })
+        return resultado
+
+    def assumir(self, id_execucao, status):
+        """Fecha a execução órfã para esta sessão; False se outro console já a assumiu"""
+        try:
+            with self._conectar() as conn:
+                cursor = conn.execute(
+                    "UPDATE execucoes SET status = ?, finalizado_em = ? WHERE id = ? AND finalizado_em IS NULL",
+                    (status, time.time(), id_execucao),
+                )
+                return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao assumir execução {id_execucao}: {e}")
+            return False
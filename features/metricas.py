@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from features.event_loop import agendar_em
+
+logger = logging.getLogger("metricas")
+
+# Eventos em JSONL para análise posterior, só quando METRICAS_ARQUIVO é informado: o arquivo
+# não tem rotação e cada console aberto gravaria nele (ex.: METRICAS_ARQUIVO=log/metricas.jsonl)
+ARQUIVO_METRICAS = os.environ.get("METRICAS_ARQUIVO", "")
+METRICAS_PORTA = int(os.environ.get("METRICAS_PORTA", 9464))
+INTERVALO_GRAVACAO = 5
+# Eventos acima disso ficam só nos histogramas (disco lento ou indisponível)
+MAX_EVENTOS_PENDENTES = 10000
+
+# Limites dos buckets de latência, em segundos
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+class _Histograma:
+    def __init__(self):
+        self.contagens = [0] * len(BUCKETS)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        self.soma += valor
+        self.total += 1
+
+_lock = threading.Lock()
+_histogramas = {}  # (nome, rotulos) -> _Histograma
+_contadores = {}  # (nome, rotulos) -> valor
+_coletores = []
+_eventos = []
+_gravacao = None
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+def _registrar_evento(tipo, nome, valor, rotulos):
+    global _gravacao
+    if not ARQUIVO_METRICAS:
+        return
+    if len(_eventos) < MAX_EVENTOS_PENDENTES:
+        _eventos.append({"ts": round(time.time(), 3), "tipo": tipo, "nome": nome, "valor": valor, **rotulos})
+    if _gravacao is None:
+        # Gravação em lote por timer do loop compartilhado, fora do caminho das requisições
+        _gravacao = agendar_em(INTERVALO_GRAVACAO, _agendar_gravacao)
+
+def _agendar_gravacao():
+    from features.worker_pools import obter_pool
+    obter_pool("jobs").submit(gravar_jsonl)
+
+def observar(nome, valor, **rotulos):
+    """Registra uma observação (ex.: latência em segundos) no histograma nome{rotulos}"""
+    with _lock:
+        chave = _chave(nome, rotulos)
+        histograma = _histogramas.get(chave)
+        if histograma is None:
+            histograma = _histogramas[chave] = _Histograma()
+        histograma.observar(valor)
+        _registrar_evento("histograma", nome, round(valor, 6), rotulos)
+
+def incrementar(nome, valor=1, **rotulos):
+    """Soma valor ao contador nome{rotulos}"""
+    with _lock:
+        chave = _chave(nome, rotulos)
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+        _registrar_evento("contador", nome, valor, rotulos)
+
+@contextmanager
+def medir(nome, **rotulos):
+    """Observa a duração do bloco em nome{rotulos}; exceções ganham o rótulo erro"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        observar(nome, time.perf_counter() - inicio, erro=type(e).__name__, **rotulos)
+        raise
+    observar(nome, time.perf_counter() - inicio, **rotulos)
+
+def registrar_requisicao(prefixo, metodo, endpoint, duracao, status, **rotulos):
+    """Latência de uma requisição HTTP e contagem por status (prefixo: f5, jenkins...)"""
+    observar(f"{prefixo}_requisicao_segundos", duracao, metodo=metodo, endpoint=endpoint, **rotulos)
+    incrementar(f"{prefixo}_respostas_total", status=status, endpoint=endpoint, **rotulos)
+
+def gancho_requests(prefixo, normalizar, **rotulos):
+    """Hook de resposta para requests.Session: mede cada requisição com registrar_requisicao.
+
+    normalizar(url) reduz a URL a um endpoint de baixa cardinalidade.
+    """
+    def gancho(response, *args, **kwargs):
+        try:
+            registrar_requisicao(prefixo, response.request.method, normalizar(response.request.url),
+                                 response.elapsed.total_seconds(), response.status_code, **rotulos)
+        except Exception as e:
+            logger.debug(f"Falha ao registrar métrica de {prefixo}: {e}")
+        return response
+    return gancho
+
+def registrar_coletor(funcao):
+    """funcao() -> [(nome, {rotulos}, valor)]: gauges lidos a cada consulta ao endpoint"""
+    with _lock:
+        _coletores.append(funcao)
+
+def gravar_jsonl():
+    """Grava no ARQUIVO_METRICAS os eventos acumulados desde a última gravação"""
+    global _gravacao
+    with _lock:
+        eventos = list(_eventos)
+        _eventos.clear()
+        _gravacao = None
+    if not eventos:
+        return
+    try:
+        os.makedirs(os.path.dirname(ARQUIVO_METRICAS) or ".", exist_ok=True)
+        with open(ARQUIVO_METRICAS, "a", encoding="utf-8") as arquivo:
+            arquivo.write("".join(json.dumps(evento, ensure_ascii=False, default=str) + "\n" for evento in eventos))
+    except OSError as e:
+        logger.error(f"Erro ao gravar métricas em {ARQUIVO_METRICAS}: {e}")
+
+def _rotulos_prometheus(rotulos):
+    if not rotulos:
+        return ""
+    pares = []
+    for k, v in rotulos:
+        v = str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pares.append(f'{k}="{v}"')
+    return "{" + ",".join(pares) + "}"
+
+def texto_prometheus():
+    """Todas as métricas no formato texto do Prometheus"""
+    with _lock:
+        histogramas = [(chave, list(h.contagens), h.soma, h.total) for chave, h in _histogramas.items()]
+        contadores = list(_contadores.items())
+        coletores = list(_coletores)
+
+    linhas = []
+    tipos = set()
+    for (nome, rotulos), contagens, soma, total in sorted(histogramas):
+        if nome not in tipos:
+            tipos.add(nome)
+            linhas.append(f"# TYPE {nome} histogram")
+        acumulado = 0
+        for limite, contagem in zip(BUCKETS, contagens):
+            acumulado += contagem
+            linhas.append(f"{nome}_bucket{_rotulos_prometheus(rotulos + (('le', str(limite)),))} {acumulado}")
+        linhas.append(f"{nome}_bucket{_rotulos_prometheus(rotulos + (('le', '+Inf'),))} {total}")
+        linhas.append(f"{nome}_sum{_rotulos_prometheus(rotulos)} {soma}")
+        linhas.append(f"{nome}_count{_rotulos_prometheus(rotulos)} {total}")
+    for (nome, rotulos), valor in sorted(contadores):
+        if nome not in tipos:
+            tipos.add(nome)
+            linhas.append(f"# TYPE {nome} counter")
+        linhas.append(f"{nome}{_rotulos_prometheus(rotulos)} {valor}")
+    for coletor in coletores:
+        try:
+            gauges = list(coletor())
+        except Exception as e:
+            logger.error(f"Erro em coletor de métricas: {e}")
+            continue
+        for nome, rotulos, valor in gauges:
+            if nome not in tipos:
+                tipos.add(nome)
+                linhas.append(f"# TYPE {nome} gauge")
+            linhas.append(f"{nome}{_rotulos_prometheus(_chave(nome, rotulos)[1])} {valor}")
+    return "\n".join(linhas) + "\n"
+
+class _HandlerMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        corpo = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+_servidor = None
+
+def iniciar_servidor(porta=METRICAS_PORTA, host="127.0.0.1"):
+    """Sobe o endpoint /metrics local em background; None se a porta estiver ocupada
+    (ex.: outro console aberto) ou porta=0 nas variáveis de ambiente"""
+    global _servidor
+    if _servidor is not None or not porta:
+        return _servidor
+    try:
+        _servidor = ThreadingHTTPServer((host, porta), _HandlerMetricas)
+    except OSError as e:
+        logger.info(f"Endpoint de métricas não iniciado na porta {porta}: {e}")
+        return None
+    _servidor.daemon_threads = True
+    threading.Thread(target=_servidor.serve_forever, name="metricas-http", daemon=True).start()
+    logger.info(f"Métricas disponíveis em http://{host}:{porta}/metrics")
+    return _servidor
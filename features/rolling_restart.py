@@ -0,0 +1,183 @@
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+from features.worker_pools import obter_pool
+from features.event_loop import agendar_em
+
+logger = logging.getLogger("rolling_restart")
+
+class _GrupoCluster:
+    def __init__(self, nome, nodes, limite):
+        self.nome = nome
+        self.fila = deque(nodes)
+        self.limite = limite
+        self.em_andamento = set()
+        self.parado = False
+        # Reentrante: o callback de um Future já resolvido roda dentro do despacho
+        self.lock = threading.RLock()
+        self.timer = None
+        # Início da espera por capacidade do node na frente da fila
+        self.espera_desde = None
+
+class RollingRestart:
+    """Restart em lote respeitando a capacidade de cada cluster.
+
+    Os nodes são agrupados por cluster e cada cluster roda no máximo `limite`
+    nodes ao mesmo tempo. Antes de iniciar um node, capacidade(node,
+    em_andamento) confere os membros saudáveis dos pools ao vivo; se não houver
+    folga o node espera e a checagem é refeita quando outro node do cluster
+    termina ou após intervalo_recheck segundos. Assim que um node é
+    reabilitado o próximo da fila começa. Se a folga não aparecer em
+    espera_maxima segundos, o node falha com o motivo e o resto da fila do
+    cluster é cancelado (nenhum deles chegou a ser isolado).
+
+    iniciar(node) retorna um objeto com .resultado (Future[bool]), como a
+    ExecucaoFluxo do agendador de fluxos.
+    """
+
+    def __init__(self, iniciar, capacidade, intervalo_recheck=15, parar_em_falha=True, espera_maxima=None):
+        self._iniciar = iniciar
+        self._capacidade = capacidade
+        self.intervalo_recheck = intervalo_recheck
+        self.parar_em_falha = parar_em_falha
+        self.espera_maxima = espera_maxima
+        self._lock = threading.Lock()
+        self._aguardando = {}
+        self._resultados = {}
+        self._motivos = {}
+        self._forcados = set()
+        self._total = 0
+        self.resultado = Future()
+
+    def executar(self, grupos, forcados=(), recusados=None):
+        """grupos: {cluster: (nodes, limite)}. Retorna Future[{node: bool | None}].
+
+        forcados: nodes liberados pelo operador sem checagem de capacidade (pools já
+        degradados antes do restart); recusados: {node: motivo} que não serão iniciados.
+        """
+        recusados = recusados or {}
+        self._forcados = {n.upper() for n in forcados}
+        # Resultados são por node: um node repetido (mesmo com outra caixa) entra uma vez só
+        vistos = set()
+
+        def unicos(nodes):
+            saida = []
+            for node in nodes:
+                if node.upper() in vistos:
+                    logger.warning(f"{node} repetido no lote; ignorado")
+                    continue
+                vistos.add(node.upper())
+                saida.append(node)
+            return saida
+        recusados = {node: recusados[node] for node in unicos(recusados)}
+        grupos = {cluster: (unicos(nodes), limite) for cluster, (nodes, limite) in grupos.items()}
+        self._total = len(vistos)
+        if not self._total:
+            self.resultado.set_result({})
+            return self.resultado
+        for node, motivo in recusados.items():
+            self._registrar(node, None, motivo)
+        for cluster, (nodes, limite) in grupos.items():
+            if not nodes:
+                continue
+            grupo = _GrupoCluster(cluster, nodes, max(1, limite))
+            with self._lock:
+                for node in nodes:
+                    self._aguardando[node] = f"na fila do cluster {cluster}"
+            obter_pool("jobs").submit(self._despachar, grupo)
+        return self.resultado
+
+    def aguardando(self):
+        """Nodes ainda não iniciados e o motivo da espera"""
+        with self._lock:
+            return dict(self._aguardando)
+
+    def motivos(self):
+        """Nodes que falharam ou foram cancelados sem iniciar, com o motivo"""
+        with self._lock:
+            return dict(self._motivos)
+
+    def _despachar(self, grupo):
+        esgotados = []
+        with grupo.lock:
+            # Um só recheck agendado por cluster: o despacho que chega antes cancela o pendente
+            if grupo.timer:
+                grupo.timer.cancelar()
+                grupo.timer = None
+            while grupo.fila and not grupo.parado and len(grupo.em_andamento) < grupo.limite:
+                node = grupo.fila[0]
+                if node.upper() in self._forcados:
+                    permitido, motivo = True, None
+                else:
+                    try:
+                        permitido, motivo = self._capacidade(node, sorted(grupo.em_andamento))
+                    except Exception as e:
+                        permitido, motivo = False, f"erro ao consultar capacidade: {e}"
+                if not permitido:
+                    agora = time.monotonic()
+                    grupo.espera_desde = grupo.espera_desde or agora
+                    if self.espera_maxima is not None and agora - grupo.espera_desde >= self.espera_maxima:
+                        grupo.parado = True
+                        esgotados = list(grupo.fila)
+                        grupo.fila.clear()
+                        motivo = f"sem capacidade após {self.espera_maxima:.0f}s: {motivo}"
+                        logger.error(f"[{grupo.nome}] {node} {motivo}; nodes restantes do cluster cancelados: {esgotados[1:]}")
+                        break
+                    with self._lock:
+                        self._aguardando[node] = motivo
+                    logger.info(f"[{grupo.nome}] {node} aguardando capacidade: {motivo}")
+                    grupo.timer = agendar_em(self.intervalo_recheck, obter_pool("jobs").submit, self._despachar, grupo)
+                    return
+                grupo.espera_desde = None
+                grupo.fila.popleft()
+                grupo.em_andamento.add(node)
+                with self._lock:
+                    self._aguardando.pop(node, None)
+                try:
+                    execucao = self._iniciar(node)
+                except Exception as e:
+                    logger.error(f"[{grupo.nome}] Erro ao iniciar {node}: {e}")
+                    falha = Future()
+                    falha.set_result(False)
+                    execucao = None
+                future = execucao.resultado if execucao is not None else falha
+                future.add_done_callback(lambda f, node=node: self._node_concluido(grupo, node, f))
+        if esgotados:
+            self._registrar(esgotados[0], False, motivo)
+            for cancelado in esgotados[1:]:
+                self._registrar(cancelado, None, f"cancelado: {esgotados[0]} {motivo}")
+
+    def _node_concluido(self, grupo, node, future):
+        try:
+            ok = bool(future.result())
+        except Exception:
+            ok = False
+        cancelados = []
+        with grupo.lock:
+            grupo.em_andamento.discard(node)
+            if not ok and self.parar_em_falha and not grupo.parado:
+                # Falha deixa o node possivelmente isolado: não tira mais nodes deste cluster
+                grupo.parado = True
+                cancelados = list(grupo.fila)
+                grupo.fila.clear()
+                if grupo.timer:
+                    grupo.timer.cancelar()
+                    grupo.timer = None
+                logger.error(f"[{grupo.nome}] Falha em {node}; nodes restantes do cluster cancelados: {cancelados}")
+        self._registrar(node, ok)
+        for cancelado in cancelados:
+            self._registrar(cancelado, None, f"cancelado após falha em {node}")
+        if not grupo.parado:
+            obter_pool("jobs").submit(self._despachar, grupo)
+
+    def _registrar(self, node, resultado, motivo=None):
+        with self._lock:
+            self._aguardando.pop(node, None)
+            self._resultados[node] = resultado
+            if motivo:
+                self._motivos[node] = motivo
+            terminou = len(self._resultados) == self._total
+        if terminou and not self.resultado.done():
+            self.resultado.set_result(dict(self._resultados))
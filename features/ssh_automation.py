@@ -1,69 +1,97 @@
-import paramiko
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import logging
+from concurrent.futures import as_completed
+from features.worker_pools import obter_pool
+from features.metricas import medir
+from features.ssh_pool import obter_pool_ssh
 
-def execute_ssh_commands(host, username, password):
-    port = 22  # Definido como 22 para SSH
+logger = logging.getLogger("ssh_automation")
+
+DIR_TEMP = '/opt/IBM/WAS/WebSphere/AppServer/temp'
+# Arquivos temporários, arquivos que começam com "C", arquivos .ttf e arquivos .pdf
+PADROES_TEMP = ('*.tmp', 'C*', '*.ttf', '*.pdf')
+
+# Filtros opcionais da limpeza: só arquivos modificados há mais de N minutos / maiores que N KB
+LIMPEZA_IDADE_MINUTOS = int(os.environ.get("LIMPEZA_TEMP_IDADE_MINUTOS", 0)) or None
+LIMPEZA_TAMANHO_MINIMO_KB = int(os.environ.get("LIMPEZA_TEMP_TAMANHO_MINIMO_KB", 0)) or None
+
+def script_limpeza_temp(idade_minutos=None, tamanho_minimo_kb=None):
+    """Um único find sob `sudo -S`: uma passada no temp para todos os padrões.
+
+    Cada arquivo removido imprime seu tamanho em bytes (o -printf só roda se o -delete deu certo).
+    """
+    padroes = ' -o '.join(f'-name "{padrao}"' for padrao in PADROES_TEMP)
+    filtros = ''
+    if idade_minutos:
+        filtros += f' -mmin +{int(idade_minutos)}'
+    if tamanho_minimo_kb:
+        filtros += f' -size +{int(tamanho_minimo_kb)}k'
+    return f"sudo -S -p '' find {DIR_TEMP} \\( {padroes} \\){filtros} -delete -printf '%s\\n'"
+
+def formatar_bytes(quantidade):
+    for unidade in ('B', 'KB', 'MB', 'GB'):
+        if quantidade < 1024 or unidade == 'GB':
+            return f"{quantidade:.0f} {unidade}" if unidade == 'B' else f"{quantidade:.1f} {unidade}"
+        quantidade /= 1024
+
+def execute_ssh_commands(host, username, password, idade_minutos=None, tamanho_minimo_kb=None):
     sudo_password = password  # Reutiliza a senha para comandos sudo
     result_message = "Limpeza Disco-Opt - Na pasta Temp<br>"
+    idade_minutos = idade_minutos or LIMPEZA_IDADE_MINUTOS
+    tamanho_minimo_kb = tamanho_minimo_kb or LIMPEZA_TAMANHO_MINIMO_KB
+    removidos = {"arquivos": 0, "bytes": 0}
 
-    # Cria uma sessão SSH
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    def registrar_linha(fluxo, linha):
+        # Hosts com milhões de arquivos: soma os tamanhos conforme chegam, sem guardar a saída
+        if fluxo == "stdout" and linha.isdigit():
+            removidos["arquivos"] += 1
+            removidos["bytes"] += int(linha)
+        elif linha:
+            logger.debug(f"[{host}] {fluxo}: {linha}")
 
     try:
-        # Conecta ao servidor
-        ssh.connect(host, port, username, password)
-        result_message += f"[bold green]Conectado ao servidor {host}[/bold green]<br>"
-
-        # Executa o comando para verificar o tamanho da pasta temp ANTES da exclusão
-        size_command_before = 'du -sh /opt/IBM/WAS/WebSphere/AppServer/temp'
-        stdin, stdout, stderr = ssh.exec_command(size_command_before)
-        size_before = stdout.read().decode().strip()
-        result_message += f"[yellow]Tamanho da pasta temp ANTES da exclusão: {size_before}[/yellow]<br>"
-
-        # Atualiza o comando para deletar arquivos temporários, arquivos que começam com "C", arquivos .ttf e arquivos .pdf
-        delete_command = 'sudo find /opt/IBM/WAS/WebSphere/AppServer/temp -name "*.tmp" -delete; sudo find /opt/IBM/WAS/WebSphere/AppServer/temp -name "C*" -delete; sudo find /opt/IBM/WAS/WebSphere/AppServer/temp -name "*.ttf" -delete; sudo find /opt/IBM/WAS/WebSphere/AppServer/temp -name "*.pdf" -delete'
-        stdin, stdout, stderr = ssh.exec_command(delete_command)
-        stdin.write(sudo_password + '\n')
-        stdin.flush()
-        time.sleep(2)  # Aguardando o comando ser executado
-
-        # Executa o comando para verificar o tamanho da pasta temp DEPOIS da exclusão
-        size_command_after = 'du -sh /opt/IBM/WAS/WebSphere/AppServer/temp'
-        stdin, stdout, stderr = ssh.exec_command(size_command_after)
-        size_after = stdout.read().decode().strip()
-        result_message += f"[yellow]Tamanho da pasta temp DEPOIS da exclusão: {size_after}[/yellow]<br>"
+        # Sessão do pool (host, usuário): a movimentação do OutOfMemory reaproveita a mesma conexão
+        with obter_pool_ssh().sessao(host, username, password) as ssh:
+            result_message += f"[bold green]Conectado ao servidor {host}[/bold green]<br>"
+
+            # Termina pelo exit status do find, sem espera fixa
+            with medir("ssh_operacao_segundos", host=host, operacao="limpeza"):
+                codigo, _, erro = ssh.executar(
+                    script_limpeza_temp(idade_minutos, tamanho_minimo_kb), entrada=sudo_password + '\n',
+                    ao_receber=registrar_linha, guardar_saida=False,
+                )
+
+            result_message += (f"[yellow]Arquivos removidos da pasta temp: {removidos['arquivos']} "
+                               f"({formatar_bytes(removidos['bytes'])} liberados)[/yellow]<br>")
+            if codigo != 0:
+                result_message += f"[red]Limpeza do temp falhou no servidor {host} (código {codigo}): {erro.strip()}[/red]<br>"
 
     except Exception as e:
         result_message += f"[red]Erro ao conectar ou executar o comando no servidor {host}: {str(e)}[/red]<br>"
 
-    finally:
-        ssh.close()
-
     return result_message
 
-def clean_opt_disk(nodes, username, password):
+def clean_opt_disk(nodes, username, password, idade_minutos=None, tamanho_minimo_kb=None):
     """Função principal para limpar disco opt em múltiplos nodes"""
     hosts = [node.strip() for node in nodes.split(',')] if isinstance(nodes, str) else [nodes]
     
     if not hosts or not username or not password:
         return {"status": "error", "message": "Parâmetros inválidos!"}
 
-    with ThreadPoolExecutor() as executor:
-        future_to_host = {
-            executor.submit(execute_ssh_commands, host, username, password): host 
-            for host in hosts
-        }
-        
-        results = []
-        for future in as_completed(future_to_host):
-            host = future_to_host[future]
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                results.append(f"Erro ao processar o servidor {host}: {str(e)}")
+    executor = obter_pool("ssh")
+    future_to_host = {
+        executor.submit(execute_ssh_commands, host, username, password, idade_minutos, tamanho_minimo_kb): host 
+        for host in hosts
+    }
+    
+    results = []
+    for future in as_completed(future_to_host):
+        host = future_to_host[future]
+        try:
+            result = future.result()
+            results.append(result)
+        except Exception as e:
+            results.append(f"Erro ao processar o servidor {host}: {str(e)}")
 
     return {
         "status": "success",
@@ -0,0 +1,250 @@
+import os
+import time
+import select
+import logging
+import threading
+import contextlib
+import paramiko
+from features.metricas import medir, incrementar, registrar_coletor
+from features.event_loop import agendar_em
+from features.worker_pools import obter_pool
+
+logger = logging.getLogger("ssh_pool")
+
+# Sessões sem uso por mais que isso são fechadas (SSH_POOL_OCIOSO=segundos)
+SSH_OCIOSO_SEGUNDOS = float(os.environ.get("SSH_POOL_OCIOSO", 120))
+# Usos simultâneos de uma sessão; cada comando abre um canal no mesmo transporte
+# e o sshd limita canais por conexão (MaxSessions, 10 por padrão no OpenSSH)
+SSH_CANAIS_POR_SESSAO = int(os.environ.get("SSH_POOL_CANAIS", 8))
+
+# Prazo de um comando remoto até o exit status (SSH_COMANDO_TIMEOUT=segundos)
+SSH_COMANDO_TIMEOUT = float(os.environ.get("SSH_COMANDO_TIMEOUT", 600))
+TAMANHO_LEITURA = 32768
+
+# Falhas que indicam transporte inutilizado: a sessão é descartada e a próxima reconecta
+ERROS_TRANSPORTE = (paramiko.SSHException, EOFError, OSError)
+
+def separar_host_porta(host, porta_padrao=22):
+    """'host' ou 'host:porta' -> (host, porta); permite apontar para servidores SSH de teste"""
+    nome, separador, porta = host.rpartition(':')
+    if separador and porta.isdigit():
+        return nome, int(porta)
+    return host, porta_padrao
+
+class _Fluxo:
+    """Acumula um fluxo do canal e entrega as linhas completas ao callback"""
+
+    def __init__(self, nome, ao_receber, guardar=True):
+        self.nome = nome
+        self.ao_receber = ao_receber
+        self.guardar = guardar
+        self.partes = []
+        self.pendente = ""
+
+    def receber(self, dados):
+        texto = dados.decode("utf-8", "replace")
+        if self.guardar:
+            self.partes.append(texto)
+        if self.ao_receber:
+            *linhas, self.pendente = (self.pendente + texto).split("\n")
+            for linha in linhas:
+                self.ao_receber(self.nome, linha)
+
+    def texto(self):
+        if self.ao_receber and self.pendente:
+            self.ao_receber(self.nome, self.pendente)
+            self.pendente = ""
+        return "".join(self.partes)
+
+class SessaoSSH:
+    """Conexão autenticada com um host; comandos de várias etapas viram canais do mesmo transporte"""
+
+    def __init__(self, host, usuario, senha, cliente):
+        self.host = host
+        self.usuario = usuario
+        self.senha = senha
+        self.cliente = cliente
+        self.em_uso = 0
+        self.ultimo_uso = time.monotonic()
+        self.canais = threading.BoundedSemaphore(SSH_CANAIS_POR_SESSAO)
+
+    def ativa(self):
+        transporte = self.cliente.get_transport()
+        return transporte is not None and transporte.is_active() and transporte.is_authenticated()
+
+    def exec_command(self, comando, **kwargs):
+        """Mesmo retorno de SSHClient.exec_command (stdin, stdout, stderr), em um novo canal"""
+        return self.cliente.exec_command(comando, **kwargs)
+
+    def executar(self, comando, entrada=None, timeout=SSH_COMANDO_TIMEOUT, ao_receber=None, guardar_saida=True):
+        """Executa o comando em um novo canal e espera o exit status.
+
+        entrada (ex.: senha do `sudo -S`) é enviada seguida de EOF. stdout e stderr
+        são lidos conforme chegam, sem encher a janela do canal; ao_receber(fluxo, linha)
+        é chamado a cada linha completa; com guardar_saida=False o stdout só passa
+        pelo callback (saídas longas). Retorna (código, stdout, stderr); estoura
+        TimeoutError (e fecha o canal) se o comando passar do prazo.
+        """
+        canal = self.cliente.get_transport().open_session()
+        fluxos = {"stdout": _Fluxo("stdout", ao_receber, guardar_saida), "stderr": _Fluxo("stderr", ao_receber)}
+        limite = time.monotonic() + timeout if timeout else None
+        try:
+            canal.exec_command(comando)
+            if entrada is not None:
+                canal.sendall(entrada.encode())
+            canal.shutdown_write()
+            while True:
+                restante = limite - time.monotonic() if limite else 1.0
+                if restante <= 0:
+                    raise TimeoutError(f"Comando sem exit status após {timeout:.0f}s em {self.host}")
+                select.select([canal], [], [], min(restante, 1.0))
+                while canal.recv_stderr_ready():
+                    fluxos["stderr"].receber(canal.recv_stderr(TAMANHO_LEITURA))
+                if canal.recv_ready():
+                    fluxos["stdout"].receber(canal.recv(TAMANHO_LEITURA))
+                elif canal.eof_received:
+                    break
+            while canal.recv_stderr_ready():
+                fluxos["stderr"].receber(canal.recv_stderr(TAMANHO_LEITURA))
+            # EOF chega depois do exit status no sshd; o prazo restante cobre servidores que invertem
+            if not canal.status_event.wait(max(0.0, limite - time.monotonic()) if limite else None):
+                raise TimeoutError(f"Comando sem exit status após {timeout:.0f}s em {self.host}")
+            return canal.exit_status, fluxos["stdout"].texto(), fluxos["stderr"].texto()
+        finally:
+            canal.close()
+
+    def fechar(self):
+        try:
+            self.cliente.close()
+        except Exception as e:
+            logger.debug(f"Erro ao fechar sessão SSH de {self.host}: {e}")
+
+class PoolSSH:
+    """Sessões SSH reaproveitadas por (host, usuário), com fechamento das ociosas"""
+
+    def __init__(self, ocioso=SSH_OCIOSO_SEGUNDOS):
+        self.ocioso = ocioso
+        self._sessoes = {}
+        self._locks_chave = {}
+        self._lock = threading.Lock()
+        self._limpeza = None
+
+    def _conectar(self, host, usuario, senha):
+        endereco, porta = separar_host_porta(host)
+        cliente = paramiko.SSHClient()
+        cliente.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            with medir("ssh_operacao_segundos", host=host, operacao="conectar"):
+                cliente.connect(endereco, porta, usuario, senha)
+        except Exception:
+            cliente.close()
+            raise
+        incrementar("ssh_conexoes_total", host=host)
+        return SessaoSSH(host, usuario, senha, cliente)
+
+    def _obter(self, host, usuario, senha):
+        chave = (host, usuario)
+        with self._lock:
+            lock_chave = self._locks_chave.setdefault(chave, threading.Lock())
+        # Uma conexão por chave: quem chega durante o handshake espera e reaproveita
+        with lock_chave:
+            with self._lock:
+                sessao = self._sessoes.get(chave)
+            if sessao is not None and sessao.ativa() and sessao.senha == senha:
+                incrementar("ssh_reusos_total", host=host)
+            else:
+                if sessao is not None:
+                    self.descartar(sessao)
+                sessao = self._conectar(host, usuario, senha)
+                with self._lock:
+                    self._sessoes[chave] = sessao
+                    self._agendar_limpeza()
+            with self._lock:
+                sessao.em_uso += 1
+            return sessao
+
+    @contextlib.contextmanager
+    def sessao(self, host, usuario, senha):
+        """Sessão do host para uma sequência de comandos; erros de transporte a descartam"""
+        sessao = self._obter(host, usuario, senha)
+        sessao.canais.acquire()
+        try:
+            yield sessao
+        except ERROS_TRANSPORTE:
+            self.descartar(sessao)
+            raise
+        finally:
+            sessao.canais.release()
+            with self._lock:
+                sessao.em_uso -= 1
+                sessao.ultimo_uso = time.monotonic()
+
+    def descartar(self, sessao):
+        with self._lock:
+            chave = (sessao.host, sessao.usuario)
+            if self._sessoes.get(chave) is sessao:
+                del self._sessoes[chave]
+        sessao.fechar()
+
+    def _agendar_limpeza(self):
+        # Chamado com self._lock; um só temporizador enquanto houver sessões. O loop só
+        # repassa ao pool "ssh": fechar um transporte travado não pode parar o loop compartilhado
+        if self._limpeza is None and self._sessoes:
+            self._limpeza = agendar_em(max(1.0, self.ocioso / 2), obter_pool("ssh").submit, self._fechar_ociosas)
+
+    def _fechar_ociosas(self):
+        agora = time.monotonic()
+        with self._lock:
+            self._limpeza = None
+            ociosas = [
+                s for s in self._sessoes.values()
+                if s.em_uso == 0 and (agora - s.ultimo_uso >= self.ocioso or not s.ativa())
+            ]
+            for sessao in ociosas:
+                del self._sessoes[(sessao.host, sessao.usuario)]
+            self._agendar_limpeza()
+        for sessao in ociosas:
+            logger.debug(f"Fechando sessão SSH ociosa de {sessao.host}")
+            sessao.fechar()
+
+    def encerrar(self):
+        with self._lock:
+            sessoes = list(self._sessoes.values())
+            self._sessoes.clear()
+            if self._limpeza is not None:
+                self._limpeza.cancelar()
+                self._limpeza = None
+        for sessao in sessoes:
+            sessao.fechar()
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "abertas": len(self._sessoes),
+                "em_uso": sum(1 for s in self._sessoes.values() if s.em_uso),
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _coletar_metricas():
+    estatisticas = _pool.estatisticas() if _pool else {"abertas": 0, "em_uso": 0}
+    return [
+        ("ssh_sessoes_abertas", {}, estatisticas["abertas"]),
+        ("ssh_sessoes_em_uso", {}, estatisticas["em_uso"]),
+    ]
+
+def obter_pool_ssh():
+    """Pool de sessões SSH compartilhado pelo processo"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolSSH()
+            registrar_coletor(_coletar_metricas)
+        return _pool
+
+def encerrar_sessoes_ssh():
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.encerrar()
@@ -0,0 +1,85 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from features.metricas import observar
+
+# Limite de threads por classe de recurso. Pode ser alterado por variável de
+# ambiente (ex.: POOL_F5_MAX_WORKERS=32) ou por configurar_limite() antes do primeiro uso.
+LIMITES_PADRAO = {
+    "f5": 24,       # chamadas iControl REST aos balanceadores
+    "jenkins": 16,  # disparo e acompanhamento de jobs
+    "ssh": 20,      # sessões SSH das limpezas
+    "jobs": 20,     # fluxos completos (restart de vários nodes)
+}
+
+_pools = {}
+_limites = {}
+_lock = threading.Lock()
+
+class PoolLimitado(ThreadPoolExecutor):
+    """ThreadPoolExecutor com contadores de tarefas na fila e em execução"""
+
+    def __init__(self, nome, max_workers):
+        super().__init__(max_workers=max_workers, thread_name_prefix=f"pool-{nome}")
+        self.nome = nome
+        self.limite = max_workers
+        self._contador_lock = threading.Lock()
+        self.em_fila = 0
+        self.em_execucao = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._contador_lock:
+            self.em_fila += 1
+        enfileirado = time.perf_counter()
+
+        def executar():
+            # Tempo na fila do pool: mostra quando o limite de threads é o gargalo
+            observar("pool_espera_segundos", time.perf_counter() - enfileirado, pool=self.nome)
+            with self._contador_lock:
+                self.em_fila -= 1
+                self.em_execucao += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._contador_lock:
+                    self.em_execucao -= 1
+
+        return super().submit(executar)
+
+def _limite(nome):
+    if nome in _limites:
+        return _limites[nome]
+    valor = os.environ.get(f"POOL_{nome.upper()}_MAX_WORKERS")
+    if valor and valor.isdigit() and int(valor) > 0:
+        return int(valor)
+    return LIMITES_PADRAO.get(nome, 10)
+
+def configurar_limite(nome, max_workers):
+    """Define o limite de threads de um pool (vale para pools ainda não criados)"""
+    with _lock:
+        _limites[nome] = max_workers
+
+def obter_pool(nome):
+    """Retorna o pool compartilhado do recurso, criando-o no primeiro uso"""
+    with _lock:
+        pool = _pools.get(nome)
+        if pool is None:
+            pool = PoolLimitado(nome, _limite(nome))
+            _pools[nome] = pool
+        return pool
+
+def estatisticas_pools():
+    """Fila/execução/limite de cada pool já criado"""
+    with _lock:
+        return {
+            nome: {"limite": pool.limite, "em_fila": pool.em_fila, "em_execucao": pool.em_execucao}
+            for nome, pool in _pools.items()
+        }
+
+def encerrar_pools(wait=False):
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,187 @@
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import Future
+from features.worker_pools import obter_pool
+from features.metricas import observar
+
+logger = logging.getLogger("workflow")
+
+class Passo:
+    """Etapa de um fluxo.
+
+    executar(execucao) retorna True/False ou um Future[bool]; um Future não
+    prende thread do pool enquanto a etapa aguarda (drenagem, build, espera).
+    False interrompe o fluxo.
+    """
+
+    def __init__(self, nome, executar):
+        self.nome = nome
+        self.executar = executar
+
+class Fluxo:
+    """Sequência de etapas descrita como dados.
+
+    componentes: {prefixo: [(nome_componente, dependencias), ...]} com "*" como
+    padrão para prefixos não listados; usado pela etapa de Jenkins.
+    """
+
+    def __init__(self, nome, descricao, passos, componentes=None):
+        self.nome = nome
+        self.descricao = descricao
+        self.passos = list(passos)
+        self.componentes = componentes or {}
+
+    def componentes_do_node(self, node):
+        prefixo = node[:4].upper()
+        return self.componentes.get(prefixo, self.componentes.get("*"))
+
+class Politica:
+    """Parâmetros por prefixo de node (WASP/TRNP/CTRP...)"""
+
+    def __init__(self, espera_isolamento=0, timeout_drenagem=600, timeout_build=600):
+        self.espera_isolamento = espera_isolamento
+        self.timeout_drenagem = timeout_drenagem
+        self.timeout_build = timeout_build
+
+def encadear(future, funcao):
+    """Future com o resultado de funcao(resultado de future)"""
+    saida = Future()
+
+    def concluir(f):
+        try:
+            saida.set_result(funcao(f.result()))
+        except Exception as e:
+            saida.set_exception(e)
+    future.add_done_callback(concluir)
+    return saida
+
+class ExecucaoFluxo:
+    """Uma execução de fluxo para um node, com status para acompanhamento"""
+
+    def __init__(self, fluxo, node, politica, recursos, dados, store=None):
+        self.id = uuid.uuid4().hex
+        self.fluxo = fluxo
+        self.node = node
+        self.politica = politica
+        self.recursos = recursos
+        self.dados = dict(dados)
+        self.status = "PENDENTE"
+        self.passo_atual = None
+        self.historico = []
+        self.resultado = Future()
+        self.start_time = time.strftime("%H:%M:%S")
+        self.end_time = None
+        self._inicio = time.time()
+        self._indice = 0
+        self._inicio_passo = None
+        self._store = store
+        self._lock_dados = threading.Lock()
+
+    def anotar(self, chave, valor):
+        """Guarda um dado da execução (ex.: URLs dos builds) e o persiste no store"""
+        with self._lock_dados:
+            self.dados[chave] = valor
+            if self._store:
+                self._store.atualizar_dados(self)
+
+    def anotar_item(self, chave, item, valor):
+        """anotar de um item em um dado do tipo dicionário (ex.: build por componente);
+        componentes em paralelo não sobrescrevem o item um do outro"""
+        with self._lock_dados:
+            self.dados[chave] = dict(self.dados.get(chave) or {}, **{item: valor})
+            if self._store:
+                self._store.atualizar_dados(self)
+
+class AgendadorFluxos:
+    """Executa fluxos de qualquer tipo sobre recursos compartilhados.
+
+    Os recursos (manager F5, acompanhamento de drenagem etc.) são do agendador e
+    chegam às etapas por execucao.recursos; as etapas rodam no pool "jobs" e as
+    esperas são encadeadas por Future, então otimizações nos recursos valem
+    para todos os fluxos de uma vez.
+    """
+
+    def __init__(self, recursos=None, politicas=None, pool=None, store=None):
+        self.recursos = recursos or {}
+        self.politicas = politicas or {}
+        self.pool = pool or obter_pool("jobs")
+        # JobStore opcional: cada transição de etapa é gravada para retomada após queda
+        self.store = store
+        self._lock = threading.Lock()
+        self._execucoes = []
+
+    def politica_do_node(self, node):
+        return self.politicas.get(node[:4].upper(), self.politicas.get("*", Politica()))
+
+    def iniciar(self, fluxo, node, **dados):
+        """Inicia o fluxo para o node e retorna a ExecucaoFluxo (resultado em .resultado)"""
+        execucao = ExecucaoFluxo(fluxo, node, self.politica_do_node(node), self.recursos, dados, self.store)
+        with self._lock:
+            self._execucoes.append(execucao)
+        execucao.status = "EXECUTANDO"
+        if self.store:
+            self.store.registrar_execucao(execucao)
+        self._agendar_passo(execucao)
+        return execucao
+
+    def executar(self, fluxo, node, **dados):
+        """Versão bloqueante de iniciar: retorna True/False"""
+        return self.iniciar(fluxo, node, **dados).resultado.result()
+
+    def execucoes(self, nome_fluxo=None):
+        with self._lock:
+            return [e for e in self._execucoes if nome_fluxo is None or e.fluxo.nome == nome_fluxo]
+
+    def _agendar_passo(self, execucao):
+        if execucao._indice >= len(execucao.fluxo.passos):
+            self._finalizar(execucao, True)
+            return
+        passo = execucao.fluxo.passos[execucao._indice]
+        execucao.passo_atual = passo.nome
+        execucao._inicio_passo = time.time()
+        if self.store:
+            self.store.registrar_passo(execucao, passo.nome, "inicio")
+        future = self.pool.submit(passo.executar, execucao)
+        future.add_done_callback(lambda f: self._passo_concluido(execucao, passo, f))
+
+    def _passo_concluido(self, execucao, passo, future):
+        try:
+            ok = future.result()
+        except Exception as e:
+            logger.error(f"[{execucao.fluxo.nome} {execucao.node}] Erro na etapa {passo.nome}: {e}")
+            self._registrar(execucao, passo, False)
+            self._finalizar(execucao, False, f"ERRO: {str(e)}")
+            return
+        if isinstance(ok, Future):
+            # Etapa assíncrona: continua no pool quando o Future resolver. Quem resolve pode ser
+            # o loop compartilhado (esperar) ou a thread de um acompanhamento (drenagem, builds),
+            # que só repassam; gravação no store e próxima etapa nunca rodam nessas threads
+            ok.add_done_callback(lambda f: self.pool.submit(self._passo_concluido, execucao, passo, f))
+            return
+        self._registrar(execucao, passo, bool(ok))
+        if not ok:
+            self._finalizar(execucao, False)
+            return
+        execucao._indice += 1
+        self._agendar_passo(execucao)
+
+    def _registrar(self, execucao, passo, ok):
+        duracao = time.time() - execucao._inicio_passo
+        execucao.historico.append((passo.nome, ok, duracao))
+        observar("workflow_passo_segundos", duracao, fluxo=execucao.fluxo.nome, passo=passo.nome, resultado="ok" if ok else "falha")
+        if self.store:
+            self.store.registrar_passo(execucao, passo.nome, "ok" if ok else "falha")
+        logger.info(f"[{execucao.fluxo.nome} {execucao.node}] Etapa {passo.nome}: {'ok' if ok else 'falhou'} em {duracao:.1f}s")
+
+    def _finalizar(self, execucao, sucesso, status=None):
+        execucao.status = status or ("FINALIZADO (SUCESSO)" if sucesso else "FINALIZADO (ERRO)")
+        execucao.passo_atual = None
+        execucao.end_time = time.strftime("%H:%M:%S")
+        observar("workflow_execucao_segundos", time.time() - execucao._inicio, fluxo=execucao.fluxo.nome,
+                 resultado="sucesso" if sucesso else "erro")
+        if self.store:
+            self.store.finalizar(execucao)
+        if not execucao.resultado.done():
+            execucao.resultado.set_result(sucesso)
@@ -11,6 +11,10 @@ REM Instala pyperclip para copia automatica para clipboard
 echo Instalando pyperclip (para copia automatica para clipboard)...
 pip install pyperclip
 
+REM Instala httpx (cliente assincrono do F5 com keep-alive e HTTP/2)
+echo Instalando httpx (cliente assincrono dos balanceadores)...
+pip install httpx[http2]
+
 echo.
 echo ========================================
 echo Instalacao concluida!
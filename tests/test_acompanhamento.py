@@ -0,0 +1,327 @@
+"""Comportamento dos serviços de acompanhamento em lote: prazo, esperas repetidas e encerramento.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+import json
+import time
+import threading
+import unittest
+from unittest import mock
+from features.acompanhamento import Espera, AcompanhamentoEmLote, RegistroPorUsuario
+from features.drain_watcher import DrainWatcher
+from Restart_Funcoes.build_poller import BuildPoller
+from Restart_Funcoes import queue_resolver
+from Restart_Funcoes.queue_resolver import QueueResolver, disparo_na_fila
+
+ESPERA_TESTE = 5
+
+class _Contador(AcompanhamentoEmLote):
+    """Serviço mínimo: conclui a chave quando ela aparece em `prontas`"""
+
+    intervalo = 0.01
+
+    def __init__(self):
+        super().__init__()
+        self.prontas = {}
+        self.ciclos = 0
+        self.lotes = []
+
+    def aguardar(self, chave, timeout=ESPERA_TESTE):
+        return self._registrar(Espera(chave, timeout))
+
+    def _ciclo(self, esperas):
+        self.ciclos += 1
+        self.lotes.append(sorted(e.chave for e in esperas))
+        for espera in esperas:
+            if espera.chave in self.prontas:
+                self._finalizar(espera, self.prontas[espera.chave])
+        return self.intervalo
+
+    def _resultado_timeout(self, espera):
+        return "timeout"
+
+class _Resposta:
+    def __init__(self, status_code, dados):
+        self.status_code = status_code
+        self._dados = dados
+
+    def json(self):
+        return self._dados
+
+class _ClienteJenkins:
+    """Jenkins em memória: itens na fila, itens resolvidos e builds por pasta"""
+
+    def __init__(self):
+        self.na_fila = set()
+        self.itens = {}
+        self.builds = {}
+        self.consultas = 0
+        self.lock = threading.Lock()
+
+    def url(self, caminho):
+        return caminho
+
+    def get(self, url, params=None):
+        with self.lock:
+            self.consultas += 1
+            if url == "queue/api/json":
+                return _Resposta(200, {"items": [{"id": i} for i in self.na_fila]})
+            pasta = url[:-len("api/json")]
+            if pasta.startswith("q/item/"):
+                return _Resposta(200, self.itens[pasta]) if pasta in self.itens else _Resposta(404, None)
+            return _Resposta(200, {"builds": list(self.builds.get(pasta, {}).values())})
+
+class _Balanceador:
+    def __init__(self, nome, conexoes):
+        self.name = nome
+        self.conexoes = conexoes
+        self.consultas = 0
+        self.erro = None
+
+    async def get_nodes_status_async(self, nodes):
+        self.consultas += 1
+        if self.erro:
+            raise self.erro
+        return {n: {"found": n in self.conexoes, "connections": self.conexoes.get(n, 0)} for n in nodes}
+
+class AcompanhamentoEmLoteTest(unittest.TestCase):
+    def setUp(self):
+        self.servico = _Contador()
+
+    def tearDown(self):
+        self.servico.encerrar()
+
+    def test_conclui_e_remove_a_espera(self):
+        self.servico.prontas["a"] = "ok"
+        self.assertEqual(self.servico.aguardar("a").result(ESPERA_TESTE), "ok")
+        self.assertEqual(self.servico._pendentes(), {})
+
+    def test_prazo_resolve_com_resultado_de_timeout(self):
+        future = self.servico.aguardar("lenta", timeout=0.05)
+        self.assertEqual(future.result(ESPERA_TESTE), "timeout")
+        self.assertNotIn("lenta", self.servico._pendentes())
+
+    def test_chave_repetida_compartilha_resultado_e_consulta(self):
+        self.servico.intervalo = 0.2
+        primeira = self.servico.aguardar("a")
+        segunda = self.servico.aguardar("a")
+        self.assertIsNot(primeira, segunda)
+        self.assertEqual(len(self.servico._pendentes()), 1)
+        self.servico.prontas["a"] = 42
+        self.assertEqual(primeira.result(ESPERA_TESTE), 42)
+        self.assertEqual(segunda.result(ESPERA_TESTE), 42)
+        self.assertTrue(all(lote == ["a"] for lote in self.servico.lotes))
+
+    def test_chave_concluida_pode_ser_registrada_de_novo(self):
+        self.servico.prontas["a"] = 1
+        self.assertEqual(self.servico.aguardar("a").result(ESPERA_TESTE), 1)
+        self.servico.prontas["a"] = 2
+        self.assertEqual(self.servico.aguardar("a").result(ESPERA_TESTE), 2)
+
+    def test_esperas_diferentes_vao_no_mesmo_lote(self):
+        self.servico.intervalo = 0.2
+        futures = [self.servico.aguardar(c) for c in ("a", "b", "c")]
+        self.servico.prontas.update(a=1, b=2, c=3)
+        self.assertEqual([f.result(ESPERA_TESTE) for f in futures], [1, 2, 3])
+        self.assertIn(["a", "b", "c"], self.servico.lotes)
+
+    def test_erro_no_ciclo_nao_derruba_a_thread(self):
+        falhas = []
+        ciclo_original = self.servico._ciclo
+
+        def ciclo(esperas):
+            if not falhas:
+                falhas.append(True)
+                raise RuntimeError("falha temporária")
+            return ciclo_original(esperas)
+        self.servico._ciclo = ciclo
+        self.servico.prontas["a"] = "ok"
+        with self.assertLogs("acompanhamento", level="ERROR"):
+            self.assertEqual(self.servico.aguardar("a").result(ESPERA_TESTE), "ok")
+
+    def test_encerrar_resolve_pendentes_e_para_a_thread(self):
+        future = self.servico.aguardar("a", timeout=60)
+        thread = self.servico._thread
+        self.servico.encerrar()
+        self.assertEqual(future.result(0), "timeout")
+        self.assertFalse(thread.is_alive())
+
+    def test_registro_apos_encerrar_nao_cria_thread(self):
+        self.servico.encerrar()
+        self.assertEqual(self.servico.aguardar("a").result(0), "timeout")
+        self.assertIsNone(self.servico._thread)
+
+class RegistroPorUsuarioTest(unittest.TestCase):
+    def test_uma_instancia_por_usuario(self):
+        criadas = []
+        registro = RegistroPorUsuario(lambda login, senha: criadas.append((login, senha)) or object())
+        a = registro.obter("ana", "1")
+        self.assertIs(registro.obter("ana", "1"), a)
+        self.assertIsNot(registro.obter("bia", "1"), a)
+        self.assertIsNot(registro.obter("ana", "2"), a)
+        self.assertEqual(len(criadas), 3)
+
+    def test_criacao_concorrente_usa_a_mesma_instancia(self):
+        registro = RegistroPorUsuario(lambda login, senha: object())
+        barreira = threading.Barrier(8)
+        obtidas = []
+
+        def obter():
+            barreira.wait()
+            obtidas.append(registro.obter("ana", "1"))
+        threads = [threading.Thread(target=obter) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len({id(i) for i in obtidas}), 1)
+
+class QueueResolverTest(unittest.TestCase):
+    def setUp(self):
+        self.cliente = _ClienteJenkins()
+        self.resolver = QueueResolver(self.cliente, intervalo_inicial=0.01, intervalo_maximo=0.05)
+
+    def tearDown(self):
+        self.resolver.encerrar()
+
+    def test_item_repetido_e_resolvido_uma_vez(self):
+        self.cliente.na_fila.add(7)
+        primeira = self.resolver.resolver("q/item/7/")
+        segunda = self.resolver.resolver("q/item/7/")
+        self.assertEqual(self.resolver.pendentes(), [7])
+        self.cliente.itens["q/item/7/"] = {"executable": {"url": "job/x/3/"}}
+        self.cliente.na_fila.clear()
+        self.assertEqual(primeira.result(ESPERA_TESTE), "job/x/3/")
+        self.assertEqual(segunda.result(ESPERA_TESTE), "job/x/3/")
+
+    def test_item_preso_na_fila_estoura_o_prazo(self):
+        self.cliente.na_fila.add(8)
+        with self.assertLogs("queue_resolver", level="WARNING"):
+            self.assertIsNone(self.resolver.resolver("q/item/8/", timeout=0.05).result(ESPERA_TESTE))
+
+    def test_item_sem_prazo_continua_acompanhado_ate_o_build(self):
+        self.cliente.na_fila.add(10)
+        avisos = []
+        with mock.patch.object(queue_resolver, "AVISO_FILA", 0.02):
+            future = self.resolver.resolver("q/item/10/", on_update=lambda url, segundos: avisos.append(url))
+            time.sleep(0.2)
+            self.assertFalse(future.done())
+            self.cliente.itens["q/item/10/"] = {"executable": {"url": "job/x/4/"}}
+            self.cliente.na_fila.clear()
+            self.assertEqual(future.result(ESPERA_TESTE), "job/x/4/")
+        self.assertIn("q/item/10/", avisos)
+
+    def test_item_removido_do_jenkins_resolve_com_none(self):
+        # Fora da fila e sem registro (descartado pelo Jenkins): não fica acompanhado para sempre
+        with self.assertLogs("queue_resolver", level="WARNING"):
+            self.assertIsNone(self.resolver.resolver("q/item/11/").result(ESPERA_TESTE))
+
+    def test_disparo_serializavel(self):
+        retorno = disparo_na_fila("https://jenkins/queue/item/12/")
+        self.assertEqual(json.loads(json.dumps(retorno))["queue_url"], "https://jenkins/queue/item/12/")
+        self.assertEqual(disparo_na_fila(None)["status"], "ERROR")
+
+    def test_encerrar_resolve_com_none(self):
+        self.cliente.na_fila.add(9)
+        future = self.resolver.resolver("q/item/9/", timeout=60)
+        self.resolver.encerrar()
+        self.assertIsNone(future.result(0))
+
+class BuildPollerTest(unittest.TestCase):
+    def setUp(self):
+        self.cliente = _ClienteJenkins()
+        self.poller = BuildPoller(self.cliente, intervalo=0.01)
+
+    def tearDown(self):
+        self.poller.encerrar()
+
+    def test_builds_da_mesma_pasta_em_uma_consulta_por_ciclo(self):
+        pasta = "job/x/"
+        self.cliente.builds[pasta] = {n: {"number": n, "building": True, "url": f"{pasta}{n}/"} for n in (1, 2)}
+        self.poller.intervalo = 0.2
+        futures = [self.poller.acompanhar(f"{pasta}{n}/") for n in (1, 2)]
+        repetida = self.poller.acompanhar(f"{pasta}1/")
+        self.assertEqual(len(self.poller.em_andamento()), 2)
+        with self.cliente.lock:
+            for n in (1, 2):
+                self.cliente.builds[pasta][n] = {"number": n, "building": False, "result": "SUCCESS", "url": f"{pasta}{n}/"}
+        self.assertEqual([f.result(ESPERA_TESTE)["status"] for f in futures + [repetida]], ["SUCCESS"] * 3)
+        # Cada ciclo consulta a pasta uma vez, não uma vez por build
+        self.assertLessEqual(self.cliente.consultas, 3)
+
+    def test_build_em_andamento_estoura_o_prazo(self):
+        self.cliente.builds["job/x/"] = {5: {"number": 5, "building": True}}
+        status = self.poller.acompanhar("job/x/5/", timeout=0.05).result(ESPERA_TESTE)
+        self.assertEqual(status, {"status": "TIMEOUT", "building": True, "url": "job/x/5/"})
+
+class DrainWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.balancers = [_Balanceador("b1", {"N1": 3}), _Balanceador("b2", {})]
+        self.watcher = DrainWatcher(lambda: self.balancers, intervalo_rapido=0.01, intervalo_lento=0.01)
+
+    def tearDown(self):
+        self.watcher.encerrar()
+
+    def test_node_repetido_compartilha_a_drenagem(self):
+        primeira = self.watcher.aguardar("N1")
+        segunda = self.watcher.aguardar("N1")
+        self.assertEqual(list(self.watcher.em_drenagem()), ["N1"])
+        self.balancers[0].conexoes["N1"] = 0
+        self.assertTrue(primeira.result(ESPERA_TESTE))
+        self.assertTrue(segunda.result(ESPERA_TESTE))
+
+    def test_balanceador_sem_o_node_sai_da_consulta(self):
+        self.balancers[0].conexoes["N1"] = 0
+        self.assertTrue(self.watcher.aguardar("N1").result(ESPERA_TESTE))
+        self.assertEqual(self.balancers[1].consultas, 1)
+
+    def test_conexoes_presas_estouram_o_prazo(self):
+        self.assertFalse(self.watcher.aguardar("N1", timeout=0.05).result(ESPERA_TESTE))
+
+    def test_rechecagem_nao_estoura_o_prazo_com_node_zerado(self):
+        watcher = DrainWatcher(lambda: self.balancers, intervalo_rapido=0.01, confirmar=True)
+        try:
+            self.balancers[0].conexoes["N1"] = 0
+            self.assertTrue(watcher.aguardar("N1", timeout=0).result(ESPERA_TESTE))
+        finally:
+            watcher.encerrar()
+
+    def test_balanceador_com_erro_nao_conta_como_zerado(self):
+        self.balancers[0].conexoes["N1"] = 50
+        self.balancers[1].conexoes["N1"] = 0
+        atualizacoes = []
+        primeira_leitura = threading.Event()
+
+        def progresso(node, total, detalhes):
+            atualizacoes.append(total)
+            primeira_leitura.set()
+        self.watcher.intervalo_rapido = self.watcher.intervalo_lento = 0.02
+        with self.assertLogs("drain_watcher", level="ERROR"):
+            future = self.watcher.aguardar("N1", timeout=60, on_update=progresso)
+            self.assertTrue(primeira_leitura.wait(ESPERA_TESTE))
+            self.balancers[0].erro = RuntimeError("HTTP 503")
+            consultas = self.balancers[0].consultas
+            for _ in range(200):
+                if future.done() or self.balancers[0].consultas >= consultas + 3:
+                    break
+                threading.Event().wait(0.01)
+        self.assertFalse(future.done())
+        # Última contagem conhecida continua valendo enquanto o balanceador não responde
+        self.assertNotIn(0, atualizacoes)
+        self.balancers[0].erro = None
+        self.balancers[0].conexoes["N1"] = 0
+        self.assertTrue(future.result(ESPERA_TESTE))
+
+    def test_balanceador_sem_resposta_estoura_o_prazo(self):
+        self.balancers[0].erro = RuntimeError("HTTP 503")
+        with self.assertLogs("drain_watcher", level="ERROR"):
+            self.assertFalse(self.watcher.aguardar("N1", timeout=0.05).result(ESPERA_TESTE))
+
+    def test_encerrar_resolve_com_false(self):
+        future = self.watcher.aguardar("N1", timeout=60)
+        self.watcher.encerrar()
+        self.assertFalse(future.result(0))
+
+if __name__ == "__main__":
+    unittest.main()
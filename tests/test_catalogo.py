@@ -0,0 +1,112 @@
+"""Paginação do catálogo de clusters contra uma API simulada de várias páginas.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+import threading
+import unittest
+from unittest import mock
+import requests
+from Pesquisar_Cluster import Pesquisar
+from Pesquisar_Cluster.Pesquisar import iterar_clusters_producao, pesquisar_no_catalogo
+
+TAMANHO = 2
+
+def _cluster(i):
+    return {"nomeCluster": f"CLUSTER-{i}", "hosts": [
+        {"hostname": f"wasp{i:04d}.sicoob.com.br", "ambiente": "PRODUCAO"},
+        {"hostname": f"wash{i:04d}.sicoob.com.br", "ambiente": "HOMOLOGACAO"},
+    ]}
+
+class _Resposta:
+    def __init__(self, status_code, dados=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._dados = dados
+
+    def json(self):
+        return self._dados
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+class _Catalogo:
+    """API do catálogo em memória: `clusters` paginados por count/page"""
+
+    def __init__(self, quantidade, total_paginas=True, fora_do_fim=404, erros=()):
+        self.clusters = [_cluster(i) for i in range(1, quantidade + 1)]
+        self.total_paginas = total_paginas
+        self.fora_do_fim = fora_do_fim
+        self.erros = set(erros)
+        self.paginas = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        count, page = params["count"], params["page"]
+        with self.lock:
+            self.paginas.append(page)
+        if page in self.erros:
+            return _Resposta(500)
+        dados = self.clusters[(page - 1) * count:page * count]
+        if page > 1 and not dados and self.fora_do_fim is not None:
+            return _Resposta(self.fora_do_fim)
+        resultado = {"dados": dados}
+        if self.total_paginas is True:
+            resultado["totalPaginas"] = -(-len(self.clusters) // count)
+        elif self.total_paginas is not None:
+            resultado["totalPaginas"] = self.total_paginas
+        return _Resposta(200, {"resultado": resultado})
+
+class PaginacaoTest(unittest.TestCase):
+    def _iterar(self, catalogo, **kwargs):
+        with mock.patch.object(Pesquisar.requests, "get", catalogo.get):
+            return [c["nomeCluster"] for c in iterar_clusters_producao(tamanho_pagina=TAMANHO, **kwargs)]
+
+    def test_todas_as_paginas_em_ordem(self):
+        catalogo = _Catalogo(7)
+        self.assertEqual(self._iterar(catalogo), [f"CLUSTER-{i}" for i in range(1, 8)])
+        self.assertEqual(sorted(catalogo.paginas), [1, 2, 3, 4])
+
+    def test_total_informado_evita_pagina_alem_do_fim(self):
+        # Última página completa: sem o total seria preciso pedir a seguinte
+        catalogo = _Catalogo(6)
+        self.assertEqual(len(self._iterar(catalogo)), 6)
+        self.assertEqual(sorted(catalogo.paginas), [1, 2, 3])
+
+    def test_sem_total_pede_uma_pagina_por_vez(self):
+        catalogo = _Catalogo(6, total_paginas=None)
+        self.assertEqual(len(self._iterar(catalogo)), 6)
+        # Página 4 (fora do fim, 404) encerra o catálogo sem erro
+        self.assertEqual(catalogo.paginas, [1, 2, 3, 4])
+
+    def test_pagina_vazia_encerra_o_catalogo(self):
+        catalogo = _Catalogo(4, total_paginas=None, fora_do_fim=None)
+        self.assertEqual(len(self._iterar(catalogo)), 4)
+        self.assertEqual(catalogo.paginas, [1, 2, 3])
+
+    def test_total_desatualizado_nao_falha_o_download(self):
+        # Catálogo encolheu depois da primeira página: as páginas além do fim respondem 404
+        catalogo = _Catalogo(4, total_paginas=6)
+        self.assertEqual(self._iterar(catalogo), [f"CLUSTER-{i}" for i in range(1, 5)])
+
+    def test_fora_do_fim_com_400(self):
+        catalogo = _Catalogo(4, total_paginas=None, fora_do_fim=400)
+        self.assertEqual(len(self._iterar(catalogo)), 4)
+
+    def test_erro_do_servidor_falha_o_download(self):
+        # Erro de verdade não pode virar inventário truncado
+        catalogo = _Catalogo(7, erros=[3])
+        with self.assertRaises(requests.HTTPError):
+            self._iterar(catalogo)
+
+    def test_pesquisa_para_na_pagina_do_host(self):
+        catalogo = _Catalogo(20, total_paginas=None)
+        with mock.patch.object(Pesquisar.requests, "get", catalogo.get):
+            clusters = iterar_clusters_producao(tamanho_pagina=TAMANHO)
+            self.assertEqual(pesquisar_no_catalogo("wasp0003", clusters), ("wasp0003.sicoob.com.br", "CLUSTER-3"))
+        # No máximo a página seguinte já agendada; nada além dela
+        self.assertLessEqual(max(catalogo.paginas), 3)
+
+if __name__ == "__main__":
+    unittest.main()
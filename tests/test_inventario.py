@@ -0,0 +1,89 @@
+"""Pesquisas concorrentes com o inventário de clusters vazio.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+import time
+import threading
+import unittest
+from Pesquisar_Cluster.Pesquisar import InventarioClusters
+
+ESPERA_TESTE = 5
+
+CLUSTERS = [
+    {"nomeCluster": "CLUSTER-A", "hostsProducao": ["wasp0001.sicoob.com.br", "wasp0002.sicoob.com.br"]},
+    {"nomeCluster": "CLUSTER-B", "hostsProducao": ["trnp0001.sicoob.com.br"]},
+]
+
+class _SnapshotVazio:
+    """Snapshot sem cópia em disco; a leitura demora como um disco de verdade"""
+
+    def ler(self):
+        time.sleep(0.02)
+        return None
+
+    def salvar(self, dados):
+        pass
+
+class InventarioFrioTest(unittest.TestCase):
+    def setUp(self):
+        self.liberar_download = threading.Event()
+        self.downloads = 0
+        self.lock = threading.Lock()
+
+    def _baixar(self, etag=None, last_modified=None, ao_receber=None):
+        # Entrega as páginas e segura o fim do download até o teste liberar
+        with self.lock:
+            self.downloads += 1
+        for cluster in CLUSTERS:
+            if ao_receber:
+                ao_receber(cluster)
+        self.liberar_download.wait(ESPERA_TESTE)
+        return CLUSTERS, {"hash": "h1"}
+
+    def test_pesquisas_simultaneas_leem_a_carga_em_andamento(self):
+        inventario = InventarioClusters(baixar=self._baixar, snapshot=_SnapshotVazio())
+        barreira = threading.Barrier(8)
+        resultados = []
+
+        def buscar():
+            barreira.wait()
+            resultados.append(inventario.buscar("trnp0001"))
+        threads = [threading.Thread(target=buscar) for _ in range(8)]
+        inicio = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(ESPERA_TESTE)
+        # Host exato encontrado nos clusters já recebidos: ninguém espera o fim do download
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.liberar_download.set()
+
+        self.assertEqual(self.downloads, 1)
+        self.assertEqual(resultados, [("trnp0001.sicoob.com.br", "CLUSTER-B")] * 8)
+
+    def test_trecho_do_nome_espera_a_carga_inteira(self):
+        inventario = InventarioClusters(baixar=self._baixar, snapshot=_SnapshotVazio())
+        threading.Timer(0.1, self.liberar_download.set).start()
+        self.assertEqual(inventario.buscar("sp0002"), ("wasp0002.sicoob.com.br", "CLUSTER-A"))
+        self.assertEqual(inventario.buscar("naoexiste"), (None, None))
+        self.assertEqual(self.downloads, 1)
+
+    def test_falha_na_carga_libera_quem_esperava(self):
+        falhou = []
+
+        def baixar(etag=None, last_modified=None, ao_receber=None):
+            if not falhou:
+                falhou.append(True)
+                self.liberar_download.wait(ESPERA_TESTE)
+                raise OSError("catálogo indisponível")
+            return CLUSTERS, {"hash": "h1"}
+        inventario = InventarioClusters(baixar=baixar)
+        inventario.atualizar_em_background()
+        threading.Timer(0.1, self.liberar_download.set).start()
+        with self.assertLogs("pesquisar", level="ERROR"):
+            # Carga em background falhou: a pesquisa carrega o catálogo ela mesma
+            self.assertEqual(inventario.buscar("wasp0002"), ("wasp0002.sicoob.com.br", "CLUSTER-A"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,296 @@
+"""Recuperação de execuções interrompidas: plano por fluxo/componente/ponto de queda,
+execuções órfãs no banco e expiração do heartbeat.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+import os
+import time
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+import subprocess
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from concurrent.futures import Future
+import backend
+from backend import _plano_recuperacao, PERMANECE_ISOLADO
+from features import job_store
+from features.job_store import JobStore
+from features.workflow import AgendadorFluxos
+from Restart_Funcoes import queue_resolver
+
+ESPERA_TESTE = 5
+
+FILA = "https://jenkins/queue/item/{}/"
+BUILD = "https://jenkins/job/{}/1/"
+
+def _orfa(fluxo, node, passos, **dados):
+    """passos: ["etapa:evento", ...] na ordem gravada"""
+    return {
+        "id": "x", "fluxo": fluxo, "node": node, "dados": dados, "status": "EXECUTANDO",
+        "passo_atual": None, "iniciado_em": 0,
+        "passos": [tuple(p.split(":")) for p in passos],
+    }
+
+ISOLADO = ["cluster:inicio", "cluster:ok", "isolar:inicio", "isolar:ok", "persistencia:inicio", "persistencia:ok",
+           "drenar:inicio", "drenar:ok"]
+JENKINS = ISOLADO + ["jenkins:inicio"]
+
+# (caso, órfã, fluxo esperado, trecho da ação)
+CASOS = [
+    # Restart: pontos de queda antes do Jenkins
+    ("restart antes de isolar", _orfa("Restart", "WASP0001", ["cluster:inicio", "cluster:ok"]),
+     None, "nada a desfazer"),
+    ("restart isolando", _orfa("Restart", "WASP0001", ["cluster:inicio", "cluster:ok", "isolar:inicio"]),
+     "Rollback", "desfazer isolamento"),
+    ("restart drenando", _orfa("Restart", "CTRP0001", ISOLADO[:-1]),
+     "Rollback", "desfazer isolamento"),
+    # Restart: queda durante a etapa de Jenkins, por componente
+    ("restart jenkins sem registro", _orfa("Restart", "CTRP0001", JENKINS),
+     "Retomada", "disparar Websphere, SRTB, Liberty e habilitar"),
+    ("restart disparo sem resposta", _orfa("Restart", "WASP0001", JENKINS, filas={"Websphere": None}),
+     None, PERMANECE_ISOLADO),
+    ("restart websphere na fila", _orfa("Restart", "CTRP0001", JENKINS, filas={"Websphere": FILA.format(1)}),
+     "Retomada", "aguardar fila de Websphere; disparar SRTB, Liberty e habilitar"),
+    ("restart só websphere com build", _orfa("Restart", "CTRP0001", JENKINS, filas={"Websphere": FILA.format(1)},
+                                             builds={"Websphere": BUILD.format("ws")}),
+     "Retomada", "reanexar a Websphere; disparar SRTB, Liberty e habilitar"),
+    ("restart srtb com build, liberty na fila",
+     _orfa("Restart", "CTRP0001", JENKINS, filas={"Websphere": FILA.format(1), "SRTB": FILA.format(2), "Liberty": FILA.format(3)},
+           builds={"Websphere": BUILD.format("ws"), "SRTB": BUILD.format("srtb")}),
+     "Retomada", "reanexar a Websphere, SRTB; aguardar fila de Liberty e habilitar"),
+    ("restart liberty disparo sem resposta",
+     _orfa("Restart", "CTRP0001", JENKINS, filas={"Websphere": FILA.format(1), "SRTB": FILA.format(2), "Liberty": None},
+           builds={"Websphere": BUILD.format("ws")}),
+     None, PERMANECE_ISOLADO),
+    ("restart wasp com build", _orfa("Restart", "WASP0001", JENKINS, builds={"Websphere": BUILD.format("ws")}),
+     "Retomada", "reanexar a Websphere e habilitar"),
+    # Restart: depois do Jenkins
+    ("restart build falhou", _orfa("Restart", "CTRP0001", JENKINS + ["jenkins:falha"], builds={"Websphere": BUILD.format("ws")}),
+     None, PERMANECE_ISOLADO),
+    ("restart habilitando", _orfa("Restart", "CTRP0001", JENKINS + ["jenkins:ok", "habilitar:inicio"]),
+     "Rollback", "builds concluídos"),
+    ("restart habilitado", _orfa("Restart", "WASP0001", JENKINS + ["jenkins:ok", "habilitar:inicio", "habilitar:ok"]),
+     None, "já habilitado"),
+    # Restart com limpeza
+    ("restart clear limpeza concluída, srtb na fila",
+     _orfa("Restart Clear", "CTRP0001", JENKINS, filas={"Limpeza": FILA.format(1), "SRTB": FILA.format(2)},
+           builds={"Limpeza": BUILD.format("limpeza")}),
+     "Retomada", "reanexar a Limpeza; aguardar fila de SRTB; disparar Liberty e habilitar"),
+    ("restart clear trnp sem registro", _orfa("Restart Clear", "TRNP0001", JENKINS),
+     "Retomada", "disparar Limpeza e habilitar"),
+    # Limpeza avulsa: sem isolamento, não dispara por conta própria
+    ("limpeza antes do jenkins", _orfa("Limpeza", "WASP0001", ["cluster:inicio", "cluster:ok"]),
+     None, "nada a desfazer"),
+    ("limpeza jenkins sem registro", _orfa("Limpeza", "WASP0001", ["cluster:ok", "jenkins:inicio"]),
+     None, "nada a desfazer"),
+    ("limpeza na fila", _orfa("Limpeza", "WASP0001", ["cluster:ok", "jenkins:inicio"], filas={"Limpeza": FILA.format(1)}),
+     "Retomada Limpeza", "aguardar fila de Limpeza"),
+    ("limpeza com build", _orfa("Limpeza", "XPTO0001", ["cluster:ok", "jenkins:inicio"], builds={"Limpeza": BUILD.format("limpeza")}),
+     "Retomada Limpeza", "reanexar a Limpeza"),
+    ("limpeza disparo sem resposta", _orfa("Limpeza", "WASP0001", ["cluster:ok", "jenkins:inicio"], filas={"Limpeza": None}),
+     None, "sem registro na fila"),
+    ("limpeza concluída", _orfa("Limpeza", "WASP0001", ["cluster:ok", "jenkins:inicio", "jenkins:ok"]),
+     None, "builds concluídos"),
+    # Retomadas interrompidas
+    ("retomada antes da primeira etapa", _orfa("Retomada", "CTRP0001", [], fluxo_origem="Restart",
+                                               builds={"Websphere": BUILD.format("ws")}),
+     "Retomada", "reanexar a Websphere; disparar SRTB, Liberty e habilitar"),
+    ("retomada com srtb disparado", _orfa("Retomada", "CTRP0001", ["reanexar:inicio"], fluxo_origem="Restart",
+                                          builds={"Websphere": BUILD.format("ws")}, filas={"SRTB": FILA.format(2)}),
+     "Retomada", "reanexar a Websphere; aguardar fila de SRTB; disparar Liberty e habilitar"),
+    ("retomada reanexada", _orfa("Retomada", "CTRP0001", ["reanexar:inicio", "reanexar:ok", "habilitar:inicio"],
+                                 fluxo_origem="Restart"),
+     "Rollback", "builds concluídos"),
+    ("retomada com falha", _orfa("Retomada", "CTRP0001", ["reanexar:inicio", "reanexar:falha"], fluxo_origem="Restart"),
+     None, PERMANECE_ISOLADO),
+    ("retomada sem fluxo de origem", _orfa("Retomada", "CTRP0001", ["reanexar:inicio"], builds={"Websphere": BUILD.format("ws")}),
+     None, PERMANECE_ISOLADO),
+    ("retomada limpeza em andamento", _orfa("Retomada Limpeza", "WASP0001", ["reanexar:inicio"], fluxo_origem="Limpeza",
+                                            builds={"Limpeza": BUILD.format("limpeza")}),
+     "Retomada Limpeza", "reanexar a Limpeza"),
+    ("retomada limpeza concluída", _orfa("Retomada Limpeza", "WASP0001", ["reanexar:inicio", "reanexar:ok"], fluxo_origem="Limpeza"),
+     None, "builds concluídos"),
+    # Rollback
+    ("rollback interrompido", _orfa("Rollback", "WASP0001", ["habilitar:inicio"]),
+     "Rollback", "repetir habilitação"),
+    ("rollback concluído", _orfa("Rollback", "WASP0001", ["habilitar:inicio", "habilitar:ok"]),
+     None, "já habilitado"),
+]
+
+class PlanoRecuperacaoTest(unittest.TestCase):
+    def test_planos(self):
+        for caso, orfa, fluxo_esperado, trecho in CASOS:
+            with self.subTest(caso):
+                fluxo, acao = _plano_recuperacao(orfa)
+                self.assertEqual(fluxo.nome if fluxo else None, fluxo_esperado, acao)
+                self.assertIn(trecho, acao)
+
+    def test_node_isolado_so_volta_apos_todos_os_componentes(self):
+        # Nenhum plano habilita direto um node cujo restart não concluiu a etapa de Jenkins
+        for caso, orfa, fluxo_esperado, trecho in CASOS:
+            eventos = {e for p, e in orfa["passos"] if p in ("jenkins", "reanexar")}
+            if fluxo_esperado == "Rollback" and eventos and "ok" not in eventos:
+                self.fail(f"{caso}: habilita sem concluir os builds")
+
+class RetomadaTest(unittest.TestCase):
+    """Retomada de um CTRP que caiu com só o Websphere disparado"""
+
+    def setUp(self):
+        self.disparos = []
+        self.acompanhados = []
+        self.habilitados = []
+
+    def _disparo(self, nome):
+        def disparar(execucao):
+            self.disparos.append(nome)
+            return {"status": "QUEUED", "message": "Build na fila do Jenkins", "queue_url": FILA.format(nome)}
+        return disparar
+
+    def _resolver(self, queue_url, timeout=None, on_update=None):
+        build = Future()
+        build.set_result(BUILD.format(queue_url.rstrip("/").rsplit("/", 1)[1]))
+        return build
+
+    def _acompanhar(self, job_url, login, senha, node=None, component=None, timeout=600):
+        self.acompanhados.append(component)
+        concluido = Future()
+        concluido.set_result(True)
+        return concluido
+
+    def test_dispara_os_componentes_que_faltam_antes_de_habilitar(self):
+        componentes = {nome: ("", self._disparo(nome)) for nome in ("Websphere", "SRTB", "Liberty")}
+        orfa = _orfa("Restart", "CTRP0001", JENKINS, cluster_name="CLUSTER-A", filas={"Websphere": FILA.format(1)},
+                     builds={"Websphere": BUILD.format("Websphere")})
+        fluxo, _ = _plano_recuperacao(orfa)
+        with mock.patch.object(backend, "COMPONENTES_JENKINS", componentes), \
+             mock.patch.object(backend, "acompanhar_job_jenkins", self._acompanhar), \
+             mock.patch.object(backend, "executar_nos_balancers_do_node",
+                               lambda manager, func, node: self.habilitados.append(node) or []), \
+             mock.patch.object(queue_resolver, "obter_resolvedor", lambda login, senha: SimpleNamespace(resolver=self._resolver)), \
+             mock.patch.object(backend, "console"):
+            execucao = AgendadorFluxos(recursos={"manager_f5": None}).iniciar(
+                fluxo, "CTRP0001", login="u", senha="s", fluxo_origem="Restart", **orfa["dados"])
+            self.assertTrue(execucao.resultado.result(ESPERA_TESTE))
+        self.assertEqual(sorted(self.disparos), ["Liberty", "SRTB"])
+        self.assertEqual(sorted(self.acompanhados), ["Liberty", "SRTB", "Websphere"])
+        self.assertEqual(self.habilitados, ["CTRP0001"])
+        self.assertEqual(set(execucao.dados["builds"]), {"Websphere", "SRTB", "Liberty"})
+
+class _Execucao:
+    def __init__(self, node, fluxo="Restart", **dados):
+        self.id = f"{node}-{time.time_ns()}"
+        self.fluxo = SimpleNamespace(nome=fluxo)
+        self.node = node
+        self.dados = dados
+        self.status = "EXECUTANDO"
+        self.passo_atual = "isolar"
+
+class JobStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.caminho = os.path.join(self.dir, "jobs.db")
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.encerrar_sessao()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _store(self):
+        store = JobStore(self.caminho)
+        self.stores.append(store)
+        return store
+
+    def _sessao(self, store, **campos):
+        with sqlite3.connect(self.caminho) as conn:
+            for campo, valor in campos.items():
+                conn.execute(f"UPDATE sessoes SET {campo} = ? WHERE sessao = ?", (valor, store.sessao))
+
+    def _pid_encerrado(self):
+        processo = subprocess.Popen([sys.executable, "-c", "pass"])
+        processo.wait()
+        return processo.pid
+
+    def test_sessao_ativa_nao_tem_orfas(self):
+        console = self._store()
+        console.registrar_execucao(_Execucao("WASP0001"))
+        self.assertEqual(self._store().orfas(), [])
+        # Execuções da própria sessão nunca são órfãs
+        self.assertEqual(console.orfas(), [])
+
+    def test_heartbeat_expirado_vira_orfa(self):
+        console = self._store()
+        execucao = _Execucao("WASP0001", cluster_name="CLUSTER-A", senha="segredo")
+        console.registrar_execucao(execucao)
+        console.registrar_passo(execucao, "isolar", "inicio")
+        # Outra máquina: só o heartbeat decide
+        self._sessao(console, maquina="outra", heartbeat=time.time() - job_store.HEARTBEAT_EXPIRA - 1)
+        orfas = self._store().orfas()
+        self.assertEqual([o["id"] for o in orfas], [execucao.id])
+        self.assertEqual(orfas[0]["passos"], [("isolar", "inicio")])
+        self.assertEqual(orfas[0]["dados"], {"cluster_name": "CLUSTER-A"})
+
+    def test_heartbeat_recente_de_outra_maquina_nao_e_orfa(self):
+        console = self._store()
+        console.registrar_execucao(_Execucao("WASP0001"))
+        self._sessao(console, maquina="outra", pid=self._pid_encerrado())
+        self.assertEqual(self._store().orfas(), [])
+
+    def test_processo_encerrado_nesta_maquina_vira_orfa_antes_do_heartbeat_expirar(self):
+        console = self._store()
+        execucao = _Execucao("WASP0001")
+        console.registrar_execucao(execucao)
+        self._sessao(console, maquina=socket.gethostname(), pid=self._pid_encerrado())
+        self.assertEqual([o["id"] for o in self._store().orfas()], [execucao.id])
+
+    def test_execucao_finalizada_nao_e_orfa(self):
+        console = self._store()
+        execucao = _Execucao("WASP0001")
+        console.registrar_execucao(execucao)
+        console.finalizar(execucao)
+        self._sessao(console, heartbeat=0)
+        self.assertEqual(self._store().orfas(), [])
+
+    def test_orfa_assumida_por_um_so_console(self):
+        console = self._store()
+        execucao = _Execucao("WASP0001")
+        console.registrar_execucao(execucao)
+        self._sessao(console, heartbeat=0)
+        consoles = [self._store() for _ in range(8)]
+        barreira = threading.Barrier(len(consoles))
+        assumiu = []
+
+        def assumir(store):
+            barreira.wait()
+            assumiu.append(store.assumir(execucao.id, "RECUPERADO"))
+        threads = [threading.Thread(target=assumir, args=(store,)) for store in consoles]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(ESPERA_TESTE)
+        self.assertEqual(sorted(assumiu), [False] * 7 + [True])
+        self.assertEqual(self._store().orfas(), [])
+
+    def test_heartbeat_mantem_a_sessao_e_expira_ao_encerrar(self):
+        with mock.patch.object(job_store, "HEARTBEAT_INTERVALO", 0.05), \
+             mock.patch.object(job_store, "HEARTBEAT_EXPIRA", 0.5):
+            console = self._store()
+            console.registrar_execucao(_Execucao("WASP0001"))
+            self._sessao(console, maquina="outra")
+            observador = self._store()
+            time.sleep(1)
+            self.assertEqual(observador.orfas(), [], "heartbeat não renovou a sessão")
+            self.assertEqual(console._heartbeat.name, "job-store-heartbeat")
+            console.encerrar_sessao()
+            console._heartbeat.join(ESPERA_TESTE)
+            time.sleep(0.6)
+            self.assertEqual(len(observador.orfas()), 1)
+
+if __name__ == "__main__":
+    unittest.main()
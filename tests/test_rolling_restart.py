@@ -0,0 +1,133 @@
+"""Restart em lote por cluster: nodes repetidos, capacidade mínima, espera máxima e parada em falha.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+import threading
+import unittest
+from types import SimpleNamespace
+from concurrent.futures import Future
+from features.rolling_restart import RollingRestart
+
+ESPERA_TESTE = 5
+
+class _Restarts:
+    """iniciar(node) de mentira: cada restart termina após `duracao` com o resultado de `falhas`"""
+
+    def __init__(self, duracao=0.05, falhas=()):
+        self.duracao = duracao
+        self.falhas = {n.upper() for n in falhas}
+        self.iniciados = []
+        self.em_andamento = set()
+        self.maximo_simultaneo = 0
+        self.lock = threading.Lock()
+
+    def iniciar(self, node):
+        resultado = Future()
+        with self.lock:
+            self.iniciados.append(node)
+            self.em_andamento.add(node)
+            self.maximo_simultaneo = max(self.maximo_simultaneo, len(self.em_andamento))
+
+        def concluir():
+            with self.lock:
+                self.em_andamento.discard(node)
+            resultado.set_result(node.upper() not in self.falhas)
+        threading.Timer(self.duracao, concluir).start()
+        return SimpleNamespace(resultado=resultado)
+
+def _sempre_permitido(node, em_andamento):
+    return True, None
+
+class RollingRestartTest(unittest.TestCase):
+    def test_node_repetido_com_outra_caixa_roda_uma_vez(self):
+        restarts = _Restarts()
+        rolling = RollingRestart(restarts.iniciar, _sempre_permitido)
+        resultado = rolling.executar({"A": (["wasp0001", "WASP0001", "wasp0002"], 1)},
+                                     recusados={"Wasp0002": "degradado", "WASP0003": "degradado"}).result(ESPERA_TESTE)
+        self.assertEqual(restarts.iniciados, ["wasp0001"])
+        self.assertEqual(resultado, {"wasp0001": True, "Wasp0002": None, "WASP0003": None})
+
+    def test_node_repetido_entre_clusters_roda_uma_vez(self):
+        restarts = _Restarts()
+        rolling = RollingRestart(restarts.iniciar, _sempre_permitido)
+        resultado = rolling.executar({"A": (["wasp0001"], 1), "B": (["Wasp0001", "trnp0001"], 1)}).result(ESPERA_TESTE)
+        self.assertEqual(sorted(restarts.iniciados), ["trnp0001", "wasp0001"])
+        self.assertEqual(resultado, {"wasp0001": True, "trnp0001": True})
+
+    def test_limite_por_cluster(self):
+        restarts = _Restarts()
+        rolling = RollingRestart(restarts.iniciar, _sempre_permitido)
+        nodes = [f"wasp000{i}" for i in range(6)]
+        resultado = rolling.executar({"A": (nodes, 2)}).result(ESPERA_TESTE)
+        self.assertEqual(resultado, {node: True for node in nodes})
+        self.assertEqual(restarts.maximo_simultaneo, 2)
+
+    def test_capacidade_minima_segura_o_proximo_node(self):
+        restarts = _Restarts()
+        consultas = []
+
+        def capacidade(node, em_andamento):
+            # Pool com folga para um node fora por vez
+            consultas.append((node, tuple(em_andamento)))
+            if em_andamento:
+                return False, "pool/app: 1 saudáveis após isolar, mínimo 2"
+            return True, None
+        rolling = RollingRestart(restarts.iniciar, capacidade, intervalo_recheck=0.01)
+        nodes = ["wasp0001", "wasp0002", "wasp0003"]
+        resultado = rolling.executar({"A": (nodes, 3)}).result(ESPERA_TESTE)
+        self.assertEqual(resultado, {node: True for node in nodes})
+        self.assertEqual(restarts.maximo_simultaneo, 1)
+        self.assertIn(("wasp0002", ("wasp0001",)), consultas)
+
+    def test_forcado_ignora_a_capacidade(self):
+        restarts = _Restarts()
+        rolling = RollingRestart(restarts.iniciar, lambda node, em_andamento: (False, "pool de um membro"))
+        resultado = rolling.executar({"A": (["wasp0001"], 1)}, forcados=["WASP0001"]).result(ESPERA_TESTE)
+        self.assertEqual(resultado, {"wasp0001": True})
+
+    def test_espera_maxima_falha_o_node_e_cancela_o_cluster(self):
+        restarts = _Restarts()
+        rolling = RollingRestart(restarts.iniciar, lambda node, em_andamento: (False, "pool/app: 0 saudáveis"),
+                                 intervalo_recheck=0.01, espera_maxima=0.1)
+        resultado = rolling.executar({"A": (["wasp0001", "wasp0002"], 1), "B": (["trnp0001"], 1)}).result(ESPERA_TESTE)
+        self.assertEqual(restarts.iniciados, [])
+        self.assertEqual(resultado, {"wasp0001": False, "wasp0002": None, "trnp0001": False})
+        motivos = rolling.motivos()
+        self.assertIn("sem capacidade após", motivos["wasp0001"])
+        self.assertIn("cancelado: wasp0001", motivos["wasp0002"])
+        self.assertEqual(rolling.aguardando(), {})
+
+    def test_capacidade_que_volta_antes_da_espera_maxima(self):
+        restarts = _Restarts()
+        liberada = threading.Event()
+        threading.Timer(0.05, liberada.set).start()
+        rolling = RollingRestart(restarts.iniciar, lambda node, em_andamento: (liberada.is_set(), "aguardando"),
+                                 intervalo_recheck=0.01, espera_maxima=ESPERA_TESTE)
+        self.assertEqual(rolling.executar({"A": (["wasp0001"], 1)}).result(ESPERA_TESTE), {"wasp0001": True})
+
+    def test_falha_para_o_cluster(self):
+        restarts = _Restarts(falhas=["wasp0001"])
+        rolling = RollingRestart(restarts.iniciar, _sempre_permitido)
+        resultado = rolling.executar({"A": (["wasp0001", "wasp0002", "wasp0003"], 1),
+                                      "B": (["trnp0001", "trnp0002"], 1)}).result(ESPERA_TESTE)
+        self.assertEqual(resultado, {"wasp0001": False, "wasp0002": None, "wasp0003": None,
+                                     "trnp0001": True, "trnp0002": True})
+        self.assertNotIn("wasp0002", restarts.iniciados)
+        self.assertIn("cancelado após falha em wasp0001", rolling.motivos()["wasp0002"])
+
+    def test_sem_parar_em_falha_continua_o_cluster(self):
+        restarts = _Restarts(falhas=["wasp0001"])
+        rolling = RollingRestart(restarts.iniciar, _sempre_permitido, parar_em_falha=False)
+        resultado = rolling.executar({"A": (["wasp0001", "wasp0002"], 1)}).result(ESPERA_TESTE)
+        self.assertEqual(resultado, {"wasp0001": False, "wasp0002": True})
+
+    def test_erro_ao_iniciar_conta_como_falha(self):
+        def iniciar(node):
+            raise RuntimeError("agendador indisponível")
+        rolling = RollingRestart(iniciar, _sempre_permitido)
+        resultado = rolling.executar({"A": (["wasp0001", "wasp0002"], 1)}).result(ESPERA_TESTE)
+        self.assertEqual(resultado, {"wasp0001": False, "wasp0002": None})
+
+if __name__ == "__main__":
+    unittest.main()
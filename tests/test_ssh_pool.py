@@ -0,0 +1,41 @@
+"""Pool de sessões SSH: fechamento das sessões ociosas fora do loop compartilhado.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+import time
+import threading
+import unittest
+from features.ssh_pool import PoolSSH
+
+ESPERA_TESTE = 5
+
+class _Sessao:
+    def __init__(self, host):
+        self.host = host
+        self.usuario = "u"
+        self.em_uso = 0
+        self.ultimo_uso = time.monotonic() - 60
+        self.fechada = threading.Event()
+        self.thread = None
+
+    def ativa(self):
+        return True
+
+    def fechar(self):
+        self.thread = threading.current_thread().name
+        self.fechada.set()
+
+class FechamentoOciosasTest(unittest.TestCase):
+    def test_sessao_ociosa_fechada_no_pool_ssh(self):
+        pool = PoolSSH(ocioso=0.01)
+        sessao = _Sessao("host1")
+        with pool._lock:
+            pool._sessoes[(sessao.host, sessao.usuario)] = sessao
+            pool._agendar_limpeza()
+        self.assertTrue(sessao.fechada.wait(ESPERA_TESTE))
+        self.assertTrue(sessao.thread.startswith("pool-ssh"), sessao.thread)
+        self.assertEqual(pool.estatisticas()["abertas"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
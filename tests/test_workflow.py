@@ -0,0 +1,53 @@
+"""Agendador de fluxos: em que thread as etapas continuam.
+
+Uso (na raiz do projeto):
+    python -m pytest -q tests
+"""
+import threading
+import unittest
+from concurrent.futures import Future
+from features.event_loop import esperar, obter_loop, executar_sync
+from features.workflow import Passo, Fluxo, AgendadorFluxos
+
+ESPERA_TESTE = 5
+
+class ContinuacaoTest(unittest.TestCase):
+    def _thread_do_loop(self):
+        async def nome():
+            return threading.current_thread()
+        return executar_sync(nome())
+
+    def test_etapa_apos_esperar_nao_roda_no_loop(self):
+        obter_loop()
+        loop = self._thread_do_loop()
+        threads = []
+        fluxo = Fluxo("Teste", "Teste", [
+            Passo("espera", lambda execucao: esperar(0.01)),
+            Passo("depois", lambda execucao: threads.append(threading.current_thread()) or True),
+        ])
+        agendador = AgendadorFluxos()
+        continuacoes = []
+        original = agendador._passo_concluido
+
+        def passo_concluido(*args):
+            continuacoes.append(threading.current_thread())
+            return original(*args)
+        agendador._passo_concluido = passo_concluido
+
+        self.assertTrue(agendador.iniciar(fluxo, "TRNP0001").resultado.result(ESPERA_TESTE))
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(loop, continuacoes + threads)
+
+    def test_future_resolvido_por_outra_thread_continua_no_pool(self):
+        pendente = Future()
+        fluxo = Fluxo("Teste", "Teste", [Passo("externo", lambda execucao: pendente)])
+        agendador = AgendadorFluxos()
+        execucao = agendador.iniciar(fluxo, "WASP0001")
+        resolvedora = threading.Thread(target=pendente.set_result, args=(False,), name="resolvedora")
+        resolvedora.start()
+        resolvedora.join()
+        self.assertFalse(execucao.resultado.result(ESPERA_TESTE))
+        self.assertEqual(execucao.historico[0][:2], ("externo", False))
+
+if __name__ == "__main__":
+    unittest.main()